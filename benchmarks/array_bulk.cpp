@@ -0,0 +1,52 @@
+// 类型化数组批量操作 与 逐元素 any 访问 的对比
+
+int main() {
+    const long long N = 1 << 20;
+    vector<any> boxed(N, any(1));
+    vector<int> ints(N, 1);
+    vector<double> doubles(N, 1.0);
+
+    meta_bench("fill  vector<any>   (逐元素)", N, [&] {
+        for (auto& x : boxed) x = 2;
+        meta_keep(boxed);
+    });
+    meta_bench("fill  vector<int>   (meta_array)", N, [&] {
+        meta_array::fill(ints, 2);
+        meta_keep(ints);
+    });
+    meta_bench("sum   vector<any>   (逐元素)", N, [&] {
+        double acc = 0;
+        for (const auto& x : boxed) acc += MetaUtils::to_double(x);
+        meta_keep(acc);
+    });
+    meta_bench("sum   vector<int>   (meta_array)", N, [&] {
+        auto acc = meta_array::sum(ints);
+        meta_keep(acc);
+    });
+    meta_bench("sum   vector<double>(meta_array)", N, [&] {
+        auto acc = meta_array::sum(doubles);
+        meta_keep(acc);
+    });
+    meta_bench("max   vector<any>   (逐元素)", N, [&] {
+        any best = boxed[0];
+        for (const auto& x : boxed) if (best < x) best = x;
+        meta_keep(best);
+    });
+    meta_bench("max   vector<int>   (meta_array)", N, [&] {
+        auto best = meta_array::max(ints);
+        meta_keep(best);
+    });
+    meta_bench("map   vector<any>   (逐元素)", N, [&] {
+        for (auto& x : boxed) x = any_cast<int>(x) * 3 % 7;
+        meta_keep(boxed);
+    });
+    meta_bench("map   vector<int>   (meta_array)", N, [&] {
+        meta_array::map(ints, [](int x) { return x * 3 % 7; });
+        meta_keep(ints);
+    });
+    meta_bench("copy  vector<double> <- vector<int>", N, [&] {
+        meta_array::copy(doubles, ints);
+        meta_keep(doubles);
+    });
+    return 0;
+}
@@ -0,0 +1,55 @@
+// 数组越界检查的开销：fast 模式可证明安全时的无检查访问 与 safe 模式的检查访问
+
+int main() {
+    const long long N = 1 << 20;
+    vector<int> values(N, 1);
+    vector<int> order(N);
+    for (long long i = 0; i < N; ++i) order[i] = (i * 7919) % N;
+    std::array<int, 1024> fixed{};
+    const long long ROUNDS = N / 1024;
+
+    meta_bench("顺序 v[i]        (无检查)", N, [&] {
+        long long acc = 0;
+        for (long long i = 0; i < N; ++i) acc += values[i];
+        meta_keep(acc);
+    });
+    meta_bench("顺序 at(v, i, 行) (检查)", N, [&] {
+        long long acc = 0;
+        for (long long i = 0; i < N; ++i) acc += meta_array::at(values, i, 1);
+        meta_keep(acc);
+    });
+    meta_bench("顺序 v.at(i)     (std 检查)", N, [&] {
+        long long acc = 0;
+        for (long long i = 0; i < N; ++i) acc += values.at(i);
+        meta_keep(acc);
+    });
+    meta_bench("随机 v[order[i]]        (无检查)", N, [&] {
+        long long acc = 0;
+        for (long long i = 0; i < N; ++i) acc += values[order[i]];
+        meta_keep(acc);
+    });
+    meta_bench("随机 at(v, order[i], 行) (检查)", N, [&] {
+        long long acc = 0;
+        for (long long i = 0; i < N; ++i) acc += meta_array::at(values, order[i], 1);
+        meta_keep(acc);
+    });
+    meta_bench("定长 a[3]          (fast: 编译期证明)", N, [&] {
+        long long acc = 0;
+        for (long long r = 0; r < ROUNDS; ++r)
+            for (int k = 0; k < 1024; ++k) { fixed[3] += k; acc += fixed[3]; }
+        meta_keep(acc);
+    });
+    meta_bench("定长 at(a, 3, 行)  (safe)", N, [&] {
+        long long acc = 0;
+        for (long long r = 0; r < ROUNDS; ++r)
+            for (int k = 0; k < 1024; ++k) { meta_array::at(fixed, 3, 1) += k; acc += meta_array::at(fixed, 3, 1); }
+        meta_keep(acc);
+    });
+    any boxed_index = 5;
+    meta_bench("any 下标 at(v, i, 行)", N, [&] {
+        long long acc = 0;
+        for (long long i = 0; i < N; ++i) acc += meta_array::at(values, boxed_index, 1);
+        meta_keep(acc);
+    });
+    return 0;
+}
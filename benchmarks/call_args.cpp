@@ -0,0 +1,73 @@
+// 传递 10^6 个元素的数组参数：按值复制、const& 与移动的对比
+
+// 与生成的函数形状相同；noinline 保证每次调用都真正传递参数
+__attribute__((noinline)) double total_value(std::vector<double> xs) {
+    return xs[0] + xs[xs.size() - 1];
+}
+__attribute__((noinline)) double total_ref(const std::vector<double>& xs) {
+    return xs[0] + xs[xs.size() - 1];
+}
+__attribute__((noinline)) any first_value(any v) {
+    return any_cast<const std::vector<double>&>(v)[0];
+}
+__attribute__((noinline)) any first_ref(const any& v) {
+    return any_cast<const std::vector<double>&>(v)[0];
+}
+// 按值接收并返回，调用处移动时只转移所有权
+__attribute__((noinline)) std::vector<double> touch(std::vector<double> xs) {
+    xs[0] += 1.0;
+    return xs;
+}
+__attribute__((noinline)) any pass(any v) {
+    return v;
+}
+
+int main() {
+    const long long N = 1000000;
+    const long long CALLS = 200;
+    std::vector<double> v(N, 1.5);
+    any boxed = v;
+
+    meta_bench("类型化数组: 按值 f(v)", CALLS, [&] {
+        double acc = 0;
+        for (long long i = 0; i < CALLS; ++i) acc += total_value(v);
+        meta_keep(acc);
+    });
+    meta_bench("类型化数组: const& f(v)", CALLS, [&] {
+        double acc = 0;
+        for (long long i = 0; i < CALLS; ++i) acc += total_ref(v);
+        meta_keep(acc);
+    });
+    meta_bench("类型化数组: 按值 v = f(v)", CALLS, [&] {
+        for (long long i = 0; i < CALLS; ++i) v = touch(v);
+        meta_keep(v);
+    });
+    meta_bench("类型化数组: 移动 v = f(std::move(v))", CALLS, [&] {
+        for (long long i = 0; i < CALLS; ++i) v = touch(std::move(v));
+        meta_keep(v);
+    });
+    meta_bench("any 参数: 按值 f(any(v))", CALLS, [&] {
+        any acc;
+        for (long long i = 0; i < CALLS; ++i) acc = first_value(v);
+        meta_keep(acc);
+    });
+    meta_bench("any 参数: 按值 f(x)，x 为 any", CALLS, [&] {
+        any acc;
+        for (long long i = 0; i < CALLS; ++i) acc = first_value(boxed);
+        meta_keep(acc);
+    });
+    meta_bench("any 参数: const& f(x)，x 为 any", CALLS, [&] {
+        any acc;
+        for (long long i = 0; i < CALLS; ++i) acc = first_ref(boxed);
+        meta_keep(acc);
+    });
+    meta_bench("any 参数: 按值 x = f(x)", CALLS, [&] {
+        for (long long i = 0; i < CALLS; ++i) boxed = pass(boxed);
+        meta_keep(boxed);
+    });
+    meta_bench("any 参数: 移动 x = f(std::move(x))", CALLS, [&] {
+        for (long long i = 0; i < CALLS; ++i) boxed = pass(std::move(boxed));
+        meta_keep(boxed);
+    });
+    return 0;
+}
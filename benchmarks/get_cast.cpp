@@ -0,0 +1,43 @@
+// get<T>(x)：值形式 any_cast (抛异常) 与 指针形式快速路径 的对比
+
+int main() {
+    const long long N = 1 << 20;
+    vector<any> ints(N, any(3));
+    vector<any> mixed(N);
+    for (long long i = 0; i < N; ++i) {
+        if (i % 8 == 0) mixed[i] = string("skip");
+        else mixed[i] = int(i % 7);
+    }
+
+    meta_bench("同类型: any_cast<int>(x)", N, [&] {
+        long long acc = 0;
+        for (const auto& x : ints) acc += any_cast<int>(x);
+        meta_keep(acc);
+    });
+    meta_bench("同类型: MetaUtils::get<int>(x, 行)", N, [&] {
+        long long acc = 0;
+        for (const auto& x : ints) acc += MetaUtils::get<int>(x, 1);
+        meta_keep(acc);
+    });
+    meta_bench("同类型: get<int 类型族>(x, 行)", N, [&] {
+        long long acc = 0;
+        for (const auto& x : ints) acc += MetaUtils::get<long long, short, int, long, long long>(x, 1);
+        meta_keep(acc);
+    });
+    meta_bench("混合类型: try { any_cast } catch", N, [&] {
+        long long acc = 0;
+        for (const auto& x : mixed) {
+            try {
+                acc += any_cast<int>(x);
+            } catch (const bad_any_cast&) {
+            }
+        }
+        meta_keep(acc);
+    }, 1);
+    meta_bench("混合类型: MetaUtils::get_or<int>(x)", N, [&] {
+        long long acc = 0;
+        for (const auto& x : mixed) acc += MetaUtils::get_or<int>(x);
+        meta_keep(acc);
+    });
+    return 0;
+}
@@ -0,0 +1,60 @@
+// 多维数组：嵌套 vector 与连续存储 NDArray 的对比
+
+int main() {
+    const size_t R = 1024, C = 1024;
+    const long long N = R * C;
+
+    meta_bench("alloc vector<vector<double>>", N, [&] {
+        vector<vector<double>> m(R, vector<double>(C));
+        meta_keep(m);
+    });
+    meta_bench("alloc NDArray<double, 2>", N, [&] {
+        meta_array::NDArray<double, 2> m;
+        m.resize({R, C});
+        meta_keep(m);
+    });
+
+    vector<vector<double>> nested(R, vector<double>(C, 1.0));
+    vector<vector<any>> boxed(R, vector<any>(C, any(1.0)));
+    meta_array::NDArray<double, 2> row_major, col_major;
+    row_major.resize({R, C}, meta_array::Layout::RowMajor);
+    col_major.resize({R, C}, meta_array::Layout::ColMajor);
+    meta_array::fill(row_major, 1.0);
+    meta_array::fill(col_major, 1.0);
+
+    meta_bench("m[i][j] vector<vector<any>>", N, [&] {
+        double acc = 0;
+        for (size_t i = 0; i < R; ++i)
+            for (size_t j = 0; j < C; ++j) acc += any_cast<double>(boxed[i][j]);
+        meta_keep(acc);
+    });
+    meta_bench("m[i][j] vector<vector<double>>", N, [&] {
+        double acc = 0;
+        for (size_t i = 0; i < R; ++i)
+            for (size_t j = 0; j < C; ++j) acc += nested[i][j];
+        meta_keep(acc);
+    });
+    meta_bench("m(i, j) NDArray 行优先, 按行遍历", N, [&] {
+        double acc = 0;
+        for (size_t i = 0; i < R; ++i)
+            for (size_t j = 0; j < C; ++j) acc += row_major(i, j);
+        meta_keep(acc);
+    });
+    meta_bench("m(i, j) NDArray 列优先, 按列遍历", N, [&] {
+        double acc = 0;
+        for (size_t j = 0; j < C; ++j)
+            for (size_t i = 0; i < R; ++i) acc += col_major(i, j);
+        meta_keep(acc);
+    });
+    meta_bench("m(i, j) NDArray 行优先, 按列遍历", N, [&] {
+        double acc = 0;
+        for (size_t j = 0; j < C; ++j)
+            for (size_t i = 0; i < R; ++i) acc += row_major(i, j);
+        meta_keep(acc);
+    });
+    meta_bench("sum(m) NDArray", N, [&] {
+        auto acc = meta_array::sum(row_major);
+        meta_keep(acc);
+    });
+    return 0;
+}
@@ -0,0 +1,89 @@
+// modules: numeric
+// numeric 模块的批量运算 与 逐元素标量循环 的对比
+
+template<typename T>
+void bench_numeric(const char* type) {
+    const long long N = 1 << 20;
+    vector<T> a(N), b(N), c(N);
+    for (long long i = 0; i < N; ++i) {
+        a[i] = T(1) + T(i % 97) / 97;
+        b[i] = T(2) - T(i % 89) / 89;
+    }
+    string prefix = string(type) + " ";
+    auto name = [&](const char* what) { return prefix + what; };
+
+    meta_bench(name("add    标量循环").c_str(), N, [&] {
+        for (long long i = 0; i < N; ++i) c[i] = a[i] + b[i];
+        meta_keep(c);
+    });
+    meta_bench(name("add    numeric").c_str(), N, [&] {
+        numeric::add(c, a, b);
+        meta_keep(c);
+    });
+    meta_bench(name("pow 2  标量循环 std::pow").c_str(), N, [&] {
+        for (long long i = 0; i < N; ++i) c[i] = std::pow(a[i], T(2));
+        meta_keep(c);
+    });
+    meta_bench(name("pow 2  numeric").c_str(), N, [&] {
+        numeric::pow(c, a, 2);
+        meta_keep(c);
+    });
+    meta_bench(name("sqrt   标量循环").c_str(), N, [&] {
+        for (long long i = 0; i < N; ++i) c[i] = std::sqrt(a[i]);
+        meta_keep(c);
+    });
+    meta_bench(name("sqrt   numeric").c_str(), N, [&] {
+        numeric::sqrt(c, a);
+        meta_keep(c);
+    });
+    meta_bench(name("exp    标量循环").c_str(), N, [&] {
+        for (long long i = 0; i < N; ++i) c[i] = std::exp(a[i]);
+        meta_keep(c);
+    });
+    meta_bench(name("exp    numeric").c_str(), N, [&] {
+        numeric::exp(c, a);
+        meta_keep(c);
+    });
+    meta_bench(name("dot    标量循环").c_str(), N, [&] {
+        T acc = 0;
+        for (long long i = 0; i < N; ++i) acc += a[i] * b[i];
+        meta_keep(acc);
+    });
+    meta_bench(name("dot    numeric").c_str(), N, [&] {
+        T acc = numeric::dot(a, b);
+        meta_keep(acc);
+    });
+    meta_bench(name("sum    标量循环").c_str(), N, [&] {
+        T acc = 0;
+        for (long long i = 0; i < N; ++i) acc += a[i];
+        meta_keep(acc);
+    });
+    meta_bench(name("sum    numeric").c_str(), N, [&] {
+        T acc = numeric::sum(a);
+        meta_keep(acc);
+    });
+    meta_bench(name("max    标量循环").c_str(), N, [&] {
+        T best = a[0];
+        for (long long i = 1; i < N; ++i) best = std::max(best, a[i]);
+        meta_keep(best);
+    });
+    meta_bench(name("max    numeric").c_str(), N, [&] {
+        T best = numeric::max(a);
+        meta_keep(best);
+    });
+    meta_bench(name("cumsum 标量循环").c_str(), N, [&] {
+        T running = 0;
+        for (long long i = 0; i < N; ++i) c[i] = running += a[i];
+        meta_keep(c);
+    });
+    meta_bench(name("cumsum numeric").c_str(), N, [&] {
+        numeric::cumsum(c, a);
+        meta_keep(c);
+    });
+}
+
+int main() {
+    bench_numeric<double>("double");
+    bench_numeric<float>("float ");
+    return 0;
+}
@@ -0,0 +1,41 @@
+// parallel for / 并行归约 在 1..N 个线程上的扩展性
+// 线程数取 1, 2, 4, ... 直到硬件线程数（至少测到 4），每种线程数单独创建一个线程池，输出相对单线程的加速比
+
+#include <cmath>
+
+int main() {
+    const long long N = 1 << 22;
+    vector<double> v(N), w(N);
+    for (long long i = 0; i < N; ++i) v[i] = static_cast<double>(i % 1000) * 0.001;
+
+    size_t hardware = std::max<size_t>(thread::hardware_concurrency(), 4);
+    double base_sum = 0, base_for = 0;
+    for (size_t threads = 1; threads <= hardware; threads *= 2) {
+        meta_task::Pool workers(threads);
+        auto time = [&](auto body) {
+            double best = 1e300;
+            for (int r = 0; r < 5; ++r) {
+                auto start = std::chrono::steady_clock::now();
+                body();
+                auto stop = std::chrono::steady_clock::now();
+                best = std::min(best, std::chrono::duration<double, std::nano>(stop - start).count());
+            }
+            return best;
+        };
+        double sum_ns = time([&] {
+            double acc = meta_task::parallel_reduce(0, N, 1, 0.0,
+                [&](long long i) -> double { return std::sqrt(v[i]) * v[i]; }, meta_task::Sum{}, workers);
+            meta_keep(acc);
+        });
+        double for_ns = time([&] {
+            meta_task::parallel_for(0, N, 1, [&](long long i) { w[i] = std::exp(v[i]); }, workers);
+            meta_keep(w);
+        });
+        if (threads == 1) {
+            base_sum = sum_ns;
+            base_for = for_ns;
+        }
+        std::printf("threads=%-3zu parallel sum %8.3f ns/op (x%.2f)   parallel for %8.3f ns/op (x%.2f)\n",
+                    threads, sum_ns / N, base_sum / sum_ns, for_ns / N, base_for / for_ns);
+    }
+}
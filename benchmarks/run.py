@@ -0,0 +1,266 @@
+# benchmarks/run.py
+"""Meta 运行时基准测试
+
+每个 benchmarks/*.cpp 前会拼接编译器生成的运行时代码，再用指定的构建配置编译运行。
+开头的 "// modules: a b" 注释列出需要链接的标准库模块，模块与编译 Meta 程序时一样单独编译；
+"// track-allocs" 注释表示链接统计分配次数的 operator new/delete，结果中给出 allocs/op。
+benchmarks/programs/*.meta 是完整的 Meta 程序，记录每次运行的时间、分配次数、输出吞吐量（输出至少 64KB 时）与峰值内存。
+
+用法: python benchmarks/run.py [名称 ...] [--profile release]
+      python benchmarks/run.py --save-baseline          # 把结果保存为基线 benchmarks/baseline.json
+      python benchmarks/run.py --baseline [--threshold 0.15]   # 与基线比较，有退化时退出码为 1
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import contextlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRAM_DIR = os.path.join(BENCH_DIR, 'programs')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import meta_compiler
+
+BENCH_HELPER = r'''
+#include <chrono>
+#include <cstdio>
+
+// 阻止编译器把基准测试的结果优化掉
+template<typename T>
+inline void meta_keep(const T& value) {
+    asm volatile("" : : "g"(&value) : "memory");
+}
+
+#ifdef META_BENCH_ALLOCS
+#define META_BENCH_ALLOCATIONS() meta_alloc::allocations.load()
+#else
+#define META_BENCH_ALLOCATIONS() 0LL
+#endif
+
+// 运行 body 若干次，取最快的一次，输出每次操作的纳秒数
+// 统计分配时另外输出第一次运行中每次操作的分配次数；bytes 为一次运行输出的字节数，给出时输出吞吐量
+template<typename F>
+void meta_bench(const char* name, long long ops, F body, int repeat = 5, long long bytes = 0) {
+    double best = 1e300;
+    long long allocs = 0;
+    for (int r = 0; r < repeat; ++r) {
+        long long before = META_BENCH_ALLOCATIONS();
+        auto start = std::chrono::steady_clock::now();
+        body();
+        auto stop = std::chrono::steady_clock::now();
+        if (r == 0) allocs = META_BENCH_ALLOCATIONS() - before;
+        double ns = std::chrono::duration<double, std::nano>(stop - start).count();
+        if (ns < best) best = ns;
+    }
+    std::printf("%-40s %12.3f ns/op", name, best / ops);
+#ifdef META_BENCH_ALLOCS
+    std::printf(" %10.3f allocs/op", static_cast<double>(allocs) / ops);
+#endif
+    if (bytes > 0) std::printf(" %10.1f MB/s", bytes / best * 1e3);
+    std::printf("\n");
+}
+'''
+
+# 结果中的指标：时间与内存越小越好，吞吐量越大越好，分配次数是确定的，只要增加就算退化
+LOWER_IS_BETTER = ['ns/op', 'ms/run', 'peak KB']
+HIGHER_IS_BETTER = ['MB/s']
+COUNTS = ['allocs/op', 'allocs/run']
+# 输出少于这么多字节的 Meta 程序不记录吞吐量：时间几乎都不花在输出上，MB/s 没有意义
+MIN_THROUGHPUT_BYTES = 64 * 1024
+
+# meta_bench 输出的一行：名称、ns/op，以及可选的 allocs/op 与 MB/s
+RESULT_LINE = re.compile(r'^(?P<name>.+?)\s+(?P<ns>[\d.]+) ns/op'
+                         r'(?:\s+(?P<allocs>[\d.]+) allocs/op)?(?:\s+(?P<rate>[\d.]+) MB/s)?\s*$')
+
+def available_benchmarks():
+    harnesses = sorted(os.path.splitext(name)[0] for name in os.listdir(BENCH_DIR) if name.endswith('.cpp'))
+    programs = sorted(name for name in os.listdir(PROGRAM_DIR) if name.endswith('.meta'))
+    return harnesses + programs
+
+def harness_header(harness):
+    """开头注释中的选项：modules 列表与是否统计分配"""
+    modules, track_allocs = [], False
+    for line in harness.splitlines():
+        if not line.startswith('//'):
+            break
+        comment = line[2:].strip()
+        if comment.startswith('modules:'):
+            modules = comment[len('modules:'):].split()
+        elif comment == 'track-allocs':
+            track_allocs = True
+    return modules, track_allocs
+
+def build_benchmark(name, options, work_dir):
+    with open(os.path.join(BENCH_DIR, name + '.cpp'), 'r', encoding='utf-8') as f:
+        harness = f.read()
+    cpp_file = os.path.join(work_dir, name + '.cpp')
+    exe_file = os.path.join(work_dir, name + '.exe')
+
+    loader = meta_compiler.ModuleLoader(options, cache_dir=work_dir)
+    module_names, track_allocs = harness_header(harness)
+    includes = []
+    for module_name in module_names:
+        module = loader.load(module_name + '.meta', meta_compiler.STDLIB_DIR)
+        includes.append({'type': 'include', 'name': module_name, 'data': module})
+    objects = loader.build(loader.link_closure([stmt['data'] for stmt in includes]))
+    if objects is None:
+        return None
+
+    with open(cpp_file, 'w', encoding='utf-8') as f:
+        if track_allocs:
+            f.write("#define META_BENCH_ALLOCS\n")
+        f.write(meta_compiler.generate_runtime_code() +
+                meta_compiler.generate_module_declarations(includes) + BENCH_HELPER + harness)
+        if track_allocs:
+            f.write(meta_compiler.ALLOC_OPERATORS)
+    link_flags = meta_compiler.THREAD_FLAGS if meta_compiler.uses_threads(harness) else []
+    if meta_compiler.run_gcc([cpp_file] + objects, exe_file, options, link_flags) != 0:
+        return None
+    return exe_file
+
+def run_harness(exe_file):
+    """运行 C++ 基准测试，原样输出结果并解析 meta_bench 的各行"""
+    output = subprocess.run([exe_file], check=True, stdout=subprocess.PIPE, text=True).stdout
+    print(output, end='')
+    results = {}
+    for line in output.splitlines():
+        match = RESULT_LINE.match(line)
+        if match is None:
+            continue
+        metrics = {'ns/op': float(match.group('ns'))}
+        if match.group('allocs') is not None:
+            metrics['allocs/op'] = float(match.group('allocs'))
+        if match.group('rate') is not None:
+            metrics['MB/s'] = float(match.group('rate'))
+        results[match.group('name')] = metrics
+    return results
+
+def compile_quietly(meta_file, output_file, options):
+    """编译 Meta 程序，只在失败时显示编译器的输出"""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        exe_file = meta_compiler.compile_meta(meta_file, output_file, options)
+    if exe_file is None:
+        print(log.getvalue(), end='')
+    return exe_file
+
+def run_meta_program(name, options, work_dir, launcher, repeat=3):
+    """编译并运行 Meta 程序：取最快一次的时间，分配次数由 --track-allocs 构建的版本统计"""
+    meta_file = os.path.join(PROGRAM_DIR, name)
+    base = os.path.join(work_dir, os.path.splitext(name)[0])
+    exe_file = compile_quietly(meta_file, base + '.cpp', options)
+    tracked = vars(options).copy()
+    tracked['track_allocs'] = True
+    alloc_exe = compile_quietly(meta_file, base + '_allocs.cpp', meta_compiler.BuildOptions(**tracked))
+    if exe_file is None or alloc_exe is None:
+        print(f"错误: 基准程序 {name} 编译失败")
+        return None
+    runs = [meta_compiler.run_program(exe_file, launcher=launcher) for _ in range(repeat)]
+    best = min(runs, key=lambda run: run['wall'])
+    stats = meta_compiler.run_program(alloc_exe)['stderr'].decode('utf-8', errors='replace')
+    allocs = re.search(r'分配次数: (\d+)', stats)
+    if allocs is None:
+        # 没有统计结果时不能当作 0 次分配，否则分配次数的退化永远不会被发现
+        print(f"错误: 基准程序 {name} 的 --track-allocs 版本没有输出分配次数{stats}")
+        return None
+    metrics = {
+        'ms/run': round(best['wall'] * 1000, 3),
+        'allocs/run': int(allocs.group(1)),
+    }
+    if len(best['stdout']) >= MIN_THROUGHPUT_BYTES:
+        metrics['MB/s'] = round(len(best['stdout']) / best['wall'] / 1e6, 3)
+    if best['peak_rss'] is not None:
+        metrics['peak KB'] = best['peak_rss']
+    rss = f"{metrics['peak KB'] / 1024:.1f}MB" if 'peak KB' in metrics else "-"
+    rate = f"{metrics['MB/s']:10.1f} MB/s" if 'MB/s' in metrics else f"{'-':>10} MB/s"
+    print(f"{name:<40} {metrics['ms/run']:12.3f} ms/run {metrics['allocs/run']:10d} allocs/run {rate}  峰值内存 {rss}")
+    return {name: metrics}
+
+def compare_with_baseline(results, baseline, threshold):
+    """返回退化的指标 [(名称, 指标, 基线, 当前)]"""
+    regressions = []
+    for key, old_metrics in baseline['results'].items():
+        for metric, old in old_metrics.items():
+            new = results.get(key, {}).get(metric)
+            if new is None:
+                continue
+            if metric in COUNTS:
+                worse = new > old * 1.001 + 1e-6
+            elif metric in HIGHER_IS_BETTER:
+                worse = new < old / (1 + threshold)
+            else:
+                worse = new > old * (1 + threshold)
+            if worse:
+                regressions.append((key, metric, old, new))
+    return regressions
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Meta 运行时基准测试")
+    arg_parser.add_argument('names', nargs='*', help="要运行的基准测试 (默认全部)")
+    arg_parser.add_argument('--profile', choices=list(meta_compiler.BUILD_PROFILES), default='release')
+    arg_parser.add_argument('--baseline', nargs='?', const=BASELINE_FILE, metavar='FILE',
+                            help="与基线比较 (默认: benchmarks/baseline.json)，有退化时退出码为 1")
+    arg_parser.add_argument('--save-baseline', nargs='?', const=BASELINE_FILE, metavar='FILE',
+                            help="把本次结果保存为基线；只运行部分基准测试时合并到已有的基线中")
+    arg_parser.add_argument('--threshold', type=float, default=0.15,
+                            help="时间、吞吐量与内存的退化阈值 (默认: 0.15，即 15%%)")
+    args = arg_parser.parse_args()
+
+    names = args.names or available_benchmarks()
+    options = meta_compiler.BuildOptions(profile=args.profile, use_cache=False)
+    print(f"构建配置: {options.describe()}")
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        launcher = meta_compiler.rss_launcher(work_dir, options.compiler)
+        for name in names:
+            print(f"== {name} ==")
+            if name.endswith('.meta'):
+                program_results = run_meta_program(name, options, work_dir, launcher)
+                if program_results is None:
+                    return 1
+                results.update(program_results)
+                continue
+            exe_file = build_benchmark(name, options, work_dir)
+            if exe_file is None:
+                print(f"错误: 基准测试 {name} 编译失败")
+                return 1
+            for bench_name, metrics in run_harness(exe_file).items():
+                results[f"{name}/{bench_name}"] = metrics
+
+    if args.save_baseline:
+        baseline = {'profile': args.profile, 'results': {}}
+        if os.path.exists(args.save_baseline):
+            with open(args.save_baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            if baseline.get('profile') != args.profile:
+                baseline = {'profile': args.profile, 'results': {}}
+        baseline['results'].update(results)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write('\n')
+        print(f"基线已保存: {args.save_baseline} ({len(baseline['results'])} 项)")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('profile') != args.profile:
+            print(f"错误: 基线使用的构建配置是 {baseline.get('profile')}，本次是 {args.profile}")
+            return 1
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        print(f"== 与基线比较 (阈值 {args.threshold:.0%}) ==")
+        for key, metric, old, new in regressions:
+            print(f"退化: {key} {metric}: {old:g} -> {new:g}")
+        compared = sum(key in baseline['results'] for key in results)
+        print(f"比较 {compared} 项，{len(regressions)} 个指标退化")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
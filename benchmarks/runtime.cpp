@@ -0,0 +1,119 @@
+// track-allocs
+// 运行时基本操作：any 运算与比较、any 的输出、MetaBase::input、BigInt 与 __int128 的格式化
+// 每项单独测量 ns/op 与 allocs/op，输出类的操作另外给出吞吐量
+
+// 丢弃输出、只统计字节数的流，测量格式化本身而不是终端或文件
+struct CountingBuffer : std::streambuf {
+    long long bytes = 0;
+    int overflow(int c) override {
+        ++bytes;
+        return c;
+    }
+    std::streamsize xsputn(const char*, std::streamsize n) override {
+        bytes += n;
+        return n;
+    }
+};
+
+int main() {
+    const long long N = 1000000;
+    CountingBuffer counter;
+    std::ostream sink(&counter);
+
+    const any i1 = 12345, i2 = 678;
+    const any d1 = 3.25, d2 = 1.5;
+    const any s1 = string("hello"), s2 = string("world");
+    meta_bench("any + any (int)", N, [&] {
+        any acc = 0;
+        for (long long i = 0; i < N; ++i) acc = i1 + i2;
+        meta_keep(acc);
+    });
+    meta_bench("any + any (double)", N, [&] {
+        any acc = 0.0;
+        for (long long i = 0; i < N; ++i) acc = d1 + d2;
+        meta_keep(acc);
+    });
+    meta_bench("any + any (int, double)", N, [&] {
+        any acc = 0.0;
+        for (long long i = 0; i < N; ++i) acc = i1 + d2;
+        meta_keep(acc);
+    });
+    meta_bench("any * any (int)", N, [&] {
+        any acc = 0;
+        for (long long i = 0; i < N; ++i) acc = i1 * i2;
+        meta_keep(acc);
+    });
+    meta_bench("any + any (string)", N, [&] {
+        any acc;
+        for (long long i = 0; i < N; ++i) acc = s1 + s2;
+        meta_keep(acc);
+    });
+    meta_bench("any < any (int)", N, [&] {
+        long long count = 0;
+        for (long long i = 0; i < N; ++i) count += i1 < i2;
+        meta_keep(count);
+    });
+    meta_bench("any == any (string)", N, [&] {
+        long long count = 0;
+        for (long long i = 0; i < N; ++i) count += s1 == s2;
+        meta_keep(count);
+    });
+
+    auto output_bench = [&](const char* name, const any& value) {
+        counter.bytes = 0;
+        sink << value;
+        long long bytes = counter.bytes * N;
+        meta_bench(name, N, [&] {
+            for (long long i = 0; i < N; ++i) sink << value;
+        }, 5, bytes);
+    };
+    output_bench("cout << any (int)", i1);
+    output_bench("cout << any (double)", d1);
+    output_bench("cout << any (string)", s1);
+
+    // 每行一个数，按 Meta 的 input() 读取
+    const long long LINES = 200000;
+    std::string lines;
+    for (long long i = 0; i < LINES; ++i) {
+        lines += (i % 4 == 0) ? "2.5\n" : std::to_string(i) + "\n";
+    }
+    MetaBase base;
+    std::streambuf* saved = cin.rdbuf();
+    meta_bench("MetaBase::input() (数值)", LINES, [&] {
+        std::istringstream in(lines);
+        cin.rdbuf(in.rdbuf());
+        any acc;
+        for (long long i = 0; i < LINES; ++i) acc = base.input();
+        meta_keep(acc);
+    }, 5, static_cast<long long>(lines.size()));
+    cin.rdbuf(saved);
+
+    // 约 300 位的 BigInt
+    BigInt big(1);
+    for (int i = 0; i < 1000; ++i) big = big + big;
+    const long long BIG_OPS = 20000;
+    counter.bytes = 0;
+    sink << big;
+    meta_bench("BigInt 输出 (约 300 位)", BIG_OPS, [&] {
+        for (long long i = 0; i < BIG_OPS; ++i) sink << big;
+    }, 5, counter.bytes * BIG_OPS);
+    meta_bench("BigInt + BigInt (约 300 位)", BIG_OPS, [&] {
+        BigInt acc;
+        for (long long i = 0; i < BIG_OPS; ++i) acc = big + big;
+        meta_keep(acc);
+    });
+
+    // operator<< 会修改传入的 __int128，每次输出一份副本
+    const __int128 wide = (__int128)1234567890123456789LL * 1000000007;
+    counter.bytes = 0;
+    __int128 probe = wide;
+    sink << probe;
+    meta_bench("__int128 输出", N, [&] {
+        for (long long i = 0; i < N; ++i) {
+            __int128 copy = wide;
+            sink << copy;
+        }
+    }, 5, counter.bytes * N);
+    meta_keep(counter.bytes);
+    return 0;
+}
@@ -0,0 +1,45 @@
+// 处理大数组的子区间：复制到新 vector 与 零复制切片 的对比
+
+int main() {
+    const long long N = 1 << 22;
+    const long long PART = 4096;
+    vector<int> data(N, 1);
+    string text(N, 'a');
+
+    meta_bench("sum(复制子区间到 vector<any>)", N / PART, [&] {
+        long long acc = 0;
+        for (long long start = 0; start + PART <= N; start += PART) {
+            vector<any> part;
+            for (long long i = start; i < start + PART; ++i) part.push_back(data[i]);
+            acc += meta_array::sum(part);
+        }
+        meta_keep(acc);
+    });
+    meta_bench("sum(复制子区间到 vector<int>)", N / PART, [&] {
+        long long acc = 0;
+        for (long long start = 0; start + PART <= N; start += PART) {
+            vector<int> part(data.begin() + start, data.begin() + start + PART);
+            acc += meta_array::sum(part);
+        }
+        meta_keep(acc);
+    });
+    meta_bench("sum(data[i:j]) 切片", N / PART, [&] {
+        long long acc = 0;
+        for (long long start = 0; start + PART <= N; start += PART)
+            acc += meta_array::sum(meta_array::slice(data, start, start + PART));
+        meta_keep(acc);
+    });
+    meta_bench("text.substr(i, n)", N / PART, [&] {
+        size_t acc = 0;
+        for (long long start = 0; start + PART <= N; start += PART)
+            acc += text.substr(start, PART).size();
+        meta_keep(acc);
+    });
+    meta_bench("text[i:j] 切片 (string_view)", N / PART, [&] {
+        size_t acc = 0;
+        for (long long start = 0; start + PART <= N; start += PART)
+            acc += meta_array::slice(text, start, start + PART).size();
+        meta_keep(acc);
+    });
+    return 0;
+}
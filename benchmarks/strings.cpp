@@ -0,0 +1,72 @@
+// 字符串拼接：any operator+、旧的 stringstream 实现 与 字符串构建器 的对比
+
+// 修改前的 any operator+ 实现，用作对照
+any legacy_concat(const any& lhs, const any& rhs) {
+    if (lhs.type() == typeid(string) && rhs.type() == typeid(string)) {
+        return any(any_cast<string>(lhs) + any_cast<string>(rhs));
+    }
+    stringstream ss;
+    ss << lhs << rhs;
+    return any(ss.str());
+}
+
+int main() {
+    const long long APPENDS = 1000000;
+    const long long QUADRATIC = 100000;  // s = s + x 是平方复杂度，10^6 次需要数分钟
+    const any piece = string("x");
+    const any number = 12345;
+
+    meta_bench("s = s + \"x\"     (any, 旧实现, 10^5)", QUADRATIC, [&] {
+        any s = string();
+        for (long long i = 0; i < QUADRATIC; ++i) s = legacy_concat(s, piece);
+        meta_keep(s);
+    }, 1);
+    meta_bench("s = s + \"x\"     (any, 10^5)", QUADRATIC, [&] {
+        any s = string();
+        for (long long i = 0; i < QUADRATIC; ++i) s = s + piece;
+        meta_keep(s);
+    }, 1);
+    meta_bench("\"id\" + 12345     (旧实现: stringstream)", APPENDS, [&] {
+        const any prefix = "id";
+        for (long long i = 0; i < APPENDS; ++i) {
+            any s = legacy_concat(prefix, number);
+            meta_keep(s);
+        }
+    });
+    meta_bench("\"id\" + 12345     (快速路径)", APPENDS, [&] {
+        const any prefix = "id";
+        for (long long i = 0; i < APPENDS; ++i) {
+            any s = prefix + number;
+            meta_keep(s);
+        }
+    });
+    meta_bench("std::string += \"x\"          (10^6)", APPENDS, [&] {
+        string s;
+        for (long long i = 0; i < APPENDS; ++i) s += "x";
+        meta_keep(s);
+    });
+    meta_bench("append(sb, 字面量)          (10^6)", APPENDS, [&] {
+        constexpr string_view literal = "x";
+        MetaStringBuilder sb;
+        for (long long i = 0; i < APPENDS; ++i) sb.append(literal);
+        meta_keep(sb);
+    });
+    meta_bench("append(sb, any 字符串)      (10^6)", APPENDS, [&] {
+        MetaStringBuilder sb;
+        for (long long i = 0; i < APPENDS; ++i) sb.append(piece);
+        meta_keep(sb);
+    });
+    meta_bench("append(sb, 整数)            (10^6)", APPENDS, [&] {
+        MetaStringBuilder sb;
+        for (long long i = 0; i < APPENDS; ++i) sb.append(i);
+        meta_keep(sb);
+    });
+    meta_bench("append(sb, 字面量) reserve 后 (10^6)", APPENDS, [&] {
+        constexpr string_view literal = "x";
+        MetaStringBuilder sb;
+        sb.reserve(APPENDS);
+        for (long long i = 0; i < APPENDS; ++i) sb.append(literal);
+        meta_keep(sb);
+    });
+    return 0;
+}
@@ -1,6 +1,19 @@
 # meta_compiler.py
 
 import os
+import sys
+import shlex
+import shutil
+import re
+import json
+import hashlib
+import argparse
+import asyncio
+import threading
+import subprocess
+import time
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 class MetaLangError(Exception):
     """Meta语言错误基类"""
     def __init__(self, line_number, code, reason):
@@ -11,7 +24,7 @@ class MetaLangError(Exception):
     def __str__(self):
         return (
             f"\n{self.__class__.__name__} : {self.reason}\n"
-            f"所在位置 : 行 {int((self.line_number+1)/2)}\n"
+            f"所在位置 : 行 {self.line_number}\n"
             f"    {self.code}\n"
             f"     ^\n"
             f"CompilerError : <{self.__class__.__name__}>\n"
@@ -58,7 +71,20 @@ class TokenType:
     DELETE = 'DELETE'
     EXCLAMATION = '!'  # 添加宏标识符
     GET = 'GET'  # 添加get模板支持
+    QUESTION = '?'  # get?<T>(x) 不抛异常的取值
     INCLUDE = 'INCLUDE'
+    # 表达式中的运算符
+    PLUS = '+'
+    MINUS = '-'
+    STAR = '*'
+    SLASH = '/'
+    PERCENT = '%'
+    EQ = '=='
+    NE = '!='
+    LE = '<='
+    GE = '>='
+    AND = '&&'
+    OR = '||'
 
 class Token:
     def __init__(self, type_, value=None, line_number=1):
@@ -67,6 +93,23 @@ class Token:
         self.line_number = line_number
 
 class Lexer:
+    TWO_CHAR_OPERATORS = {
+        '==': TokenType.EQ,
+        '!=': TokenType.NE,
+        '<=': TokenType.LE,
+        '>=': TokenType.GE,
+        '&&': TokenType.AND,
+        '||': TokenType.OR,
+    }
+    # '-' 在 '->' 之后判断
+    ONE_CHAR_OPERATORS = {
+        '+': TokenType.PLUS,
+        '-': TokenType.MINUS,
+        '*': TokenType.STAR,
+        '/': TokenType.SLASH,
+        '%': TokenType.PERCENT,
+    }
+
     def __init__(self, text):
         self.text = text
         self.pos = 0
@@ -86,9 +129,8 @@ class Lexer:
             self.current_char = None
 
     def skip_whitespace(self):
+        # 行数由 advance 统计
         while self.current_char is not None and self.current_char.isspace():
-            if self.current_char == '\n':
-                self.line_number += 1  # 遇到换行符时增加行数
             self.advance()
 
     def get_identifier(self):
@@ -113,6 +155,13 @@ class Lexer:
         while self.current_char is not None and self.current_char.isdigit():
             result.append(self.current_char)
             self.advance()
+        # 小数部分：小数点后必须是数字
+        if self.current_char == '.' and self.text[self.pos+1:self.pos+2].isdigit():
+            result.append('.')
+            self.advance()
+            while self.current_char is not None and self.current_char.isdigit():
+                result.append(self.current_char)
+                self.advance()
         return ''.join(result)
 
     def next_token(self):
@@ -120,6 +169,11 @@ class Lexer:
             if self.current_char.isspace():
                 self.skip_whitespace()
                 continue
+            operator = self.text[self.pos:self.pos+2]
+            if operator in self.TWO_CHAR_OPERATORS:
+                self.advance()
+                self.advance()
+                return Token(self.TWO_CHAR_OPERATORS[operator], operator, self.line_number)
             if self.current_char == '<':
                 self.advance()
                 return Token(TokenType.LT, '<', self.line_number)
@@ -160,6 +214,9 @@ class Lexer:
             if self.current_char == '!':
                 self.advance()
                 return Token(TokenType.EXCLAMATION, '!', self.line_number)
+            if self.current_char == '?':
+                self.advance()
+                return Token(TokenType.QUESTION, '?', self.line_number)
             if self.current_char == 'o' and self.text[self.pos:self.pos+5] == 'owner':
                 self.advance()
                 self.advance()
@@ -251,7 +308,8 @@ class Lexer:
                 return Token(TokenType.STRING, string_value, self.line_number)
             if self.current_char.isdigit():
                 number_value = self.get_number()
-                return Token(TokenType.NUMBER, int(number_value), self.line_number)
+                number_value = float(number_value) if '.' in number_value else int(number_value)
+                return Token(TokenType.NUMBER, number_value, self.line_number)
             if self.current_char == 't' and self.text[self.pos:self.pos+4] == 'true':
                 self.advance()
                 self.advance()
@@ -288,6 +346,10 @@ class Lexer:
             if self.current_char == '^':
                 self.advance()
                 return Token(TokenType.DEREF, '^', self.line_number)
+            if self.current_char in self.ONE_CHAR_OPERATORS:
+                char = self.current_char
+                self.advance()
+                return Token(self.ONE_CHAR_OPERATORS[char], char, self.line_number)
             if self.current_char.isalpha():
                 ident = self.get_identifier()
                 if ident == 'Main':
@@ -311,9 +373,111 @@ class Lexer:
                 else:
                     self.error("无效的数组维度")
         return dimensions
-        
-MOD = []
-default_code = ''  # 定义为全局变量
+
+class MetaType:
+    """编译期的类型：scalar（name 为类型名）、variant（args 为可选的类型）、
+    array（args 为元素类型，dim 为长度，None 表示动态数组）、template（name<args...>）
+    以及 class（用作数据类型的 Meta 类，name 为类名）
+    相同结构的类型只创建一次，可以直接比较、作为字典的键；C++ 写法在第一次输出时生成"""
+    interned = {}
+    compatible = {}  # (变量类型, 值类型) -> 能否直接赋值，见 accepts
+    # C++ 写法与 Meta 中的名字不同的标量类型
+    SPELLINGS = {'string': 'std::string'}
+    # 标量类型的对齐字节数，其他类型（指针、std::any、字符串与容器等）按 8 字节对齐
+    ALIGNMENTS = {'bool': 1, 'char': 1, 'short': 2, 'short int': 2, 'int': 4, 'float': 4,
+                  'long double': 16, '__int128': 16}
+
+    def __new__(cls, kind, name='', args=(), dim=None):
+        key = (kind, name, args, dim)
+        meta_type = cls.interned.get(key)
+        if meta_type is None:
+            meta_type = super().__new__(cls)
+            meta_type.kind, meta_type.name, meta_type.args, meta_type.dim = key
+            meta_type.spelling = None
+            cls.interned[key] = meta_type
+        return meta_type
+
+    @classmethod
+    def scalar(cls, name):
+        return cls('scalar', name)
+
+    @classmethod
+    def variant(cls, members):
+        """多个类型组成 std::variant，只有一个类型时就是它本身"""
+        if len(members) == 1:
+            return members[0]
+        return cls('variant', args=tuple(members))
+
+    @classmethod
+    def array(cls, element, dim=None):
+        return cls('array', args=(element,), dim=dim)
+
+    @classmethod
+    def template(cls, name, *args):
+        return cls('template', name, args)
+
+    @classmethod
+    def record(cls, name):
+        return cls('class', name)
+
+    @property
+    def cpp(self):
+        if self.spelling is None:
+            if self.kind == 'scalar':
+                self.spelling = self.SPELLINGS.get(self.name, self.name)
+            elif self.kind == 'variant':
+                self.spelling = f"std::variant<{', '.join(member.cpp for member in self.args)}>"
+            elif self.kind == 'array':
+                element = self.args[0].cpp
+                self.spelling = f"std::vector<{element}>" if self.dim is None else f"std::array<{element}, {self.dim}>"
+            elif self.kind == 'class':
+                self.spelling = f"meta_class::{self.name}"
+            else:
+                self.spelling = f"{self.name}<{', '.join(str(arg) for arg in self.args)}>"
+        return self.spelling
+
+    def accepts(self, value_type):
+        """value_type 的值能否直接保存到这个类型的变量中：any 接受任何值，variant 接受其中的类型"""
+        key = (self, value_type)
+        if key not in self.compatible:
+            if self.kind == 'variant':
+                self.compatible[key] = value_type in self.args
+            else:
+                self.compatible[key] = self is ANY_TYPE or self is value_type
+        return self.compatible[key]
+
+    def alignment(self, records):
+        """对齐字节数，records 为已生成的结构体的对齐，见 generate_class_structs"""
+        if self.kind == 'scalar':
+            return self.ALIGNMENTS.get(self.name, 8)
+        if self.kind == 'variant':
+            return max(member.alignment(records) for member in self.args)
+        if self.kind == 'array' and self.dim is not None:
+            return self.args[0].alignment(records)
+        if self.kind == 'class':
+            return records.get(self.name, 8)
+        return 8
+
+    def __str__(self):
+        return self.cpp
+
+    def __repr__(self):
+        return f"MetaType({self.cpp})"
+
+def scalar_types(*names):
+    return [MetaType.scalar(name) for name in names]
+
+ANY_TYPE = MetaType.scalar('std::any')
+VOID_TYPE = MetaType.scalar('void')
+AUTO_TYPE = MetaType.scalar('auto')
+BOOL_TYPE = MetaType.scalar('bool')
+INT_TYPE = MetaType.scalar('int')
+LONG_LONG_TYPE = MetaType.scalar('long long')
+DOUBLE_TYPE = MetaType.scalar('double')
+FUTURE_TYPE = MetaType.scalar('meta_task::Future')
+STRING_BUILDER_TYPE = MetaType.scalar('MetaStringBuilder')
+STRING_TYPE = MetaType.scalar('string')
+
 class Parser: 
     CPP_KEYWORDS = [
         'alignas', 'alignof', 'and', 'and_eq', 'asm', 'auto',
@@ -333,33 +497,160 @@ class Parser:
         'xor', 'xor_eq'
     ]
     TYPE_MAP = {
-        'nbr': ['short', 'int', 'long', 'long long', 'float', 'double', 'long double'],
-        'int':['short','int','long','long long'],
-        'int16':['short int'],
-        'int32':['int'],
-        'int64':['long long int'],
-        'int128':['__int128'],
-        'infint':['BigInt'],
-        'float':['float','double','long double'],
-        'float32':['float'],
-        'float64':['double'],
-        'float128':['long double'],
-        'str': ['string', 'const char*'],
-        'cstr': ['const char*'],
-        'char': ['char'],
-        'bool': ['bool'],
-        'any': ['std::any'],
-        'void': ['void'],
-        'all': ['short','int','long','long long','float','double','long double','string','const char*','bool'],
-        'object': ['std::any'],
-        'auto': ['auto']
-    }
-
-    def __init__(self, lexer):
+        'nbr': scalar_types('short', 'int', 'long', 'long long', 'float', 'double', 'long double'),
+        'int': scalar_types('short', 'int', 'long', 'long long'),
+        'int16': scalar_types('short int'),
+        'int32': scalar_types('int'),
+        'int64': scalar_types('long long int'),
+        'int128': scalar_types('__int128'),
+        'infint': scalar_types('BigInt'),
+        'float': scalar_types('float', 'double', 'long double'),
+        'float32': scalar_types('float'),
+        'float64': scalar_types('double'),
+        'float128': scalar_types('long double'),
+        'str': scalar_types('string', 'const char*'),
+        'cstr': scalar_types('const char*'),
+        'strbuf': scalar_types('MetaStringBuilder'),
+        'char': scalar_types('char'),
+        'bool': scalar_types('bool'),
+        'any': scalar_types('std::any'),
+        'void': scalar_types('void'),
+        'all': scalar_types('short', 'int', 'long', 'long long', 'float', 'double', 'long double', 'string',
+                            'const char*', 'bool'),
+        'object': scalar_types('std::any'),
+        'auto': scalar_types('auto')
+    }
+    # 类型族在 get<T>(x) 中的结果类型
+    GET_RESULT_TYPES = {
+        'nbr': MetaType.scalar('long double'),
+        'int': MetaType.scalar('long long'),
+        'float': MetaType.scalar('long double'),
+        'str': MetaType.scalar('string'),
+    }
+    # 数组越界检查模式
+    BOUNDS_MODES = {
+        'safe': '所有下标访问都在运行时检查，越界时报告 Meta 源码行号',
+        'fast': '能在编译期证明不越界的访问不做检查，其余访问仍在运行时检查',
+    }
+    # 字符串构建器的内置操作：名称 -> 参数个数
+    STRING_BUILDER_BUILTINS = {
+        'append': 2,
+        'build': 1,
+        'clear': 1,
+        'reserve': 2,
+        'size': 1,
+    }
+    # 多维数组的内存布局
+    ARRAY_LAYOUTS = {
+        'row': 'RowMajor',
+        'col': 'ColMajor',
+    }
+    # 数组批量操作：名称 -> 参数个数
+    ARRAY_BUILTINS = {
+        'fill': 2,
+        'sum': 1,
+        'min': 1,
+        'max': 1,
+        'map': 2,
+        'copy': 2,
+        'reserve': 2,
+        'resize': 2,
+        'push': 2,
+        'size': 1,
+    }
+    # 修改第一个参数的数组批量操作
+    ARRAY_MUTATORS = ('fill', 'map', 'copy', 'reserve', 'resize', 'push')
+    # 可能改变数组长度的批量操作
+    ARRAY_RESIZERS = ('copy', 'reserve', 'resize', 'push')
+    # 通过 data() 指针遍历元素的批量操作，不能用于按位存储的 bool 数组
+    POINTER_BUILTINS = ('fill', 'sum', 'min', 'max', 'map', 'copy')
+    # 二元运算符：Token 类型 -> (C++ 运算符, 优先级)
+    BINARY_OPERATORS = {
+        TokenType.OR: ('||', 1),
+        TokenType.AND: ('&&', 2),
+        TokenType.EQ: ('==', 3),
+        TokenType.NE: ('!=', 3),
+        TokenType.LT: ('<', 4),
+        TokenType.GT: ('>', 4),
+        TokenType.LE: ('<=', 4),
+        TokenType.GE: ('>=', 4),
+        TokenType.PLUS: ('+', 5),
+        TokenType.MINUS: ('-', 5),
+        TokenType.STAR: ('*', 6),
+        TokenType.SLASH: ('/', 6),
+        TokenType.PERCENT: ('%', 6),
+    }
+    # 原生数值类型按 C++ 算术转换的等级排列
+    NUMERIC_RANKS = {MetaType.scalar(name): rank for name, rank in {
+        'short': 0, 'short int': 0,
+        'int': 1,
+        'long': 2,
+        'long long': 3, 'long long int': 3,
+        'float': 4,
+        'double': 5,
+        'long double': 6,
+    }.items()}
+    INTEGER_TYPES = tuple(scalar_types('short', 'short int', 'int', 'long', 'long long', 'long long int'))
+    # 可以特化的原生数值参数类型 -> 特化函数名中的缩写
+    SPECIALIZATION_TAGS = {MetaType.scalar(name): tag for name, tag in {
+        'short': 's', 'short int': 's',
+        'int': 'i',
+        'long': 'l',
+        'long long': 'x', 'long long int': 'x',
+        'float': 'f',
+        'double': 'd',
+    }.items()}
+    # 并行归约：名称 -> 合并操作
+    PARALLEL_REDUCTIONS = {
+        'sum': 'meta_task::Sum{}',
+        'min': 'meta_task::Min{}',
+        'max': 'meta_task::Max{}',
+        'count': 'meta_task::Sum{}',
+    }
+    # 控制流语句 -> 解析函数
+    CONTROL_STATEMENTS = {
+        'if': 'parse_if',
+        'while': 'parse_while',
+        'for': 'parse_for',
+        'parallel': 'parse_parallel_for',
+        'break': 'parse_loop_jump',
+        'continue': 'parse_loop_jump',
+    }
+
+    def __init__(self, lexer, bounds='fast', modules=None, base_dir='.', track_allocs=False, source_name=None):
         self.lexer = lexer
         self.current_token = self.lexer.next_token()
         self.variables = {}  # 存储局部变量信息
         self.class_variables = {}  # 存储类成员变量信息
+        self.bounds = bounds  # 数组越界检查模式，见 BOUNDS_MODES
+        self.track_allocs = track_allocs  # 统计各函数的内存分配，见 alloc_scope
+        self.source_name = source_name  # 源文件路径，不为 None 时生成 #line 指令，见 line_directive
+        self.class_name = None  # 当前所在的类
+        self.string_literals = {}  # 字符串字面量 -> 静态存储中的名字
+        self.modules = modules or ModuleLoader(BuildOptions(bounds=bounds))  # 模块加载器
+        self.base_dir = base_dir  # include 相对路径的起点
+        self.imports = {}  # 模块名 -> 模块接口
+        self.used_modules = []  # 实际调用过的模块，只有它们参与链接
+        self.runtime_features = set()  # 生成的代码隐式用到的运行时部分，见 RUNTIME_TRIGGERS
+        self.functions = {}  # Meta 函数名 -> 参数个数、修改的成员变量、调用的函数，用于检查任务间的数据竞争
+        self.current_function = None
+        self.pending_tasks = set()  # 当前函数中已 spawn、尚未 await 的任务
+        self.task_checks = []  # 需要在所有函数解析完后检查的 spawn 与调用
+        self.expr_types = {}  # 生成的表达式 -> 静态类型，见 type_of
+        self.owned_slices = {}  # 数组切片表达式 -> 复制成数组后的类型、维度与元素类型，见 owned_slice
+        self.loops = []  # 当前所在的循环，由内到外记录循环变量与被改变长度的数组
+        self.parallel_loops = []  # 当前所在的 parallel for 与并行归约，记录循环外的变量及其读写
+        self.signatures = {}  # 函数名 -> 参数类型、返回类型与函数体位置，解析前预先扫描得到
+        self.return_type = ANY_TYPE  # 当前函数的返回类型
+        self.specializations = {}  # (函数名, 各参数的类型缩写) -> 按实参类型特化的函数
+        self.dynamic_exprs = set()  # 特化函数中来自无类型参数的表达式，按 any 的规则计算
+        self.return_types = []  # 当前函数中 return 的表达式类型，用于推断特化函数的返回类型
+        self.move_candidates = {}  # 占位符 -> 传给函数后可能不再使用的局部变量，见 move_if_last_use
+        self.block_depth = 0
+        self.class_names = set()  # 程序中所有的类名，类可以用作数据类型，见 class_type
+        self.classes = {}  # 类名 -> 已解析的成员变量，以及是否有需要在程序对象中初始化的成员
+        self.used_classes = set()  # 已经用作数据类型的类
+        self.class_fields = []  # 当前类中声明的成员变量
 
     def error(self, msg):
         raise Error(self.current_token.line_number, "", msg)
@@ -372,69 +663,404 @@ class Parser:
 
     def peek_next_token(self):
         current_pos = self.lexer.pos
+        current_char = self.lexer.current_char
+        line_number = self.lexer.line_number
         current_token = self.current_token
         next_token = self.lexer.next_token()
         self.lexer.pos = current_pos
+        self.lexer.current_char = current_char
+        self.lexer.line_number = line_number
         self.current_token = current_token
         return next_token
+
+    def lexer_state(self):
+        return (self.lexer.pos, self.lexer.current_char, self.lexer.line_number, self.current_token)
+
+    def restore_lexer_state(self, state):
+        self.lexer.pos, self.lexer.current_char, self.lexer.line_number, self.current_token = state
     def parse_include_statement(self):
-        global default_code
+        """include "x.meta"; 由模块加载器按搜索路径查找，函数通过 x.f(...) 调用"""
         self.eat(TokenType.INCLUDE)
         module_name = self.current_token.value
         self.eat(TokenType.STRING)
         self.eat(TokenType.SEMI)
-        if module_name == 'math.meta':
-            default_code+='''
-namespace math{
-    long double pow(long double a,long double b){
-        if(a==1) return 1;
-        if(b==0) return 1;
-        return std::pow(a,b);
-    }
-    long double sqrt(long double a,long double b){
-        return std::pow(a,1.0/b);
-    }
-    long double log(long double a,long double b){
-        return std::log(b)/std::log(a);
-    }
-}
-'''
-            MOD.append('math')
-        else:
-            self.error(f"不支持的模块：{module_name}")
-        return f'// 导入模块 {module_name}'
+        try:
+            module = self.modules.load(module_name, self.base_dir)
+        except ValueError as e:
+            self.error(str(e))
+        namespace = module['name']
+        if namespace in self.imports and self.imports[namespace]['path'] != module['path']:
+            self.error(f"模块名冲突: {namespace} ({self.imports[namespace]['path']} 与 {module['path']})")
+        self.imports[namespace] = module
+        return {
+            'type': 'include',
+            'name': module_name,
+            'data': module
+        }
+
+    def parse_module_call(self, namespace):
+        """x.f(args) -> x::f(args)，按模块接口检查函数名与参数个数"""
+        self.eat(TokenType.DOT)
+        func_name = self.current_token.value
+        self.eat(TokenType.IDENTIFIER)
+        functions = self.imports[namespace]['functions']
+        if func_name not in functions:
+            self.error(f"模块 {namespace} 中没有函数: {func_name}")
+        self.eat(TokenType.LPAREN)
+        args = self.parse_call_arguments()
+        self.eat(TokenType.RPAREN)
+        if len(args) != functions[func_name]:
+            self.error(f"{namespace}.{func_name} 需要 {functions[func_name]} 个参数")
+        if namespace not in self.used_modules:
+            self.used_modules.append(namespace)
+        # 没有原生头文件的模块函数都返回 any
+        result_type = None if self.imports[namespace]['header'] else ANY_TYPE
+        args = self.move_if_last_use(args)
+        return self.typed(f'{namespace}::{func_name}({", ".join(args)})', result_type)
+
     def parse_index_expression(self):
-        if self.current_token.type == TokenType.NUMBER:
-            index = str(self.current_token.value)
-            self.eat(TokenType.NUMBER)
-        elif self.current_token.type == TokenType.IDENTIFIER:
-            var_name = self.current_token.value
-            if var_name not in self.variables and var_name not in self.class_variables:
-                self.error(f"使用未声明的变量: {var_name}")
-            index = var_name
-            self.eat(TokenType.IDENTIFIER)
-        else:
+        if self.current_token.type in (TokenType.COLON, TokenType.RBRACKET):
+            self.error("无效的索引表达式")
+        index = self.parse_expression()
+        if self.is_task(index) or self.is_slice(index):
             self.error("无效的索引表达式")
         return index
 
-    def parse_subscript_or_slice(self, var_name):
-        self.eat(TokenType.LBRACKET)
-        start_index = self.parse_index_expression()
-        self.eat(TokenType.RBRACKET)
-        
-        # 检查索引是否超出数组大小
+    def parse_subscript_or_slice(self, var_name, write=False):
+        self.check_alive(var_name)
+        self.require_dynamic(not self.is_dynamic(var_name))
+        indices = []
+        slice_range = None
+        while self.current_token.type == TokenType.LBRACKET and slice_range is None:
+            self.eat(TokenType.LBRACKET)
+            start = '0' if self.current_token.type == TokenType.COLON else self.parse_index_expression()
+            if self.current_token.type == TokenType.COLON:
+                # 切片 [start:end]，end 省略时到末尾
+                self.eat(TokenType.COLON)
+                end = None if self.current_token.type == TokenType.RBRACKET else self.parse_index_expression()
+                slice_range = (start, end)
+            else:
+                indices.append(start)
+            self.eat(TokenType.RBRACKET)
+
+        info = self.lookup_variable(var_name)
+        dimensions = info['dimensions'] if info else []
+        first = indices[0] if indices and slice_range is None else None
+        if write:
+            self.record_write(var_name, first)
+        else:
+            self.record_parallel_read(var_name, first)
+        if slice_range is not None:
+            return self.lower_slice(var_name, info, indices, slice_range)
+        # 第 k 个下标对应声明中的第 k 维
+        for position, index in enumerate(indices[:len(dimensions)]):
+            size = dimensions[position]
+            if size is not None and index.isdigit() and int(index) >= size:
+                self.error(f"数组索引 {index} 超出声明的大小 {size}")
+
+        checked = [self.needs_bounds_check(var_name, dimensions, position, index) for position, index in enumerate(indices)]
+        line = self.source_line()
+        element = info.get('element') if info and len(indices) == len(dimensions) else None
+        if info and info.get('flat'):
+            if len(indices) != len(dimensions):
+                self.error(f"多维数组 {var_name} 需要 {len(dimensions)} 个下标")
+            if any(checked):
+                return self.typed(f'{var_name}.at({line}, {", ".join(indices)})', element)
+            return self.typed(f'{var_name}({", ".join(indices)})', element)
+        expr = var_name
+        for position, index in enumerate(indices):
+            checked_expr = f'meta_array::at({expr}, {index}, {line})'
+            unchecked_expr = f'{expr}[{index}]'
+            if isinstance(checked[position], dict):
+                # 循环结束时才知道循环体中是否改变了数组长度，先放一个占位符
+                loop = checked[position]
+                marker = f"\0{id(loop)}.{len(loop['deferred'])}\0"
+                loop['deferred'].append((marker, var_name, checked_expr, unchecked_expr))
+                expr = marker
+            elif checked[position]:
+                expr = checked_expr
+            else:
+                expr = unchecked_expr
+        return self.typed(expr, element)
+
+    def needs_bounds_check(self, var_name, dimensions, position, index):
+        """判断一次下标访问是否需要运行时越界检查
+        返回循环信息时表示：只要循环体中没有改变数组长度就不需要检查"""
+        if position >= len(dimensions):
+            return False  # 不是声明过的数组维度，无法检查
+        if self.bounds == 'safe':
+            return True
+        # 常量下标已在编译期与固定长度比较过
+        size = dimensions[position]
+        if size is not None and index.isdigit():
+            return False
+        # 循环变量的取值范围是 [start, end)
+        loop = self.induction_loop(index)
+        if loop is None or not loop['start'].isdigit():
+            return True
+        if size is not None and loop['end'].isdigit() and int(loop['end']) <= size:
+            return False
+        if position == 0 and loop['end'] == f'meta_array::size({var_name})' and var_name in self.variables:
+            return loop
+        return True
+
+    def induction_loop(self, var_name):
+        info = self.variables.get(var_name)
+        if info is None or not info.get('induction'):
+            return None
+        for loop in reversed(self.loops):
+            if loop.get('var') == var_name:
+                return loop
+        return None
+
+    def record_resize(self, var_name, keep_borrows=False):
+        """数组长度可能在所在的各层循环中改变，这些循环中对它的访问不能省略越界检查
+        数组可能因此重新分配，除非 keep_borrows，指向其元素的借用随之失效"""
+        for loop in self.loops:
+            loop['resized'].add(var_name)
+        if not keep_borrows:
+            self.invalidate_borrows(var_name)
+
+    def is_element_borrow(self, info):
+        """切片视图与元素引用指向数组的元素，数组重新分配后失效；整体借用引用的是数组本身"""
+        return info.get('view') or info.get('element_ref')
+
+    def invalidate_borrows(self, var_name):
+        info = self.lookup_variable(var_name)
+        while info is not None and not info['owner'] and info.get('borrowed_by') and not self.is_element_borrow(info):
+            # 通过整体借用改变的是被借用的数组
+            var_name = info['borrowed_by']
+            info = self.lookup_variable(var_name)
+        for name, borrow in self.variables.items():
+            if (borrow.get('borrowed_by') != var_name or not self.is_element_borrow(borrow)
+                    or borrow.get('deleted') or borrow.get('invalidated')):
+                continue
+            if any(use is borrow for loop in self.loops[borrow['loop_depth']:] for use in loop['borrow_uses']):
+                # 循环体中前面用到的借用在下一次迭代时已经失效
+                self.error(f"循环中改变数组 {var_name} 的长度会使循环外的借用 {name} 失效，循环体中不能再使用它；"
+                           f"请在循环中借用")
+            borrow['invalidated'] = var_name
+
+    def source_line(self):
+        """当前 Token 对应的 Meta 源码行号"""
+        return self.current_token.line_number
+    def lower_slice(self, var_name, info, indices, slice_range):
+        if info and info.get('flat'):
+            self.error(f"多维数组 {var_name} 不支持切片")
+        self.require_byte_elements(var_name, "切片")
+        dimensions = info['dimensions'] if info else []
+        start, end = slice_range
+        # 对切片所在维度做编译期检查
+        if len(indices) < len(dimensions):
+            size = dimensions[len(indices)]
+            for bound in (start, end):
+                if size is not None and bound is not None and bound.isdigit() and int(bound) > size:
+                    self.error(f"切片边界 {bound} 超出声明的大小 {size}")
+        if start.isdigit() and end is not None and end.isdigit() and int(start) > int(end):
+            self.error(f"切片起点 {start} 大于终点 {end}")
+        base = var_name + ''.join(f'[{index}]' for index in indices)
+        code = f'meta_array::slice({base}, {start}, {end if end is not None else -1})'
+        owned = self.owned_slice(info, indices)
+        if owned is not None:
+            self.owned_slices[code] = owned
+        return code
+
+    def owned_slice(self, info, indices):
+        """切片复制成数组（to_owned）后的类型、维度与元素类型；字符串切片为 None"""
+        if info is None or (info.get('view') and indices):
+            return None
+        if info.get('view'):
+            return info.get('owned')
+        if not info['dimensions'] or info['type'].kind != 'array':
+            return None
+        slice_type = info['type']
+        for _ in indices:
+            slice_type = slice_type.args[0]
+        return MetaType.array(slice_type.args[0]), [None] + info['dimensions'][len(indices) + 1:], info['element']
+
+    def is_slice(self, expr):
+        return expr.startswith('meta_array::slice(')
+
+    def check_alive(self, var_name):
+        info = self.lookup_variable(var_name)
+        # 传给函数之后又用到的变量不能移动
+        for candidate in self.move_candidates.values():
+            if candidate['info'] is info:
+                candidate['moved'] = False
+        if info is not None and info.get('deleted'):
+            self.error(f"变量 {var_name} 已被销毁，无法使用")
+        self.check_borrow_valid(var_name, info)
+        if info is not None and info.get('task'):
+            self.error(f"任务 {var_name} 只能通过 await({var_name}) 取得结果")
+
+    def check_borrow_valid(self, var_name, info):
+        if info is None or not self.is_element_borrow(info):
+            return
+        if info.get('invalidated'):
+            self.error(f"数组 {info['invalidated']} 的长度可能已经改变，借用 {var_name} 已经失效；请在改变长度之后重新借用")
+        # 记录在哪些循环中用到了循环外的借用，见 invalidate_borrows
+        for loop in self.loops[info['loop_depth']:]:
+            loop['borrow_uses'].append(info)
+
+    def parse_spawn(self):
+        """spawn f(args)：在线程池中异步调用 Meta 函数
+        参数在 spawn 时按值复制到任务中，任务之间不共享局部变量"""
+        line_number = self.current_token.line_number
+        callee = self.current_token.value
+        self.eat(TokenType.IDENTIFIER)
+        if callee in self.imports:
+            self.error("spawn 只能用于当前程序中的 Meta 函数")
+        self.eat(TokenType.LPAREN)
+        args = self.parse_call_arguments()
+        self.eat(TokenType.RPAREN)
+        captures = ['this']
+        for index, (arg, value) in enumerate(zip(args, self.move_if_last_use(args))):
+            info = self.lookup_variable(arg)
+            if info is not None and (not info['owner'] or info.get('view') or info.get('pointer')):
+                self.error(f"借用的变量 {arg} 不能传给 spawn 的任务，否则可能产生数据竞争")
+            # 切片是借用，复制出拥有所有权的数组再交给任务
+            if self.is_slice(arg):
+                value = f"meta_array::to_owned({arg})"
+            captures.append(f"a{index} = any({value})")
+        self.task_checks.append(('spawn', callee, len(args), line_number))
+        self.record_call(callee)
+        param_types = self.signatures[callee]['param_types'] if callee in self.signatures else []
+        names = [f"std::move(a{index})" for index in range(len(args))]
+        names = ', '.join(convert_from_any(name, param_type, self.source_line()) if param_type != ANY_TYPE else name
+                          for name, param_type in zip(names, param_types + [ANY_TYPE] * len(names)))
+        return f"meta_task::spawn([{', '.join(captures)}]() mutable {{ return {callee}({names}); }})"
+
+    def is_task(self, expr):
+        return expr.startswith('meta_task::spawn(')
+
+    def parse_await(self):
+        """await(t)：等待任务结束并取得返回值，任务中的异常在这里重新抛出"""
+        var_name = self.current_token.value
+        self.eat(TokenType.IDENTIFIER)
+        self.eat(TokenType.RPAREN)
+        info = self.lookup_variable(var_name)
+        if info is None or not info.get('task'):
+            self.error(f"await 只能用于 spawn 创建的任务: {var_name}")
+        if info.get('awaited'):
+            self.error(f"任务 {var_name} 已经 await 过")
+        if info['block'] != self.block_depth:
+            self.error(f"任务 {var_name} 需要在创建它的代码块中 await")
+        info['awaited'] = True
+        self.pending_tasks.discard(var_name)
+        return self.typed(f"{var_name}.get()", ANY_TYPE)
+
+    def record_call(self, callee):
+        """记录函数调用；有任务未 await 时，被调用的函数不能修改成员变量"""
+        if self.current_function is None:
+            return
+        self.current_function['calls'].add(callee)
+        if self.pending_tasks:
+            self.task_checks.append(('call', callee, None, self.current_token.line_number))
+        if self.parallel_loops:
+            self.task_checks.append(('parallel', callee, None, self.current_token.line_number))
+
+    def record_member_write(self, var_name):
+        """记录对成员变量的修改；成员变量被所有任务共享，任务运行期间不能修改"""
+        if var_name in self.variables or var_name not in self.class_variables:
+            return
+        if self.parallel_loops:
+            self.error(f"并行循环中不能修改成员变量 {var_name}，所有迭代共享成员变量")
+        if self.pending_tasks:
+            tasks = ', '.join(sorted(self.pending_tasks))
+            self.error(f"任务 {tasks} 尚未 await，不能修改成员变量 {var_name}，否则可能产生数据竞争")
+        if self.current_function is not None:
+            self.current_function['writes'].add(var_name)
+
+    def is_outer(self, context, var_name):
+        """变量是否在并行循环外声明（成员变量总是在循环外）"""
         if var_name in self.variables:
-            dimensions = self.variables[var_name]['dimensions']
-            if dimensions[0] is not None and int(start_index) >= dimensions[0]:
-                self.error(f"数组索引 {start_index} 超出声明的大小 {dimensions[0]}")
-        return f'{var_name}[{start_index}]'
+            return context['outer'].get(var_name) is self.variables[var_name]
+        return var_name in self.class_variables
+
+    def mark_modified(self, var_name):
+        """变量被修改、借用或直接返回；没有这些用法的参数按 const& 传递"""
+        info = self.lookup_variable(var_name)
+        if info is not None:
+            info['modified'] = True
+
+    def record_write(self, var_name, index=None):
+        """记录对变量的修改
+        并行循环体只能修改循环内声明的变量，以及循环外数组中以循环变量为第一个下标的元素"""
+        self.mark_modified(var_name)
+        for context in self.parallel_loops:
+            if not self.is_outer(context, var_name):
+                continue
+            loop_var = context['var']
+            if index == loop_var and not self.is_loop_index(context, index):
+                self.error(f"并行循环变量 {loop_var} 被循环体中同名的变量遮蔽，{var_name}[{loop_var}] 不是本次迭代的元素，"
+                           f"其他迭代可能同时写入；请给内层变量换一个名字")
+            if not self.is_loop_index(context, index):
+                self.error(f"并行循环中不能修改循环外的变量 {var_name}，只能写入 {var_name}[{loop_var}]；"
+                           f"累积结果请使用 parallel sum/min/max/count")
+            info = self.lookup_variable(var_name)
+            if not info['owner'] or info.get('view'):
+                self.error(f"并行循环中不能通过借用的变量 {var_name} 写入数组")
+            # 相邻元素共用同一个字，不同迭代写入不同下标也会产生数据竞争
+            self.require_byte_elements(var_name, "在并行循环中写入")
+            context['writes'].add(var_name)
+
+    def is_loop_index(self, context, index):
+        """index 是否为并行循环变量本身：循环体中同名的内层循环变量或局部变量按变量信息区分"""
+        return index == context['var'] and self.variables.get(index) is context['info']
+
+    def record_parallel_read(self, var_name, index=None):
+        """记录并行循环体对循环外变量的读取，index 为 None 表示读取整个变量"""
+        for context in self.parallel_loops:
+            if self.is_outer(context, var_name):
+                context['reads'].append((var_name, index, self.is_loop_index(context, index)))
+
+    def check_parallel_races(self, context):
+        """循环体写入的数组只能读取本次迭代的元素，也不能通过借用读取"""
+        for var_name, index, own_element in context['reads']:
+            info = self.lookup_variable(var_name)
+            source = info.get('borrowed_by') if info else None
+            if var_name in context['writes'] and not own_element:
+                target = f"{var_name}[{index}]" if index is not None else "整个数组"
+                self.error(f"数组 {var_name} 在并行循环中被写入，不能读取 {target}，其他迭代可能正在写入")
+            if source in context['writes']:
+                self.error(f"{var_name} 借用了并行循环中被写入的数组 {source}，可能产生数据竞争")
+
+    def modified_members(self, func_name, visiting=None):
+        """函数直接或间接修改的成员变量"""
+        visiting = visiting if visiting is not None else set()
+        if func_name in visiting or func_name not in self.functions:
+            return set()
+        visiting.add(func_name)
+        func = self.functions[func_name]
+        writes = set(func['writes'])
+        for callee in func['calls']:
+            writes |= self.modified_members(callee, visiting)
+        return writes
+
+    def check_tasks(self):
+        """所有函数解析完后检查 spawn：任务及任务运行期间调用的函数都不能修改成员变量"""
+        for kind, callee, arity, line_number in self.task_checks:
+            if kind == 'spawn' and callee not in self.functions:
+                raise Error(line_number, "", f"spawn 只能用于当前程序中的 Meta 函数: {callee}")
+            if kind == 'spawn' and self.functions[callee]['params'] != arity:
+                raise Error(line_number, "", f"{callee} 需要 {self.functions[callee]['params']} 个参数")
+            writes = self.modified_members(callee)
+            if writes:
+                reason = {'spawn': "在线程池中运行", 'call': "在任务运行期间被调用", 'parallel': "在并行循环中被调用"}[kind]
+                raise Error(line_number, "",
+                            f"函数 {callee} {reason}，但会修改成员变量 {', '.join(sorted(writes))}，可能产生数据竞争")
+
     def parse_get_template(self):
         self.eat(TokenType.GET)
+        # get?<T>(x) 或 get?<T>(x, 默认值)：类型不匹配时返回默认值
+        optional = self.current_token.type == TokenType.QUESTION
+        if optional:
+            self.eat(TokenType.QUESTION)
         self.eat(TokenType.LT)
         
         # 解析模板类型参数
         type_param = self.current_token.value
-        if type_param not in self.TYPE_MAP:
+        if not self.is_type_name(type_param):
             self.error(f"不支持的 get 模板类型: {type_param}")
         self.eat(TokenType.IDENTIFIER)
         
@@ -445,18 +1071,181 @@ namespace math{
         var_name = self.current_token.value
         if var_name not in self.variables and var_name not in self.class_variables:
             self.error(f"使用未声明的变量: {var_name}")
+        self.check_alive(var_name)
+        self.require_dynamic(not self.is_dynamic(var_name))
         self.eat(TokenType.IDENTIFIER)
+
+        fallback = None
+        if optional and self.current_token.type == TokenType.COMMA:
+            self.eat(TokenType.COMMA)
+            fallback = self.parse_expression()
         
         self.eat(TokenType.RPAREN)
         
         # 获取对应的C++类型
-        cpp_type = self.TYPE_MAP[type_param][0]  # 取第一个映射类型
+        cpp_types = self.template_types(type_param)
+        if cpp_types[0] in (VOID_TYPE, AUTO_TYPE):
+            self.error(f"不支持的 get 模板类型：{cpp_types[0]}")
+        if ANY_TYPE in cpp_types or type_param == 'all':
+            return var_name  # 本身就是 any，不需要转换
 
-        if cpp_type in ['void','auto']:
-            self.error(f"不支持的 get 模板类型：{cpp_type}")
-        
-        return f"any_cast<{cpp_type}>({var_name})"
+        # 单一类型直接取值；类型族（如 int、str）接受其中任一类型，结果统一为 GET_RESULT_TYPES 中的类型
+        if len(cpp_types) == 1:
+            template_args = result_type = cpp_types[0]
+        else:
+            result_type = self.GET_RESULT_TYPES[type_param]
+            template_args = ', '.join(t.cpp for t in [result_type] + cpp_types)
+        if optional:
+            if fallback is None:
+                return self.typed(f"MetaUtils::get_or<{template_args}>({var_name})", result_type)
+            return self.typed(f"MetaUtils::get_or<{template_args}>({var_name}, {fallback})", result_type)
+        return self.typed(f"MetaUtils::get<{template_args}>({var_name}, {self.source_line()})", result_type)
     def parse_expression(self):
+        """表达式：按优先级解析二元运算，见 lower_binary"""
+        return self.parse_binary(self.parse_unary(), 1)
+
+    def parse_binary(self, left, min_precedence):
+        while self.current_token.type in self.BINARY_OPERATORS:
+            op, precedence = self.BINARY_OPERATORS[self.current_token.type]
+            if precedence < min_precedence:
+                break
+            self.eat(self.current_token.type)
+            right = self.parse_unary()
+            while (self.current_token.type in self.BINARY_OPERATORS
+                   and self.BINARY_OPERATORS[self.current_token.type][1] > precedence):
+                right = self.parse_binary(right, precedence + 1)
+            left = self.lower_binary(op, left, right)
+        return left
+
+    def parse_unary(self):
+        if self.current_token.type == TokenType.MINUS:
+            self.eat(TokenType.MINUS)
+            operand = self.parse_unary()
+            self.reject_string_operand('-', operand)
+            if self.type_of(operand) == ANY_TYPE:
+                self.runtime_features.add('any_arith')
+                return self.typed(f"(any(0) - {operand})", ANY_TYPE)
+            if self.is_dynamic(operand):
+                return self.lower_dynamic_binary('-', '0', operand, False)
+            return self.typed(f"(-{operand})", self.type_of(operand))
+        if self.current_token.type == TokenType.EXCLAMATION:
+            self.eat(TokenType.EXCLAMATION)
+            operand = self.parse_unary()
+            self.reject_string_operand('!', operand)
+            return self.typed(f"(!{self.condition(operand)})", BOOL_TYPE)
+        if self.current_token.type == TokenType.LPAREN:
+            self.eat(TokenType.LPAREN)
+            expr = self.parse_expression()
+            self.eat(TokenType.RPAREN)
+            if self.is_dynamic(expr):
+                self.dynamic_exprs.add(f"({expr})")
+            return self.typed(f"({expr})", self.type_of(expr))
+        return self.parse_primary()
+
+    def reject_string_operand(self, op, operand):
+        """字符串字面量是 const char*，取负会编译失败，取反总是得到 false"""
+        if self.is_string_literal(operand) or self.type_of(operand) == STRING_TYPE:
+            self.error(f"字符串不支持 {op} 运算")
+
+    def lower_binary(self, op, left, right):
+        """两侧都是原生数值时生成原生运算，g++ 可以直接优化；有一侧是 any 时使用 any 的运算符"""
+        if op in ('&&', '||'):
+            return self.typed(f"({self.condition(left)} {op} {self.condition(right)})", BOOL_TYPE)
+        comparison = op in ('==', '!=', '<', '>', '<=', '>=')
+        left_type, right_type = self.type_of(left), self.type_of(right)
+        if (self.is_dynamic(left) or self.is_dynamic(right)) and ANY_TYPE not in (left_type, right_type):
+            return self.lower_dynamic_binary(op, left, right, comparison)
+        if self.is_string_literal(left) or self.is_string_literal(right):
+            # 字符串字面量在 C++ 中是 const char*，与 string 之外的值运算时装入 any，避免指针运算与指针比较
+            if not comparison and op != '+':
+                self.error(f"字符串不支持 {op} 运算")
+            if STRING_TYPE not in (left_type, right_type):
+                left_type = right_type = ANY_TYPE
+                left = left if self.type_of(left) == ANY_TYPE else f"any({left})"
+                right = right if self.type_of(right) == ANY_TYPE else f"any({right})"
+        if ANY_TYPE in (left_type, right_type):
+            self.runtime_features.add('any_compare' if comparison else 'any_arith')
+            left = left if left_type == ANY_TYPE else f"any({left})"
+            right = right if right_type == ANY_TYPE else f"any({right})"
+            return self.typed(f"({left} {op} {right})", BOOL_TYPE if comparison else ANY_TYPE)
+        if left_type in self.NUMERIC_RANKS and right_type in self.NUMERIC_RANKS:
+            if comparison:
+                return self.typed(f"({left} {op} {right})", BOOL_TYPE)
+            result = max(left_type, right_type, INT_TYPE, key=self.NUMERIC_RANKS.get)
+            if op in ('/', '%') and result in self.INTEGER_TYPES:
+                if not (right.isdigit() and int(right) != 0):
+                    # 整数除以 0 时报告 Meta 源码行号，而不是让程序崩溃
+                    function = 'divide' if op == '/' else 'remainder'
+                    return self.typed(f"MetaUtils::{function}({left}, {right}, {self.source_line()})", result)
+            elif op == '%':
+                self.error("% 只能用于整数")
+            return self.typed(f"({left} {op} {right})", result)
+        return self.typed(f"({left} {op} {right})", BOOL_TYPE if comparison else None)
+
+    def lower_dynamic_binary(self, op, left, right, comparison):
+        """特化函数中来自无类型参数的运算：与 any 的运算符一样，整数按 long long、其他数值按 double 计算，
+        / 总是浮点除法"""
+        left_type, right_type = self.type_of(left), self.type_of(right)
+        self.require_dynamic(left_type in self.SPECIALIZATION_TAGS and right_type in self.SPECIALIZATION_TAGS)
+        if comparison:
+            return self.typed(f"({left} {op} {right})", BOOL_TYPE)
+        integral = left_type in self.INTEGER_TYPES and right_type in self.INTEGER_TYPES
+        result = LONG_LONG_TYPE if integral else DOUBLE_TYPE
+        self.require_dynamic(op != '%' or integral)
+        if op in ('/', '%'):
+            result = DOUBLE_TYPE if op == '/' else result
+            function = 'divide' if op == '/' else 'remainder'
+            expr = f"MetaUtils::{function}(static_cast<{result}>({left}), static_cast<{result}>({right}), {self.source_line()})"
+        else:
+            expr = f"(static_cast<{result}>({left}) {op} static_cast<{result}>({right}))"
+        self.dynamic_exprs.add(expr)
+        return self.typed(expr, result)
+
+    def is_string_literal(self, expr):
+        """字符串字面量，或 intern_string 放入静态存储的字面量"""
+        return (expr.startswith('"') and expr.endswith('"')) or expr.startswith('meta_literals::')
+
+    def is_dynamic(self, expr):
+        """表达式在通用版本中是否为 any，见 parse_specialized_body"""
+        if expr in self.dynamic_exprs:
+            return True
+        info = self.variables.get(expr)
+        return info is not None and info.get('dynamic', False)
+
+    def require_dynamic(self, ok):
+        """特化函数中无法保持 any 语义的用法：放弃特化，调用通用版本"""
+        if not ok:
+            self.error("参数的用法无法按原生类型特化")
+
+    def condition(self, expr):
+        """条件表达式：bool 与数值直接使用，any 按 MetaUtils::truthy 判断"""
+        expr_type = self.type_of(expr)
+        if expr_type == ANY_TYPE:
+            return f"MetaUtils::truthy({expr})"
+        if expr_type not in (None, BOOL_TYPE) and expr_type not in self.NUMERIC_RANKS:
+            self.error(f"条件需要是 bool、数值或 any，得到 {expr_type}")
+        return expr
+
+    def typed(self, expr, expr_type):
+        self.expr_types[expr] = expr_type
+        return expr
+
+    def type_of(self, expr):
+        """表达式的静态类型（MetaType）：原生类型或 ANY_TYPE，无法确定时为 None"""
+        if expr in self.expr_types:
+            return self.expr_types[expr]
+        if expr.isdigit():
+            return INT_TYPE if int(expr) < 2**31 else LONG_LONG_TYPE
+        if re.fullmatch(r'\d+\.\d+', expr):
+            return DOUBLE_TYPE
+        if expr in ('true', 'false'):
+            return BOOL_TYPE
+        info = self.lookup_variable(expr[len('this->'):] if expr.startswith('this->') else expr)
+        if info is not None and not info['dimensions']:
+            return info['type']
+        return None
+
+    def parse_primary(self):
         if self.current_token.type == TokenType.STRING:
             value = f'"{self.current_token.value}"'  # 确保字符串被正确包裹
             self.eat(TokenType.STRING)
@@ -472,10 +1261,24 @@ namespace math{
         elif self.current_token.type == TokenType.IDENTIFIER:
             var_name = self.current_token.value
             self.eat(TokenType.IDENTIFIER)
+            if var_name == 'spawn' and self.current_token.type == TokenType.IDENTIFIER:
+                return self.parse_spawn()
+            if var_name == 'parallel' and self.current_token.value in self.PARALLEL_REDUCTIONS:
+                return self.parse_parallel_reduce()
+            # 检查是否是模块函数调用
+            if self.current_token.type == TokenType.DOT and var_name in self.imports:
+                return self.parse_module_call(var_name)
+            # 检查是否是函数调用
+            if self.current_token.type == TokenType.LPAREN:
+                return self.parse_call(var_name)
             # 检查是否是数组下标或切片
             if self.current_token.type == TokenType.LBRACKET:
-                return self.parse_subscript_or_slice(var_name)
-            return var_name
+                return self.parse_field_access(self.parse_subscript_or_slice(var_name))
+            if self.lookup_variable(var_name) is None:
+                self.error(f"使用未声明的变量: {var_name}")
+            self.check_alive(var_name)
+            self.record_parallel_read(var_name)
+            return self.parse_field_access(var_name)
         elif self.current_token.type in [TokenType.POINTER, TokenType.DEREF]:
             return self.parse_pointer_expression()
         elif self.current_token.type == TokenType.INPUT or self.current_token.type == TokenType.READLINE:
@@ -489,7 +1292,7 @@ namespace math{
             args = []
             if self.current_token.type != TokenType.RPAREN:
                 if self.current_token.type == TokenType.STRING:
-                    args.append(f'"{self.current_token.value}"')
+                    args.append(self.intern_string(self.current_token.value))
                     self.eat(TokenType.STRING)
                 elif self.current_token.type == TokenType.IDENTIFIER:
                     var_name = self.current_token.value
@@ -504,36 +1307,265 @@ namespace math{
                 elif func_name=="readline":
                     return self.generate_inline_readline(args)
             else:
-                return f'{func_name}({",".join(args)})'
-        elif self.current_token.type == TokenType.IDENTIFIER and self.peek_next_token().type == TokenType.LPAREN:
-            func_name = self.current_token.value
-            self.eat(TokenType.IDENTIFIER)
-            self.eat(TokenType.LPAREN)
-            args = []
-            while self.current_token.type != TokenType.RPAREN:
-                if self.current_token.type == TokenType.STRING:
-                    args.append(f'"{self.current_token.value}"')
-                    self.eat(TokenType.STRING)
-                elif self.current_token.type == TokenType.NUMBER:
-                    args.append(str(self.current_token.value))
-                    self.eat(TokenType.NUMBER)
-                elif self.current_token.type == TokenType.BOOL:
-                    args.append("true" if self.current_token.value else "false")
-                    self.eat(TokenType.BOOL)
-                elif self.current_token.type == TokenType.IDENTIFIER:
-                    if self.current_token.value not in self.variables and self.current_token.value not in self.class_variables:
-                        self.error(f"使用未声明的变量: {self.current_token.value}")
-                    args.append(self.current_token.value)
-                    self.eat(TokenType.IDENTIFIER)
-                if self.current_token.type == TokenType.COMMA:
-                    self.eat(TokenType.COMMA)
-            self.eat(TokenType.RPAREN)
-            return f'{func_name}({", ".join(args)})'
+                return self.typed(f'{func_name}({",".join(args)})', ANY_TYPE)
         elif self.current_token.type == TokenType.GET:
             return self.parse_get_template()
         else:
             self.error("不支持的表达式")
 
+    def parse_field_access(self, expr):
+        """对象的成员变量 p.x，可以连续访问 p.a.b"""
+        while self.current_token.type == TokenType.DOT:
+            object_type = self.type_of(expr)
+            if object_type is None or object_type.kind != 'class':
+                self.error("只有对象可以用 . 访问成员变量")
+            self.eat(TokenType.DOT)
+            field = self.current_token.value
+            self.eat(TokenType.IDENTIFIER)
+            if field in self.CPP_KEYWORDS:
+                field = f"{field}_"
+            if object_type.name not in self.classes:
+                self.error(f"类 {object_type.name} 需要在使用其成员变量之前声明")
+            info = self.classes[object_type.name]['fields'].get(field)
+            if info is None:
+                self.error(f"类 {object_type.name} 没有成员变量 {field}")
+            expr = self.typed(f"{expr}.{field}", None if info['dimensions'] else info['type'])
+            if self.current_token.type == TokenType.LBRACKET:
+                self.error("对象中的数组成员暂不支持下标访问")
+        return expr
+
+    def parse_call_arguments(self):
+        args = []
+        while self.current_token.type != TokenType.RPAREN:
+            if self.current_token.type in (TokenType.COMMA, TokenType.EOF):
+                self.error("无效的函数参数")
+            arg = self.parse_expression()
+            if self.is_task(arg):
+                self.error("spawn 的结果需要先保存到变量中")
+            args.append(arg)
+            if self.current_token.type == TokenType.COMMA:
+                self.eat(TokenType.COMMA)
+        return args
+
+    def parse_call(self, func_name):
+        """解析函数调用，数组批量操作会被降级为 meta_array 中的循环"""
+        self.eat(TokenType.LPAREN)
+        if func_name == 'await':
+            return self.parse_await()
+        if func_name == 'map' and self.current_token.type == TokenType.IDENTIFIER and self.is_array(self.current_token.value):
+            array_name = self.current_token.value
+            self.eat(TokenType.IDENTIFIER)
+            self.eat(TokenType.COMMA)
+            callee = self.current_token.value
+            self.eat(TokenType.IDENTIFIER)
+            self.eat(TokenType.RPAREN)
+            if callee not in self.signatures:
+                self.error(f"map 的第二个参数必须是当前程序中的函数: {callee}")
+            if len(self.signatures[callee]['param_types']) != 1:
+                self.error(f"map 调用的函数 {callee} 必须恰好有一个参数")
+            self.check_alive(array_name)
+            self.require_byte_elements(array_name, "使用 map")
+            self.record_member_write(array_name)
+            self.record_write(array_name)
+            self.record_call(callee)
+            return f'meta_array::map({array_name}, [this](const auto& x) {{ return {callee}(x); }})'
+        args = self.parse_call_arguments()
+        self.eat(TokenType.RPAREN)
+        if func_name in self.STRING_BUILDER_BUILTINS and args and self.is_string_builder(args[0]):
+            if len(args) != self.STRING_BUILDER_BUILTINS[func_name]:
+                self.error(f"{func_name} 需要 {self.STRING_BUILDER_BUILTINS[func_name]} 个参数")
+            if func_name in ('append', 'clear', 'reserve'):
+                self.record_member_write(args[0])
+                self.record_write(args[0])
+            args = self.intern_literal_args(args)
+            return f'{args[0]}.{func_name}({", ".join(args[1:])})'
+        if func_name == 'resize' and args and self.is_array(args[0]) and self.lookup_variable(args[0]).get('flat'):
+            self.record_member_write(args[0])
+            self.record_write(args[0])
+            self.record_resize(args[0])
+            return self.lower_flat_resize(args)
+        if func_name in self.ARRAY_BUILTINS and args and self.is_array(args[0]):
+            if len(args) != self.ARRAY_BUILTINS[func_name]:
+                self.error(f"{func_name} 需要 {self.ARRAY_BUILTINS[func_name]} 个参数")
+            info = self.lookup_variable(args[0]) or {'view': True}
+            if func_name in ('reserve', 'resize', 'push') and (info.get('flat') or info.get('view') or info['dimensions'][0] is not None):
+                self.error(f"{func_name} 只能用于动态数组: {args[0]}")
+            if func_name in self.POINTER_BUILTINS:
+                for arg in args[:self.ARRAY_BUILTINS[func_name]]:
+                    if self.is_array(arg):
+                        self.require_byte_elements(re.match(r'(?:meta_array::slice\()?(\w+)', arg).group(1), f"使用 {func_name}")
+            if func_name == 'size':
+                # 只读取长度，不与其他迭代写入元素冲突
+                for context in self.parallel_loops:
+                    if (args[0], None, False) in context['reads']:
+                        context['reads'].remove((args[0], None, False))
+            if func_name in self.ARRAY_MUTATORS:
+                target = re.match(r'(?:meta_array::slice\()?(\w+)', args[0]).group(1)
+                self.record_member_write(target)
+                self.record_write(target)
+                if func_name in self.ARRAY_RESIZERS:
+                    self.record_resize(target)
+            return self.typed(f'meta_array::{func_name}({", ".join(args)})', LONG_LONG_TYPE if func_name == 'size' else None)
+        if func_name in self.ARRAY_BUILTINS and func_name not in self.signatures:
+            self.require_array_argument(func_name, args)
+        signature = self.signatures.get(func_name)
+        if signature is not None:
+            return self.lower_meta_call(func_name, signature, args)
+        self.record_call(func_name)
+        return self.typed(f'{func_name}({", ".join(args)})', ANY_TYPE)
+
+    def lower_meta_call(self, func_name, signature, args):
+        """调用 Meta 函数：实参按参数类型转换，返回值带有声明的返回类型"""
+        if len(args) != len(signature['params']):
+            self.error(f"{func_name} 需要 {len(signature['params'])} 个参数")
+        self.record_call(func_name)
+        args = [self.convert_value(arg, param_type) for arg, param_type in zip(args, signature['param_types'])]
+        callee, inferred = self.specialize(func_name, signature, args)
+        args = self.move_if_last_use(args)
+        if inferred is not None:
+            # 通用版本返回保存该类型的 any，调用结果继续按 any 的规则计算
+            call = self.typed(f'{callee}({", ".join(args)})', inferred)
+            self.dynamic_exprs.add(call)
+            return call
+        return_type = signature['return_type'] if signature['return_type'] != VOID_TYPE else None
+        return self.typed(f'{callee}({", ".join(args)})', return_type)
+
+    def convert_value(self, expr, cpp_type):
+        """把实参或返回值转换为声明的类型：any 的值在运行时取出，原生类型依靠 C++ 的隐式转换"""
+        if self.is_dynamic(expr) and cpp_type != ANY_TYPE:
+            # 通用版本在运行时转换，整数与浮点数不一致时报错；特化版本放弃特化
+            self.require_dynamic(cpp_type in self.NUMERIC_RANKS and
+                                 (cpp_type in self.INTEGER_TYPES) == (self.type_of(expr) in self.INTEGER_TYPES))
+        if cpp_type == ANY_TYPE or self.type_of(expr) != ANY_TYPE:
+            return expr
+        return convert_from_any(expr, cpp_type, self.source_line())
+
+    # 复制代价低、总是按值传递的类型
+    BY_VALUE_TYPES = set(scalar_types('__int128', 'char', 'bool', 'const char*', 'auto'))
+
+    def is_cheap_to_copy(self, cpp_type):
+        return cpp_type in self.NUMERIC_RANKS or cpp_type in self.BY_VALUE_TYPES
+
+    def move_if_last_use(self, args):
+        """按值传给函数的局部变量（数组、字符串、any 等）之后不再使用时，移动给函数而不是复制
+        调用处先放入占位符，函数解析结束后由 resolve_moves 决定是否移动"""
+        if self.current_function is None or self.loops:
+            # 循环的下一次迭代还会用到变量
+            return args
+        result = []
+        for arg in args:
+            info = self.variables.get(arg)
+            if (info is None or not info['owner'] or info.get('borrowed_by') is not None
+                    or info.get('view') or info.get('pointer') or info.get('task')
+                    or self.is_cheap_to_copy(info['type'])
+                    or any(other.get('borrowed_by') == arg for other in self.variables.values())):
+                result.append(arg)
+                continue
+            marker = f"\0move{len(self.move_candidates)}\0"
+            self.move_candidates[marker] = {'var': arg, 'info': info, 'moved': True}
+            result.append(marker)
+        return result
+
+    def resolve_moves(self, statements):
+        """把占位符替换为 std::move(x)，之后又用到 x 的替换为 x 本身
+        C++ 不规定实参与运算数的求值顺序，同一个表达式（生成代码的同一行）中 x 出现多次时也不移动，
+        例如 g(x, h(x)) 与 size(x) + h(x)"""
+        def original(match):
+            return self.move_candidates[match.group(0)]['var']
+        for statement in statements:
+            for line in statement.split('\n'):
+                markers = re.findall(r'\0move\d+\0', line)
+                text = re.sub(r'\0move\d+\0', original, line)
+                for marker in markers:
+                    candidate = self.move_candidates[marker]
+                    if len(re.findall(rf'\b{re.escape(candidate["var"])}\b', text)) > 1:
+                        candidate['moved'] = False
+
+        def replace(match):
+            candidate = self.move_candidates[match.group(0)]
+            return f"std::move({candidate['var']})" if candidate['moved'] else candidate['var']
+        return [re.sub(r'\0move\d+\0', replace, stmt) for stmt in statements]
+
+    def passes_by_reference(self, info):
+        """没有被修改、借用或直接返回，且复制代价高的参数按 const& 传递
+        函数还需要不修改成员变量，见 resolve_param_refs"""
+        return not info.get('modified') and not self.is_cheap_to_copy(info['type'])
+
+    def resolve_param_refs(self, statements):
+        """所有函数解析完后，直接或间接修改成员变量的函数的参数改为按值传递：
+        实参可能就是被修改的成员变量，按 const& 传递时函数会看到修改后的值"""
+        for stmt in statements:
+            if isinstance(stmt, dict) and stmt['type'] == 'class':
+                for func in class_functions(stmt['data']):
+                    if func.get('param_refs') and self.modified_members(func.get('of', func['name'])):
+                        func['param_refs'] = [False] * len(func['params'])
+
+    def intern_string(self, value):
+        """把字符串字面量放入静态存储，相同的字面量只保存一份"""
+        # 名字由内容决定，新增或删除其他字面量时保持不变
+        if value not in self.string_literals:
+            digest = hashlib.sha1(value.encode('utf-8')).hexdigest()[:10]
+            self.string_literals[value] = f"meta_literals::s{digest}"
+        return self.string_literals[value]
+
+    def intern_literal_args(self, args):
+        return [self.intern_string(arg[1:-1]) if arg.startswith('"') else arg for arg in args]
+
+    def is_string_builder(self, var_name):
+        info = self.lookup_variable(var_name)
+        return info is not None and info['type'] == STRING_BUILDER_TYPE
+
+    def lower_flat_resize(self, args):
+        """resize(m, d0, d1, ..., "row"/"col")：按下标顺序给出各维长度，一次性分配"""
+        var_name, extents = args[0], args[1:]
+        layout = 'RowMajor'
+        if extents and extents[-1].startswith('"'):
+            layout = self.ARRAY_LAYOUTS.get(extents.pop().strip('"').strip())
+            if layout is None:
+                self.error(f"未知的数组布局，可选: {', '.join(self.ARRAY_LAYOUTS)}")
+        dimensions = self.lookup_variable(var_name)['dimensions']
+        if len(extents) != len(dimensions):
+            self.error(f"多维数组 {var_name} 需要 {len(dimensions)} 个维度长度")
+        for position, extent in enumerate(extents):
+            size = dimensions[position]
+            if size is not None and extent.isdigit() and int(extent) != size:
+                self.error(f"第 {position + 1} 维声明的长度是 {size}，不能改为 {extent}")
+        shape = ', '.join(f'static_cast<size_t>({extent})' for extent in extents)
+        return f'{var_name}.resize({{{shape}}}, meta_array::Layout::{layout})'
+
+    def packs_bits(self, var_name):
+        """含动态维度的 bool 数组使用 std::vector<bool>：元素按位存储，没有 data()，相邻元素共用同一个字"""
+        info = self.lookup_variable(var_name)
+        return info is not None and info.get('element') == BOOL_TYPE and None in info['dimensions']
+
+    def require_byte_elements(self, var_name, usage):
+        if self.packs_bits(var_name):
+            self.error(f"动态 bool 数组 {var_name} 的元素按位存储，不能{usage}；"
+                       f"请改用定长数组 data<bool> [n] 或 data<int32> []")
+
+    def lookup_variable(self, var_name):
+        if var_name in self.variables:
+            return self.variables[var_name]
+        return self.class_variables.get(var_name)
+
+    def require_array_argument(self, func_name, args):
+        """数组批量操作的第一个参数不是数组时报错，min、max 也可以比较两个原生数值"""
+        if func_name in ('min', 'max') and len(args) == 2 and all(self.type_of(arg) in self.NUMERIC_RANKS for arg in args):
+            return
+        if func_name in ('min', 'max'):
+            self.error(f"{func_name} 需要一个数组或两个原生数值，any 值可以先用 get<T>(...) 取出")
+        if not args:
+            self.error(f"{func_name} 需要 {self.ARRAY_BUILTINS[func_name]} 个参数")
+        if self.type_of(args[0]) == ANY_TYPE:
+            self.error(f"{func_name} 的第一个参数必须是数组: {args[0]} 是 any 变量，其中的数组需要先保存到 data<T> [] 声明的数组中")
+        self.error(f"{func_name} 的第一个参数必须是数组: {args[0]}")
+
+    def is_array(self, var_name):
+        if self.is_slice(var_name):
+            return True
+        info = self.lookup_variable(var_name)
+        return info is not None and bool(info['dimensions'])
+
     def parse_print_statement(self):
         is_inline=False
         self.eat(TokenType.IDENTIFIER)  # 吃掉 print
@@ -544,9 +1576,9 @@ namespace math{
         args = []
         while self.current_token.type != TokenType.RPAREN:
             if self.current_token.type == TokenType.GET:
-                return self.parse_get_template()
+                args.append(self.parse_get_template())
             elif self.current_token.type == TokenType.STRING:
-                args.append(f'"{self.current_token.value}"')
+                args.append(self.intern_string(self.current_token.value))
                 self.eat(TokenType.STRING)
             elif self.current_token.type == TokenType.NUMBER:
                 args.append(str(self.current_token.value))
@@ -557,15 +1589,31 @@ namespace math{
             elif self.current_token.type == TokenType.IDENTIFIER:
                 var_name = self.current_token.value
                 self.eat(TokenType.IDENTIFIER)
-                # 检查是否是数组下标或切片
-                if self.current_token.type == TokenType.LBRACKET:
+                # 检查是否是函数调用、数组下标或切片
+                if self.current_token.type == TokenType.DOT and var_name in self.imports:
+                    args.append(self.parse_module_call(var_name))
+                elif self.current_token.type == TokenType.LPAREN:
+                    args.append(self.parse_call(var_name))
+                elif self.current_token.type == TokenType.LBRACKET:
                     args.append(self.parse_subscript_or_slice(var_name))
                 elif var_name in self.variables:
+                    self.check_alive(var_name)
+                    self.record_parallel_read(var_name)
                     args.append(var_name)
                 elif var_name in self.class_variables:
+                    self.record_parallel_read(var_name)
                     args.append(f"this->{var_name}")
                 else:
                     self.error(f"使用未声明的变量: {var_name}")
+            else:
+                args.append(self.parse_expression())
+            if self.current_token.type == TokenType.DOT:
+                args[-1] = self.parse_field_access(args[-1])
+            if self.current_token.type in self.BINARY_OPERATORS:
+                args[-1] = self.parse_binary(args[-1], 1)
+            arg_type = self.type_of(args[-1])
+            if arg_type is not None and arg_type.kind == 'class':
+                self.error("对象不能直接输出，请输出它的成员变量")
             if self.current_token.type == TokenType.COMMA:
                 self.eat(TokenType.COMMA)
         self.eat(TokenType.RPAREN)
@@ -579,54 +1627,43 @@ namespace math{
         if var_name not in variables:
             return False
         
-        var_type = variables[var_name]['type']
-        
-        if 'variant' in var_type:
-            type_list = var_type.split('<')[1].split('>')[0].split(',')
-            type_list = [t.strip() for t in type_list]
-            return value_type in type_list
-        
-        if var_type == 'std::any':
-            return True
-        
-        return var_type == value_type
+        return variables[var_name]['type'].accepts(value_type)
 
-    def parse_data_declaration(self, is_class_variable=False):
-        self.eat(TokenType.DATA)
-        
+    def parse_data_type(self):
+        """data 之后的类型部分：可选的模板类型与数组维度
+        返回变量类型、维度、元素类型（均为 MetaType）以及是否为连续存储的多维数组"""
         # 检查是否是模板化数据类型
         if self.current_token.type == TokenType.LT:
-            self.eat(TokenType.LT)
-            template_params = []
-            while self.current_token.type != TokenType.GT:
-                if self.current_token.type == TokenType.IDENTIFIER:
-                    param = self.current_token.value
-                    if param not in self.TYPE_MAP:
-                        self.error(f"未知的模板类型: {param}")
-                    template_params.append(param)
-                    self.eat(TokenType.IDENTIFIER)
-                    if self.current_token.type == TokenType.COMMA:
-                        self.eat(TokenType.COMMA)
-                else:
-                    self.error("模板参数必须是标识符")
-            self.eat(TokenType.GT)
+            template_params = self.parse_template_parameters()
             
             # 将模板参数映射到实际的C++类型
             cpp_types = []
             for param in template_params:
-                cpp_types.extend(self.TYPE_MAP[param])
+                cpp_types.extend(self.template_types(param))
             
-            # 生成variant类型字符串
-            if len(cpp_types) == 1:
-                base_type = cpp_types[0]  # 单一类型直接使用
-            else:
-                base_type = f"std::variant<{', '.join(cpp_types)}>"
+            # 多个类型组成 variant，单一类型直接使用
+            base_type = MetaType.variant(cpp_types)
         else:
-            base_type = "std::any"  # 默认为 std::any
+            base_type = ANY_TYPE  # 默认为 std::any
         
         # 获取数组维度
         dimensions = self.get_array_dimension()
         
+        # 根据维度生成数组类型
+        # 含动态维度的多维数组使用一块连续存储，避免每行一次堆分配
+        flat = len(dimensions) > 1 and None in dimensions
+        if flat:
+            array_type = MetaType.template('meta_array::NDArray', base_type, len(dimensions))
+        else:
+            array_type = base_type
+            for dim in reversed(dimensions):  # 第一维在最外层，None 为动态数组
+                array_type = MetaType.array(array_type, dim)
+        return array_type, dimensions, base_type, flat
+
+    def parse_data_declaration(self, is_class_variable=False):
+        self.eat(TokenType.DATA)
+        array_type, dimensions, base_type, flat = self.parse_data_type()
+        
         # 获取变量名列表
         var_names = []
         while self.current_token.type == TokenType.IDENTIFIER:
@@ -638,30 +1675,46 @@ namespace math{
             else:
                 break
         
-        # 根据维度生成数组类型
-        array_type = base_type
-        for dim in dimensions:
-            if dim is None:  # 动态数组
-                array_type = f"std::vector<{array_type}>"
-            else:  # 固定长度数组
-                array_type = f"std::array<{array_type}, {dim}>"
-        
         # 存储变量信息
         declarations = []
         for var_name in var_names:
             if var_name in self.CPP_KEYWORDS:
                 var_name = f"{var_name}_"
             
+            info = {'type': array_type, 'dimensions': dimensions, 'owner': True, "borrowed_by": None, 'flat': flat,
+                    'element': base_type}
             if is_class_variable:
-                self.class_variables[var_name] = {'type': array_type, 'dimensions': dimensions, 'owner': True, "borrowed_by": None}
+                self.class_variables[var_name] = info
             else:
-                self.variables[var_name] = {'type': array_type, 'dimensions': dimensions, 'owner': True, "borrowed_by": None}
+                self.variables[var_name] = info
+            init = None
             
             # 检查是否有赋值操作
             if self.current_token.type == TokenType.ASSIGN:
                 self.eat(TokenType.ASSIGN)
                 expr = self.parse_expression()
+                if self.is_slice(expr):
+                    # data 声明的变量拥有所有权，切片在这里被复制
+                    owned = self.owned_slices.get(expr)
+                    if owned is not None and array_type == ANY_TYPE and not dimensions:
+                        # 不带类型的 data 得到与被切片数组相同的原生数组类型，而不是把数组放进 any
+                        array_type, owned_dimensions, element = owned
+                        info.update(type=array_type, dimensions=owned_dimensions, element=element)
+                    expr = f"meta_array::to_owned({expr})"
                 self.eat(TokenType.SEMI)
+                if self.is_task(expr):
+                    if is_class_variable or array_type != ANY_TYPE:
+                        self.error("spawn 的结果只能保存在函数中不带类型和维度的 data 变量里")
+                    info.update(type=FUTURE_TYPE, task=True, block=self.block_depth)
+                    self.pending_tasks.add(var_name)
+                    declarations.append(f"meta_task::Future {var_name} = {expr};")
+                    continue
+                if expr.startswith('&'):
+                    info['pointer'] = True  # 指针与借用一样不能交给其他任务
+                if array_type.kind != 'variant':
+                    # 函数返回的 any 在运行时取出，见 convert_value
+                    expr = self.convert_value(expr, array_type)
+                init = expr
                 declarations.append(f"{array_type} {var_name} = {expr};")
             else:
                 self.eat(TokenType.SEMI)
@@ -670,38 +1723,104 @@ namespace math{
                     declarations.append(f"{array_type} {var_name};")
                 # 如果是固定长度数组，初始化为空
                 elif dimensions and dimensions[0] is not None:
+                    init = "{}"
                     declarations.append(f"{array_type} {var_name} = {{}};")
+                # 对象的成员变量没有初始值时为零
+                elif array_type.kind == 'class':
+                    declarations.append(f"{array_type} {var_name}{{}};")
                 # 如果不是数组，声明变量
                 else:
                     declarations.append(f"{array_type} {var_name};")
+            if is_class_variable:
+                self.record_field(var_name, info, init)
         
         return "\n".join(declarations)
 
+    def record_field(self, var_name, info, init):
+        """记录类的成员变量，生成该类的结构体时使用，见 generate_class_structs"""
+        element = info['element']
+        if element.kind == 'class' and not self.classes.get(element.name, {}).get('complete'):
+            self.error(f"类 {element.name} 需要先声明，才能作为其他类的成员变量类型")
+        current = self.classes[self.class_name]
+        dependent = init is not None and self.depends_on_program(init)
+        if dependent:
+            if self.class_name in self.used_classes:
+                self.error(f"类 {self.class_name} 已用作数据类型，成员变量的初始值不能调用函数或使用其他成员变量")
+            current['dependent'] = True
+        field = dict(info, name=var_name, init=init, dependent=dependent)
+        current['fields'][var_name] = field
+        self.class_fields.append(field)
+
+    def depends_on_program(self, init):
+        """初始值是否调用了函数或用到了成员变量：这样的成员只能在程序对象的构造函数中初始化"""
+        code = re.sub(r'"(?:[^"\\]|\\.)*"', '""', init)
+        if 'this->' in code:
+            return True
+        for match in re.finditer(r'(?<![\w:.])([A-Za-z_]\w*)(\s*\()?', code):
+            name, call = match.groups()
+            if name in self.class_variables or (call and name != 'any'):
+                return True
+        return False
+
     def parse_ref(self):
         self.eat(TokenType.REF)
         var_name = self.current_token.value
         self.eat(TokenType.IDENTIFIER)
         self.eat(TokenType.ASSIGN)  # 吃掉等号
-        source_var = self.parse_expression()  # 解析右侧表达式
+        if self.current_token.type == TokenType.IDENTIFIER and self.peek_next_token().type == TokenType.LBRACKET:
+            # 借用数组元素或切片
+            source_var = self.current_token.value
+            self.eat(TokenType.IDENTIFIER)
+            source_expr = self.parse_subscript_or_slice(source_var)
+        else:
+            source_var = source_expr = self.parse_expression()  # 解析右侧表达式
         self.eat(TokenType.SEMI)  # 吃掉分号
 
-        # 检查变量是否存在
-        if source_var not in self.variables:
+        # 检查变量是否存在（类成员变量也可以被借用）
+        source_info = self.lookup_variable(source_var)
+        if source_info is None:
             self.error(f"使用未声明的变量: {source_var}")
 
         # 检查是否可以借用
-        if not self.variables[source_var]['owner']:
+        if not source_info['owner']:
             self.error(f"变量 {source_var} 不拥有所有权，无法借用")
 
+        self.check_alive(source_var)
+        self.require_dynamic(not self.is_dynamic(source_var))
+        for context in self.parallel_loops:
+            if self.is_outer(context, source_var):
+                self.error(f"并行循环中不能借用循环外的变量 {source_var}")
+        # 借用成员变量后可能通过借用修改它，也可能改变数组长度
+        self.record_member_write(source_var)
+        self.mark_modified(source_var)
+        self.record_resize(source_var, keep_borrows=True)
+
+        if self.is_slice(source_expr):
+            # 切片是不拥有元素的视图，按值保存视图本身
+            self.variables[var_name] = {
+                'type': AUTO_TYPE,
+                'dimensions': [None],
+                'owner': False,
+                'borrowed_by': source_var,
+                'flat': False,
+                'view': True,
+                'loop_depth': len(self.loops),
+                'owned': self.owned_slices.get(source_expr)
+            }
+            return f"auto {var_name} = {source_expr};"
+
         # 更新借用信息
-        self.variables[var_name] = {
-            'type': self.variables[source_var]['type'],
-            'dimensions': self.variables[source_var]['dimensions'],
-            'owner': False,  # 借用变量不拥有所有权
-            'borrowed_by': source_var  # 记录借用来源
-        }
+        self.variables[var_name] = dict(
+            source_info,
+            owner=False,  # 借用变量不拥有所有权
+            borrowed_by=source_var  # 记录借用来源
+        )
+        if source_expr != source_var:
+            # 借用单个元素
+            self.variables[var_name].update(dimensions=[], flat=False, type=source_info.get('element', AUTO_TYPE),
+                                            element_ref=True, loop_depth=len(self.loops))
 
-        return f"auto& {var_name} = {source_var};"
+        return f"auto& {var_name} = {source_expr};"
 
     def parse_delete(self):
         self.eat(TokenType.DELETE)
@@ -723,7 +1842,7 @@ namespace math{
             self.error(f"使用未声明的变量: {var_name}")
 
         var_info = self.variables[var_name]
-        if var_info['deleted']:
+        if var_info.get('deleted'):
             self.error(f"变量 {var_name} 已被销毁，无法再次销毁")
 
         # 如果变量拥有所有权，销毁所有借用
@@ -733,7 +1852,9 @@ namespace math{
                     var['deleted'] = True
 
         # 销毁变量
+        self.record_write(var_name)
         self.variables[var_name]['deleted'] = True
+        self.record_resize(var_name)
         return f"// 销毁变量 {var_name}"
     
     def delete_array(self, var_name):
@@ -741,7 +1862,7 @@ namespace math{
             self.error(f"使用未声明的变量: {var_name}")
 
         var_info = self.variables[var_name]
-        if var_info['deleted']:
+        if var_info.get('deleted'):
             self.error(f"数组 {var_name} 已被销毁，无法再次销毁")
 
         # 如果数组拥有所有权，销毁所有借用
@@ -751,7 +1872,9 @@ namespace math{
                     var['deleted'] = True
 
         # 销毁数组
+        self.record_write(var_name)
         self.variables[var_name]['deleted'] = True
+        self.record_resize(var_name)
         return f"// 销毁数组 {var_name}"
 
     def parse_owner(self):
@@ -778,6 +1901,9 @@ namespace math{
             self.error(f"变量 {target_var} 不是 {source_var} 的借用")
 
         # 更新所有权信息
+        self.record_write(source_var)
+        self.record_write(target_var)
+        self.record_resize(source_var)
         self.variables[source_var]['owner'] = False
         self.variables[source_var]['borrowed_by'] = None
         self.variables[target_var]['owner'] = True
@@ -792,6 +1918,8 @@ namespace math{
             if var_name not in self.variables and var_name not in self.class_variables:
                 self.error(f"使用未声明的变量: {var_name}")
             self.eat(TokenType.IDENTIFIER)
+            self.check_alive(var_name)
+            self.mark_modified(var_name)
             return f"&{var_name}"
         elif self.current_token.type == TokenType.DEREF:
             self.eat(TokenType.DEREF)
@@ -809,7 +1937,7 @@ namespace math{
         while self.current_token.type != TokenType.GT:
             if self.current_token.type == TokenType.IDENTIFIER:
                 param = self.current_token.value
-                if param not in self.TYPE_MAP:
+                if not self.is_type_name(param):
                     self.error(f"未知的模板类型: {param}")
                 params.append(param)
                 self.eat(TokenType.IDENTIFIER)
@@ -820,8 +1948,38 @@ namespace math{
         self.eat(TokenType.GT)
         return params
 
+    def is_type_name(self, name):
+        return name in self.TYPE_MAP or name in self.class_names
+
+    def template_types(self, param):
+        """模板参数对应的类型：内置的类型或类型族，或者用作数据类型的 Meta 类"""
+        if param in self.TYPE_MAP:
+            return self.TYPE_MAP[param]
+        return [self.class_type(param)]
+
+    def class_type(self, class_name):
+        """Meta 类用作数据类型：对象是该类的结构体，按值保存与复制"""
+        info = self.classes.get(class_name)
+        if info is not None and info['dependent']:
+            self.error(f"类 {class_name} 的成员变量初始值调用了函数或用到了其他成员变量，不能用作数据类型")
+        self.used_classes.add(class_name)
+        return MetaType.record(class_name)
+
+    def collect_class_names(self):
+        """预先扫描所有类名：类可以在声明之前用作参数和变量的类型"""
+        lexer = Lexer(self.lexer.text)
+        names = set()
+        token = lexer.next_token()
+        while token.type != TokenType.EOF:
+            previous, token = token, lexer.next_token()
+            if previous.type == TokenType.CLASS and token.type == TokenType.IDENTIFIER:
+                names.add(token.value)
+        return names
+
     def parse(self):
         statements = []
+        self.class_names = self.collect_class_names()
+        self.signatures = self.collect_signatures()
         
         while self.current_token.type != TokenType.EOF:
             if self.current_token.type == TokenType.CLASS:
@@ -838,7 +1996,19 @@ namespace math{
                 statements.append(self.parse_include_statement())
             else:
                 self.error("无效的语句")
-        
+        self.attach_specializations(statements)
+        self.resolve_param_refs(statements)
+        self.check_tasks()
+
+        if self.string_literals:
+            statements.append({
+                'type': 'literals',
+                'data': self.string_literals
+            })
+        statements.append({
+            'type': 'runtime',
+            'data': self.runtime_features
+        })
         return statements
 
     def parse_class_declaration(self):
@@ -846,6 +2016,10 @@ namespace math{
         class_name = self.current_token.value
         self.eat(TokenType.IDENTIFIER)
         self.eat(TokenType.LBRACE)
+        self.class_name = class_name
+        # 同名的类共用一个结构体
+        self.classes.setdefault(class_name, {'fields': {}, 'dependent': False, 'complete': False})
+        self.class_fields = []
         
         class_vars = []
         functions = []
@@ -860,14 +2034,18 @@ namespace math{
                 self.error("类中只能包含变量声明和函数声明")
         
         self.eat(TokenType.RBRACE)
+        self.classes[class_name]['complete'] = True
         
         return {
             'name': class_name,
             'variables': class_vars,
+            'fields': self.class_fields,
             'functions': functions
         }
 
-    def parse_function_declaration(self):
+    def parse_function_header(self):
+        """function f(a, data<int64> b, data<float64> []c) -> int64
+        参数和返回值可以用 data 声明的类型标注，省略时为 any"""
         self.eat(TokenType.FUNCTION)
         func_name = self.current_token.value
         if self.current_token.type == TokenType.IDENTIFIER:
@@ -877,105 +2055,505 @@ namespace math{
         self.eat(TokenType.LPAREN)
         
         params = []
+        param_infos = []
         while self.current_token.type != TokenType.RPAREN:
-            if self.current_token.type == TokenType.IDENTIFIER:
-                param_name = self.current_token.value
-                params.append(param_name)
-                self.eat(TokenType.IDENTIFIER)
-                if self.current_token.type == TokenType.COMMA:
-                    self.eat(TokenType.COMMA)
-            else:
+            # 函数参数作为拥有所有权的变量
+            info = {'type': ANY_TYPE, 'dimensions': [], 'owner': True, 'borrowed_by': None}
+            if self.current_token.type == TokenType.DATA:
+                self.eat(TokenType.DATA)
+                cpp_type, dimensions, element, flat = self.parse_data_type()
+                if cpp_type.kind == 'variant':
+                    self.error("函数参数需要单一类型，例如 data<int64> x")
+                info = dict(info, type=cpp_type, dimensions=dimensions, flat=flat, element=element)
+            if self.current_token.type != TokenType.IDENTIFIER:
                 self.error("函数参数必须是标识符")
+            params.append(self.current_token.value)
+            param_infos.append(info)
+            self.eat(TokenType.IDENTIFIER)
+            if self.current_token.type == TokenType.COMMA:
+                self.eat(TokenType.COMMA)
         self.eat(TokenType.RPAREN)
-        self.eat(TokenType.LBRACE)
-        
-        previous_variables = self.variables
-        self.variables = {}
-        
-        statements = []
-        while self.current_token.type != TokenType.RBRACE:
+        return_type = ANY_TYPE
+        if self.current_token.type == TokenType.ARROW:
+            self.eat(TokenType.ARROW)
             if self.current_token.type == TokenType.DATA:
-                statements.append(self.parse_data_declaration())
-            elif self.current_token.type == TokenType.IDENTIFIER and self.current_token.value == 'print':
-                statements.append(self.parse_print_statement())
-            elif self.current_token.type == TokenType.IDENTIFIER and self.peek_next_token().type == TokenType.ASSIGN:
-                statements.append(self.parse_assignment_statement())
-            elif self.current_token.type == TokenType.IDENTIFIER and self.peek_next_token().type == TokenType.LPAREN:
-                func_name = self.current_token.value
+                self.eat(TokenType.DATA)
+                return_type = self.parse_data_type()[0]
+            elif self.current_token.value in self.TYPE_MAP and len(self.TYPE_MAP[self.current_token.value]) == 1:
+                return_type = self.TYPE_MAP[self.current_token.value][0]
+                self.eat(TokenType.IDENTIFIER)
+            elif self.current_token.value in self.class_names:
+                return_type = self.class_type(self.current_token.value)
                 self.eat(TokenType.IDENTIFIER)
-                self.eat(TokenType.LPAREN)
-                args = []
-                while self.current_token.type != TokenType.RPAREN:
-                    if self.current_token.type == TokenType.STRING:
-                        args.append(f'"{self.current_token.value}"')
-                        self.eat(TokenType.STRING)
-                    elif self.current_token.type == TokenType.NUMBER:
-                        args.append(str(self.current_token.value))
-                        self.eat(TokenType.NUMBER)
-                    elif self.current_token.type == TokenType.BOOL:
-                        args.append("true" if self.current_token.value else "false")
-                        self.eat(TokenType.BOOL)
-                    elif self.current_token.type == TokenType.IDENTIFIER:
-                        if self.current_token.value not in self.variables and self.current_token.value not in self.class_variables:
-                            self.error(f"使用未声明的变量: {self.current_token.value}")
-                        args.append(self.current_token.value)
-                        self.eat(TokenType.IDENTIFIER)
-                    if self.current_token.type == TokenType.COMMA:
-                        self.eat(TokenType.COMMA)
-                self.eat(TokenType.RPAREN)
-                self.eat(TokenType.SEMI)
-                statements.append(f'{func_name}({", ".join(args)});')
-            elif self.current_token.type == TokenType.RETURN:
-                self.eat(TokenType.RETURN)
-                if self.current_token.type == TokenType.SEMI:
-                    self.eat(TokenType.SEMI)
-                    statements.append("return;")
-                else:
-                    expr = self.parse_expression()
-                    self.eat(TokenType.SEMI)
-                    statements.append(f"return {expr};")
-            elif self.current_token.type == TokenType.REF:
-                statements.append(self.parse_ref())
-            elif self.current_token.type == TokenType.OWNER:
-                statements.append(self.parse_owner())
-            elif self.current_token.type == TokenType.DELETE:
-                statements.append(self.parse_delete())
             else:
-                self.error("无效的语句")
-        
-        self.eat(TokenType.RBRACE)
-        self.variables = previous_variables
-        
+                self.error("返回类型需要是单一类型，例如 -> int64 或 -> data<float64> []")
+            if return_type.kind == 'variant':
+                self.error("返回类型需要是单一类型，例如 -> int64 或 -> data<float64> []")
         return {
             'name': func_name,
             'params': params,
-            'body': statements
+            'param_infos': param_infos,
+            'param_types': [info['type'] for info in param_infos],
+            'return_type': return_type,
         }
 
-    def parse_assignment_statement(self):
-        var_name = self.current_token.value
-        if var_name not in self.variables and var_name not in self.class_variables:
-            self.error(f"使用未声明的变量: {var_name}")
-        
-        self.eat(TokenType.IDENTIFIER)
-        
-        # 检查是否是数组下标赋值
-        if self.current_token.type == TokenType.LBRACKET:
-            # 解析数组下标表达式
-            subscript = self.parse_subscript_or_slice(var_name)
+    def collect_signatures(self):
+        """预先扫描所有函数头：函数可以在定义之前被调用，调用处需要知道参数与返回类型
+        同时记录函数体的位置，按实参类型特化时重新解析函数体"""
+        scanner = Parser(Lexer(self.lexer.text), self.bounds, self.modules, self.base_dir)
+        scanner.class_names = self.class_names
+        signatures = {}
+        while scanner.current_token.type != TokenType.EOF:
+            if scanner.current_token.type == TokenType.CLASS:
+                scanner.eat(TokenType.CLASS)
+                scanner.class_name = scanner.current_token.value
+                continue
+            if scanner.current_token.type != TokenType.FUNCTION:
+                scanner.eat(scanner.current_token.type)
+                continue
+            signature = scanner.parse_function_header()
+            signature['class'] = scanner.class_name
+            if scanner.current_token.type == TokenType.LBRACE:
+                signature['body'] = scanner.lexer_state()
+            signatures.setdefault(signature['name'], signature)
+        return signatures
+
+    def parse_function_declaration(self):
+        header = self.parse_function_header()
+        func_name, params = header['name'], header['params']
+        function = {
+            'name': func_name,
+            'params': params,
+            'param_types': header['param_types'],
+            'return_type': header['return_type'],
+            'body': None
+        }
+        # 没有函数体的声明由原生模块实现 (见 ModuleLoader)
+        if self.current_token.type == TokenType.SEMI:
+            self.eat(TokenType.SEMI)
+            return function
+        self.current_function = {'params': len(params), 'writes': set(), 'calls': set()}
+        self.functions[func_name] = self.current_function
+        self.pending_tasks = set()
+        self.return_type = header['return_type']
+        self.return_types = []
+        
+        self.move_candidates = {}
+        
+        previous_variables = self.variables
+        self.variables = {param: dict(info) for param, info in zip(params, header['param_infos'])}
+        param_infos = list(self.variables.values())
+        function['body'] = self.resolve_moves(self.parse_block())
+        if self.track_allocs:
+            function['body'].insert(0, self.alloc_scope(f"{self.class_name}::{func_name}"))
+        function['param_refs'] = [self.passes_by_reference(info) for info in param_infos]
+        self.variables = previous_variables
+        self.current_function = None
+        self.return_type = ANY_TYPE
+        return function
+
+    def alloc_scope(self, name):
+        """--track-allocs：函数体开头的守卫，函数执行期间（不含它调用的函数）的内存分配计入该函数"""
+        return (f'static const int meta_alloc_id = meta_alloc::register_function("{name}");\n'
+                f'meta_alloc::Scope meta_alloc_scope(meta_alloc_id);')
+
+    def parse_specialized_body(self, signature, types):
+        """按实参类型重新解析函数体；types 中不为 None 的参数按该原生类型传入
+        来自这些参数的运算仍按 any 的规则计算，结果与通用版本一致
+        返回函数体、推断出的返回类型与各参数是否按 const& 传递，无法特化时返回 None"""
+        saved = (self.lexer_state(), self.variables, self.current_function, self.return_type, self.pending_tasks,
+                 self.dynamic_exprs, self.loops, self.parallel_loops, self.block_depth, self.return_types,
+                 self.move_candidates)
+        self.restore_lexer_state(signature['body'])
+        self.variables = {}
+        for param, info, cpp_type in zip(signature['params'], signature['param_infos'], types):
+            self.variables[param] = dict(info, type=cpp_type, dynamic=True) if cpp_type else dict(info)
+        # 函数修改的成员变量与调用关系由通用版本记录
+        self.current_function = {'params': len(types), 'writes': set(), 'calls': set()}
+        self.return_type = signature['return_type']
+        self.pending_tasks = set()
+        self.dynamic_exprs = set()
+        self.loops = []
+        self.parallel_loops = []
+        self.block_depth = 0
+        self.return_types = []
+        self.move_candidates = {}
+        param_infos = list(self.variables.values())
+        try:
+            body = self.resolve_moves(self.parse_block())
+            if self.track_allocs:
+                # 特化版本与通用版本计入同一个函数
+                body.insert(0, self.alloc_scope(f"{signature['class']}::{signature['name']}"))
+            return_types = set(self.return_types)
+            if not ends_with_return(body):
+                return_types.add(ANY_TYPE)
+            return body, return_types, [self.passes_by_reference(info) for info in param_infos]
+        except MetaLangError:
+            return None
+        finally:
+            (state, self.variables, self.current_function, self.return_type, self.pending_tasks,
+             self.dynamic_exprs, self.loops, self.parallel_loops, self.block_depth, self.return_types,
+             self.move_candidates) = saved
+            self.restore_lexer_state(state)
+
+    def specialize(self, func_name, signature, args):
+        """无类型参数收到原生数值时，调用按实参类型特化的版本，参数不必装箱
+        返回被调用的函数名，以及特化版本推断出的原生返回类型（没有时为 None）"""
+        if 'body' not in signature:
+            return func_name, None
+        tags = []
+        for arg, param_type in zip(args, signature['param_types']):
+            arg_type = self.type_of(arg)
+            tags.append(self.SPECIALIZATION_TAGS.get(arg_type, 'a') if param_type == ANY_TYPE else 'a')
+        if all(tag == 'a' for tag in tags):
+            return func_name, None
+        key = (func_name, ''.join(tags))
+        if key in self.specializations:
+            # 递归调用时特化版本还在解析中，返回值按 any 处理
+            specialization = self.specializations[key]
+            return specialization['name'], specialization.get('inferred')
+        types_by_tag = {}
+        for cpp_type, tag in self.SPECIALIZATION_TAGS.items():
+            types_by_tag.setdefault(tag, cpp_type)
+        types = [types_by_tag.get(tag) for tag in tags]
+        specialization = {
+            'name': f"{func_name}_meta_{''.join(tags)}",
+            'of': func_name,
+            'params': signature['params'],
+            'param_types': [cpp_type or param_type for cpp_type, param_type in zip(types, signature['param_types'])],
+            'return_type': signature['return_type'],
+        }
+        self.specializations[key] = specialization
+        result = self.parse_specialized_body(signature, types)
+        if result is None:
+            # 函数体按原生类型无法保持 any 的语义，转发给通用版本
+            specialization['body'] = [f"return {func_name}({', '.join(signature['params'])});"]
+            return specialization['name'], None
+        specialization['body'], return_types, specialization['param_refs'] = result
+        # 所有 return 都是同一种原生数值时，返回值不必装箱
+        if signature['return_type'] == ANY_TYPE and len(return_types) == 1:
+            inferred = next(iter(return_types))
+            if inferred in self.SPECIALIZATION_TAGS:
+                specialization['return_type'] = specialization['inferred'] = inferred
+        return specialization['name'], specialization.get('inferred')
+
+    def attach_specializations(self, statements):
+        """特化的函数放在原函数所在的类中"""
+        classes = {}
+        for stmt in statements:
+            if isinstance(stmt, dict) and stmt['type'] == 'class':
+                for func in stmt['data']['functions']:
+                    classes.setdefault(func['name'], stmt['data'])
+        for specialization in self.specializations.values():
+            classes[specialization['of']].setdefault('specializations', []).append(specialization)
+
+    def parse_block(self):
+        """{ 语句... }：块中声明的变量在块结束后失效，块中创建的任务必须在块中 await"""
+        self.eat(TokenType.LBRACE)
+        outer_variables = dict(self.variables)
+        self.block_depth += 1
+        statements = []
+        while self.current_token.type != TokenType.RBRACE:
+            line = self.line_directive()
+            statements.append(line + self.parse_function_statement())
+        unfinished = sorted(name for name in self.pending_tasks if self.variables[name]['block'] == self.block_depth)
+        if unfinished:
+            self.error(f"任务 {', '.join(unfinished)} 没有被 await")
+        self.eat(TokenType.RBRACE)
+        self.block_depth -= 1
+        self.variables = outer_variables
+        return statements
+
+    def line_directive(self):
+        """语句前的 #line N "file.meta"：g++ 的诊断、调试信息以及 perf、sanitizer 的报告指向 Meta 源码行"""
+        if self.source_name is None:
+            return ""
+        name = self.source_name.replace('\\', '\\\\').replace('"', '\\"')
+        return f'#line {self.current_token.line_number} "{name}"\n'
+
+    def parse_function_statement(self):
+        token = self.current_token
+        if token.type == TokenType.IDENTIFIER and token.value in self.CONTROL_STATEMENTS:
+            return getattr(self, self.CONTROL_STATEMENTS[token.value])()
+        if token.type == TokenType.DATA:
+            return self.parse_data_declaration()
+        elif token.type == TokenType.IDENTIFIER and token.value == 'print':
+            return self.parse_print_statement()
+        elif token.type == TokenType.IDENTIFIER and self.peek_next_token().type in (TokenType.ASSIGN, TokenType.LBRACKET):
+            return self.parse_assignment_statement()
+        elif token.type == TokenType.IDENTIFIER and token.value in self.imports and self.peek_next_token().type == TokenType.DOT:
+            namespace = token.value
+            self.eat(TokenType.IDENTIFIER)
+            call = self.parse_module_call(namespace)
+            self.eat(TokenType.SEMI)
+            return f'{call};'
+        elif token.type == TokenType.IDENTIFIER and self.peek_next_token().type == TokenType.DOT:
+            # 对象成员变量赋值 p.x = ...
+            return self.parse_assignment_statement()
+        elif token.type == TokenType.IDENTIFIER and self.peek_next_token().type == TokenType.LPAREN:
+            callee = token.value
+            self.eat(TokenType.IDENTIFIER)
+            call = self.parse_call(callee)
+            self.eat(TokenType.SEMI)
+            return f'{call};'
+        elif token.type == TokenType.RETURN:
+            if self.parallel_loops:
+                self.error("并行循环中不能使用 return")
+            self.eat(TokenType.RETURN)
+            if self.current_token.type == TokenType.SEMI:
+                self.eat(TokenType.SEMI)
+                return "return;"
+            if self.return_type == VOID_TYPE:
+                self.error("返回类型为 void 的函数不能返回值")
+            expr = self.parse_expression()
+            self.eat(TokenType.SEMI)
+            self.return_types.append(self.type_of(expr))
+            # 直接返回的参数按值传递，返回时移动而不是复制
+            if expr in self.variables:
+                self.mark_modified(expr)
+            return f"return {self.convert_value(expr, self.return_type)};"
+        elif token.type == TokenType.REF:
+            return self.parse_ref()
+        elif token.type == TokenType.OWNER:
+            return self.parse_owner()
+        elif token.type == TokenType.DELETE:
+            return self.parse_delete()
+        self.error("无效的语句")
+
+    def format_block(self, header, statements):
+        lines = [f"{header} {{"]
+        for statement in statements:
+            lines += ["    " + line for line in statement.split('\n')]
+        lines.append("}")
+        return '\n'.join(lines)
+
+    def parse_condition(self):
+        self.eat(TokenType.LPAREN)
+        expr = self.condition(self.parse_expression())
+        self.eat(TokenType.RPAREN)
+        return expr
+
+    def parse_if(self):
+        """if (条件) {...} else if (条件) {...} else {...}"""
+        self.eat(TokenType.IDENTIFIER)
+        code = self.format_block(f"if ({self.parse_condition()})", self.parse_block())
+        if self.current_token.type == TokenType.IDENTIFIER and self.current_token.value == 'else':
+            self.eat(TokenType.IDENTIFIER)
+            if self.current_token.type == TokenType.IDENTIFIER and self.current_token.value == 'if':
+                code += " else " + self.parse_if()
+            else:
+                code += " " + self.format_block("else", self.parse_block())
+        return code
+
+    def parse_while(self):
+        """while (条件) {...}"""
+        self.eat(TokenType.IDENTIFIER)
+        # 条件每次迭代都会计算，与循环体一样属于循环
+        loop = {'var': None, 'resized': set(), 'deferred': [], 'borrow_uses': []}
+        self.loops.append(loop)
+        condition = self.parse_condition()
+        body = self.parse_block()
+        self.loops.pop()
+        return self.format_block(f"while ({condition})", body)
+
+    def parse_for(self):
+        """for (i in a:b) 或 for (i in a:b:步长)，生成原生 for 循环
+        循环变量默认为 long long，可以用 for (data<int32> i in a:b) 指定整数类型"""
+        self.eat(TokenType.IDENTIFIER)
+        cpp_type, var_name, start, end, step = self.parse_range_header()
+        loop, body = self.parse_loop_body(cpp_type, var_name, start, end)
+
+        # 终点只计算一次，便于 g++ 展开和向量化
+        end_name = f"meta_end_{var_name}"
+        increment = f"++{var_name}" if step == 1 else f"{var_name} += {step}"
+        code = self.format_block(
+            f"for ({cpp_type} {var_name} = {start}, {end_name} = {end}; {var_name} < {end_name}; {increment})", body)
+        return self.resolve_bounds_checks(loop, code)
+
+    def parse_range_header(self):
+        """(i in a:b[:步长]) 或 (data<T> i in a:b[:步长])，返回循环变量类型、名字、起点、终点与步长"""
+        self.eat(TokenType.LPAREN)
+        cpp_type = LONG_LONG_TYPE
+        if self.current_token.type == TokenType.DATA:
+            self.eat(TokenType.DATA)
+            cpp_types = [t for param in self.parse_template_parameters() for t in self.template_types(param)]
+            if len(cpp_types) != 1 or cpp_types[0] not in self.INTEGER_TYPES:
+                self.error("循环变量需要是单一的整数类型，例如 data<int32>")
+            cpp_type = cpp_types[0]
+        var_name = self.current_token.value
+        self.eat(TokenType.IDENTIFIER)
+        if var_name in self.CPP_KEYWORDS:
+            var_name = f"{var_name}_"
+        if self.current_token.type != TokenType.IDENTIFIER or self.current_token.value != 'in':
+            self.error("预期 in，例如 for (i in 0:n)")
+        self.eat(TokenType.IDENTIFIER)
+        start = self.loop_bound(self.parse_expression())
+        self.eat(TokenType.COLON)
+        end = self.loop_bound(self.parse_expression())
+        step = 1
+        if self.current_token.type == TokenType.COLON:
+            self.eat(TokenType.COLON)
+            step = self.current_token.value
+            if self.current_token.type != TokenType.NUMBER or not isinstance(step, int) or step <= 0:
+                self.error("循环步长需要是正整数")
+            self.eat(TokenType.NUMBER)
+        self.eat(TokenType.RPAREN)
+        return cpp_type, var_name, start, end, step
+
+    def parse_loop_body(self, cpp_type, var_name, start, end, parallel=None, body=None):
+        """在循环变量的作用域中解析循环体，body 默认为代码块"""
+        outer_variables = dict(self.variables)
+        self.variables[var_name] = {'type': cpp_type, 'dimensions': [], 'owner': True, 'borrowed_by': None,
+                                    'flat': False, 'induction': True}
+        loop = {'var': var_name, 'start': start, 'end': end, 'resized': set(), 'deferred': [], 'borrow_uses': [],
+                'parallel': parallel is not None}
+        self.loops.append(loop)
+        if parallel is not None:
+            parallel['info'] = self.variables[var_name]
+            self.parallel_loops.append(parallel)
+        result = (body or self.parse_block)()
+        if parallel is not None:
+            self.parallel_loops.pop()
+            self.check_parallel_races(parallel)
+        self.loops.pop()
+        self.variables = outer_variables
+        return loop, result
+
+    def resolve_bounds_checks(self, loop, code):
+        """循环体中没有改变长度的数组，用循环变量访问时不需要越界检查"""
+        for marker, array, checked, unchecked in reversed(loop['deferred']):
+            code = code.replace(marker, checked if array in loop['resized'] else unchecked)
+        return code
+
+    def parallel_context(self, var_name):
+        # info 为循环变量的变量信息，由 parse_loop_body 填入
+        return {'var': var_name, 'info': None, 'outer': dict(self.variables), 'writes': set(), 'reads': []}
+
+    def parse_parallel_for(self):
+        """parallel for (i in a:b) {...}：把下标区间分块交给线程池，所有迭代结束后才继续
+        循环体只能写入循环内声明的变量和外部数组的第 i 个元素，编译器会检查数据竞争"""
+        self.eat(TokenType.IDENTIFIER)
+        if self.current_token.type != TokenType.IDENTIFIER or self.current_token.value != 'for':
+            self.error("预期 for，例如 parallel for (i in 0:n)")
+        self.eat(TokenType.IDENTIFIER)
+        cpp_type, var_name, start, end, step = self.parse_range_header()
+        loop, body = self.parse_loop_body(cpp_type, var_name, start, end, self.parallel_context(var_name))
+        if self.track_allocs:
+            # 循环体在线程池的线程中执行，分配同样计入所在的函数
+            body.insert(0, "meta_alloc::Scope meta_alloc_scope(meta_alloc_id);")
+        code = self.format_block(f"meta_task::parallel_for({start}, {end}, {step}, [&]({cpp_type} {var_name})", body)
+        return self.resolve_bounds_checks(loop, code + ");")
+
+    def parse_parallel_reduce(self):
+        """parallel sum(i in a:b) 表达式，以及 min、max、count(i in a:b) 条件
+        表达式对每个下标求值一次，各块分别累积后合并；表达式延伸到所在表达式的末尾"""
+        kind = self.current_token.value
+        self.eat(TokenType.IDENTIFIER)
+        line = self.source_line()
+        cpp_type, var_name, start, end, step = self.parse_range_header()
+        def parse_body():
+            # 表达式的类型依赖循环变量，必须在循环变量的作用域中求出
+            expr = self.parse_expression()
+            return expr, self.type_of(expr), self.condition(expr) if kind == 'count' else None
+        loop, (expr, expr_type, condition) = self.parse_loop_body(cpp_type, var_name, start, end,
+                                                                  self.parallel_context(var_name), parse_body)
+        if kind == 'count':
+            value, result_type = f"static_cast<long long>({condition})", LONG_LONG_TYPE
+        elif expr_type not in self.NUMERIC_RANKS:
+            self.error(f"parallel {kind} 需要原生数值表达式，any 值可以先用 get<T>(...) 取出")
+        elif kind == 'sum':
+            # 整数求和用 long long 累积，避免 int 溢出
+            result_type = LONG_LONG_TYPE if expr_type in self.INTEGER_TYPES else expr_type
+            value = f"static_cast<{result_type}>({expr})"
+        else:
+            value, result_type = expr, expr_type
+        if kind in ('sum', 'count'):
+            init = f"static_cast<{result_type}>(0)"
+        else:
+            init = f"std::numeric_limits<{result_type}>::{'max' if kind == 'min' else 'lowest'}()"
+        args = (f"{start}, {end}, {step}, {init}, "
+                f"[&]({cpp_type} {var_name}) -> {result_type} {{ return {value}; }}, {self.PARALLEL_REDUCTIONS[kind]}")
+        if kind in ('sum', 'count'):
+            code = f"meta_task::parallel_reduce({args})"
+        else:
+            code = f'meta_task::parallel_reduce_nonempty("{kind}", {line}, {args})'
+        return self.typed(self.resolve_bounds_checks(loop, code), result_type)
+
+    def loop_bound(self, expr):
+        if self.type_of(expr) == ANY_TYPE:
+            return f"static_cast<long long>(MetaUtils::to_double({expr}))"
+        return expr
+
+    def parse_loop_jump(self):
+        """break; 与 continue;"""
+        keyword = self.current_token.value
+        if not self.loops:
+            self.error(f"{keyword} 只能用于循环中")
+        self.eat(TokenType.IDENTIFIER)
+        self.eat(TokenType.SEMI)
+        if self.loops[-1].get('parallel'):
+            # parallel for 的循环体是每个下标调用一次的函数
+            if keyword == 'break':
+                self.error("parallel for 中不能使用 break")
+            return "return;"
+        return f"{keyword};"
+
+    def parse_assignment_statement(self):
+        var_name = self.current_token.value
+        if var_name not in self.variables and var_name not in self.class_variables:
+            self.error(f"使用未声明的变量: {var_name}")
+        
+        self.eat(TokenType.IDENTIFIER)
+        info = self.lookup_variable(var_name)
+        if info.get('task'):
+            self.error(f"任务 {var_name} 不能被重新赋值")
+        if info.get('induction'):
+            self.error(f"循环变量 {var_name} 不能在循环体中赋值")
+        self.record_member_write(var_name)
+        
+        # 检查是否是数组下标赋值
+        if self.current_token.type == TokenType.LBRACKET:
+            # 解析数组下标表达式
+            subscript = self.parse_subscript_or_slice(var_name, write=True)
+            target = self.parse_field_access(subscript)  # ps[i].x = ...
             self.eat(TokenType.ASSIGN)
             # 解析赋值表达式
             expr = self.parse_expression()
             self.eat(TokenType.SEMI)
-            return f"{subscript} = {expr};"
+            if target != subscript:
+                expr = self.convert_field_value(expr, target)
+            return f"{target} = {expr};"
+        elif self.current_token.type == TokenType.DOT:
+            # 对象成员变量赋值，修改的是整个对象
+            self.check_alive(var_name)
+            self.record_write(var_name)
+            target = self.parse_field_access(var_name)
+            self.eat(TokenType.ASSIGN)
+            expr = self.parse_expression()
+            self.eat(TokenType.SEMI)
+            prefix = "this->" if var_name in self.class_variables else ""
+            return f"{prefix}{target} = {self.convert_field_value(expr, target)};"
         else:
-            # 普通变量赋值
+            # 普通变量赋值，数组整体赋值可能改变长度
+            self.check_borrow_valid(var_name, info)
+            self.record_write(var_name)
+            self.record_resize(var_name)
             self.eat(TokenType.ASSIGN)
             expr = self.parse_expression()
             self.eat(TokenType.SEMI)
+            if info.get('dynamic'):
+                self.require_dynamic(self.type_of(expr) == info['type'])
+            elif info['type'].kind != 'variant':
+                expr = self.convert_value(expr, info['type'])
             prefix = "this->" if var_name in self.class_variables else ""
             return f"{prefix}{var_name} = {expr};"
         
+    def convert_field_value(self, expr, target):
+        field_type = self.type_of(target)
+        if field_type is None or field_type.kind == 'variant':
+            return expr
+        return self.convert_value(expr, field_type)
+
     def parse_template_parameters(self):
         """解析模板参数"""
         self.eat(TokenType.LT)
@@ -983,7 +2561,7 @@ namespace math{
         while self.current_token.type != TokenType.GT:
             if self.current_token.type == TokenType.IDENTIFIER:
                 param = self.current_token.value
-                if param not in self.TYPE_MAP:
+                if not self.is_type_name(param):
                     self.error(f"未知的模板类型: {param}")
                 params.append(param)
                 self.eat(TokenType.IDENTIFIER)
@@ -1067,28 +2645,73 @@ namespace math{
         else:
             self.error(f"无效的语句: {self.current_token.type}")
 
-def generate_cpp_code(statements):
-    cpp_code = """\
-#include <iostream>
-#include <any>
-#include <typeinfo>
-#include <map>
-#include <string>
-#include <variant>
-#include <vector>
-#include <utility>
-#include <iomanip>
-#include <stdexcept>
-#include <sstream>
-#include <array>
-#include <cmath>
-#include <string>
-#include <algorithm>
-
-using namespace std;
-"""
-    cpp_code+=default_code
-    cpp_code+="""
+# 运行时的可选部分：生成的代码中出现对应的名字时才输出
+RUNTIME_TRIGGERS = {
+    'bigint': r'\bBigInt\b',
+    'int128': r'__int128',
+    'variant': r'\bvariant<',
+    'cast': r'\bMetaUtils::(get|get_or|safe_any_cast)\b',
+    'strbuf': r'\bMetaStringBuilder\b',
+    'array': r'\bmeta_array::',
+    'any_input': r'\bcin\s*>>',
+    'task': r'\bmeta_task::',
+    'alloc': r'\bmeta_alloc::',
+}
+# 可选部分之间的依赖
+RUNTIME_DEPENDENCIES = {
+    'strbuf': ['text'],
+    'any_arith': ['text'],
+}
+# 各部分需要的头文件，None 为总是输出的部分
+RUNTIME_HEADERS = {
+    None: ['<iostream>', '<any>', '<typeinfo>', '<string>', '<string_view>', '<vector>',
+           '<stdexcept>', '<type_traits>', '<utility>'],
+    'bigint': ['<algorithm>'],
+    'int128': ['<sstream>', '<algorithm>'],
+    'variant': ['<variant>'],
+    'cast': ['<cxxabi.h>', '<cstdlib>'],
+    'text': ['<charconv>', '<cstdio>', '<cstring>', '<sstream>'],
+    'strbuf': ['<variant>'],
+    'array': ['<array>', '<algorithm>', '<functional>', '<variant>'],
+    'task': ['<thread>', '<mutex>', '<condition_variable>', '<deque>', '<functional>', '<memory>',
+             '<atomic>', '<chrono>', '<exception>', '<cstdlib>', '<algorithm>', '<limits>'],
+    'alloc': ['<atomic>', '<cstddef>', '<cstdio>', '<cstdlib>', '<cstring>', '<new>'],
+}
+# 生成的代码直接用到的标准库
+PROGRAM_HEADERS = {
+    '<array>': r'\barray<',
+    '<map>': r'\bmap<',
+    '<cmath>': r'\bstd::(pow|sqrt|exp|log|floor|ceil|fabs|fmod)\(',
+    '<iomanip>': r'\bset(precision|w|fill)\(',
+}
+
+def runtime_usage(program_code, features=()):
+    """分析生成的代码，返回需要输出的运行时部分；features 为解析器记录的隐式用法（如 any 运算符）"""
+    used = set(features)
+    for section, pattern in RUNTIME_TRIGGERS.items():
+        if re.search(pattern, program_code):
+            used.add(section)
+    for section in list(used):
+        used.update(RUNTIME_DEPENDENCIES.get(section, []))
+    return used
+
+def generate_runtime_code(program_code=None, features=()):
+    """生成运行时代码（头文件、BigInt、any 运算符与数组批量操作）
+    program_code 为 None 时输出全部内容，否则只输出程序用到的部分"""
+    if program_code is None:
+        used = set(RUNTIME_TRIGGERS) | set(RUNTIME_DEPENDENCIES) | {'text', 'any_arith', 'any_compare'}
+    else:
+        used = runtime_usage(program_code, features)
+    headers = list(RUNTIME_HEADERS[None])
+    for section in sorted(used):
+        headers += RUNTIME_HEADERS.get(section, [])
+    for header, pattern in PROGRAM_HEADERS.items():
+        if program_code is None or re.search(pattern, program_code):
+            headers.append(header)
+    cpp_code = ''.join(f"#include {header}\n" for header in dict.fromkeys(headers))
+    cpp_code += "\nusing namespace std;\n"
+    if 'bigint' in used:
+        cpp_code += """
 class BigInt {
 private:
     std::vector<int> digits;
@@ -1234,16 +2857,21 @@ public:
         return os << num.to_string();
     }
 };
+"""
+    cpp_code += """
 // 先声明 operator<< 以便后续使用
-ostream& operator<<(ostream& os, const any& value);
+inline ostream& operator<<(ostream& os, const any& value);
 
 // 自定义异常类
 class MetaRuntimeError : public runtime_error {
 public:
     MetaRuntimeError(const string& msg) : runtime_error(msg) {}
 };
+"""
+    if 'int128' in used:
+        cpp_code += """
 // 为 __int128 类型重载 << 运算符
-ostream& operator<<(ostream& os, __int128& value) {
+inline ostream& operator<<(ostream& os, __int128& value) {
     std::ostringstream oss;
     if (value < 0) {
         oss.put('-');
@@ -1266,7 +2894,7 @@ ostream& operator<<(ostream& os, __int128& value) {
 }
 
 // 自定义 __int128 转换为字符串的函数
-string to_string(__int128 value) {
+inline string to_string(__int128 value) {
     std::ostringstream oss;
     if (value < 0) {
         oss.put('-');
@@ -1281,25 +2909,25 @@ string to_string(__int128 value) {
     std::reverse(result.begin(), result.end());
     return result;
 }
+"""
+    cpp_code += """
 // 类型转换和检查工具函数
 namespace MetaUtils {
-    template<typename T>
-    T safe_any_cast(const any& value) {
-        try {
-            return any_cast<T>(value);
-        } catch (const bad_any_cast& e) {
-            throw MetaRuntimeError("类型转换错误: " + string(e.what()));
-        }
+    // 可选类型（__int128、variant 等）的打印函数，由用到这些类型的编译单元注册
+    using AnyPrinter = bool (*)(ostream&, const any&);
+    inline vector<AnyPrinter>& any_printers() {
+        static vector<AnyPrinter> printers;
+        return printers;
     }
 
-    bool is_numeric(const any& value) {
+    inline bool is_numeric(const any& value) {
         const type_info& tid = value.type();
         return tid == typeid(int) || tid == typeid(double) || 
                tid == typeid(float) || tid == typeid(long) ||
                tid == typeid(long long) || tid == typeid(short);
     }
 
-    double to_double(const any& value) {
+    inline double to_double(const any& value) {
         if (value.type() == typeid(int)) return any_cast<int>(value);
         if (value.type() == typeid(double)) return any_cast<double>(value);
         if (value.type() == typeid(float)) return any_cast<float>(value);
@@ -1308,9 +2936,198 @@ namespace MetaUtils {
         if (value.type() == typeid(short)) return any_cast<short>(value);
         throw MetaRuntimeError("无法转换为数值类型");
     }
+
+    // 整数之间的 any 运算保持整数结果
+    inline bool is_integral(const any& value) {
+        const type_info& tid = value.type();
+        return tid == typeid(int) || tid == typeid(long) || tid == typeid(long long) || tid == typeid(short);
+    }
+
+    inline long long to_integer(const any& value) {
+        if (value.type() == typeid(int)) return any_cast<int>(value);
+        if (value.type() == typeid(long)) return any_cast<long>(value);
+        if (value.type() == typeid(long long)) return any_cast<long long>(value);
+        return any_cast<short>(value);
+    }
+
+    // 条件判断：bool 取其值，数值非 0、字符串非空为真，空值为假
+    inline bool truthy(const any& value) {
+        if (!value.has_value()) return false;
+        if (value.type() == typeid(bool)) return any_cast<bool>(value);
+        if (is_numeric(value)) return to_double(value) != 0;
+        if (value.type() == typeid(string)) return !any_cast<const string&>(value).empty();
+        if (value.type() == typeid(const char*)) return *any_cast<const char*>(value) != 0;
+        return true;
+    }
+
+    // 整数除法与取余，除数为 0 时报告 Meta 源码行号
+    [[noreturn]] [[gnu::cold]] [[gnu::noinline]]
+    inline void division_by_zero(int line) {
+        throw MetaRuntimeError("除零错误 (Meta 源码第 " + std::to_string(line) + " 行)");
+    }
+
+    template<typename A, typename B>
+    auto divide(A a, B b, int line) {
+        if (b == 0) division_by_zero(line);
+        return a / b;
+    }
+
+    template<typename A, typename B>
+    auto remainder(A a, B b, int line) {
+        if (b == 0) division_by_zero(line);
+        return a % b;
+    }
+}
+"""
+    if 'cast' in used:
+        cpp_code += """
+namespace MetaUtils {
+    // 可读的 C++ 类型名
+    inline string type_name(const type_info& type) {
+        int status = 0;
+        char* demangled = abi::__cxa_demangle(type.name(), nullptr, nullptr, &status);
+        string name = status == 0 ? demangled : type.name();
+        free(demangled);
+        return name;
+    }
+
+    template<typename T>
+    T safe_any_cast(const any& value) {
+        if (const T* p = any_cast<T>(&value)) return *p;
+        throw MetaRuntimeError("类型转换错误: 期望 " + type_name(typeid(T)) + "，实际为 " + type_name(value.type()));
+    }
+
+    // 类型不匹配时的冷路径，不内联，避免影响热循环
+    [[noreturn]] [[gnu::cold]] [[gnu::noinline]]
+    inline void cast_error(const type_info& expected, const type_info& actual, bool has_value, int line) {
+        throw MetaRuntimeError("类型转换错误: 期望 " + type_name(expected) + "，实际为 " +
+                               (has_value ? type_name(actual) : string("null")) +
+                               " (Meta 源码第 " + std::to_string(line) + " 行)");
+    }
+
+    // 依次尝试 T, Rest... 中的类型，命中时转换为 R
+    template<typename R, typename T, typename... Rest>
+    bool try_get(const any& value, R& out) {
+        if (const T* p = any_cast<T>(&value)) {
+            out = static_cast<R>(*p);
+            return true;
+        }
+        if constexpr (sizeof...(Rest) > 0) return try_get<R, Rest...>(value, out);
+        else return false;
+    }
+
+    // get<T>(x)：指针形式的 any_cast 加分支预测，不匹配时报告 Meta 源码行号
+    // Ts 为空时只接受 R 本身，否则接受 Ts 中的任一类型
+    template<typename R, typename... Ts>
+    R get(const any& value, int line) {
+        if constexpr (sizeof...(Ts) == 0) {
+            const R* p = any_cast<R>(&value);
+            if (__builtin_expect(p == nullptr, 0)) cast_error(typeid(R), value.type(), value.has_value(), line);
+            return *p;
+        } else {
+            R out{};
+            if (__builtin_expect(!try_get<R, Ts...>(value, out), 0)) cast_error(typeid(R), value.type(), value.has_value(), line);
+            return out;
+        }
+    }
+"""
+        if 'variant' in used:
+            cpp_code += """
+    template<typename R, typename... Ts, typename... Vs>
+    R get(const variant<Vs...>& value, int line) {
+        return visit([line](const auto& x) -> R {
+            if constexpr (is_convertible_v<decltype(x), R>) return static_cast<R>(x);
+            else cast_error(typeid(R), typeid(x), true, line);
+        }, value);
+    }
+"""
+        cpp_code += """
+
+    template<typename R, typename... Ts, typename U>
+    R get(const U& value, int) {
+        static_assert(is_convertible_v<U, R>, "get 的类型与变量类型不兼容");
+        return static_cast<R>(value);
+    }
+
+    // get?<T>(x)：类型不匹配时返回默认值，不使用异常
+    template<typename R, typename... Ts>
+    R get_or(const any& value, const R& fallback = R{}) {
+        if constexpr (sizeof...(Ts) == 0) {
+            const R* p = any_cast<R>(&value);
+            return __builtin_expect(p != nullptr, 1) ? *p : fallback;
+        } else {
+            R out{};
+            return __builtin_expect(try_get<R, Ts...>(value, out), 1) ? out : fallback;
+        }
+    }
+"""
+        if 'variant' in used:
+            cpp_code += """
+    template<typename R, typename... Ts, typename... Vs>
+    R get_or(const variant<Vs...>& value, const R& fallback = R{}) {
+        return visit([&fallback](const auto& x) -> R {
+            if constexpr (is_convertible_v<decltype(x), R>) return static_cast<R>(x);
+            else return fallback;
+        }, value);
+    }
+"""
+        cpp_code += """
+
+    template<typename R, typename... Ts, typename U>
+    R get_or(const U& value, const R& fallback = R{}) {
+        if constexpr (is_convertible_v<U, R>) return static_cast<R>(value);
+        else return fallback;
+    }
 }
+"""
+    if 'text' in used:
+        cpp_code += """
+namespace MetaUtils {
+    // 把数值按 ostream 的默认格式追加到字符串末尾，不经过 stringstream
+    template<typename T>
+    void append_number(string& out, T value) {
+        char buffer[64];
+        if constexpr (is_floating_point_v<T>) {
+            int length = snprintf(buffer, sizeof(buffer), "%Lg", static_cast<long double>(value));
+            out.append(buffer, length);
+        } else {
+            auto result = to_chars(buffer, buffer + sizeof(buffer), value);
+            out.append(buffer, result.ptr - buffer);
+        }
+    }
+
+    // 把 any 的文本形式追加到字符串末尾，常见类型走快速路径
+    inline void append_to(string& out, const any& value) {
+        const type_info& tid = value.type();
+        if (tid == typeid(string)) out += any_cast<const string&>(value);
+        else if (tid == typeid(const char*)) out += any_cast<const char*>(value);
+        else if (tid == typeid(string_view)) out += any_cast<string_view>(value);
+        else if (tid == typeid(int)) append_number(out, any_cast<int>(value));
+        else if (tid == typeid(long long)) append_number(out, any_cast<long long>(value));
+        else if (tid == typeid(long)) append_number(out, any_cast<long>(value));
+        else if (tid == typeid(short)) append_number(out, any_cast<short>(value));
+        else if (tid == typeid(double)) append_number(out, any_cast<double>(value));
+        else if (tid == typeid(float)) append_number(out, any_cast<float>(value));
+        else if (tid == typeid(bool)) out += any_cast<bool>(value) ? "true" : "false";
+        else {
+            ostringstream ss;
+            ss << value;
+            out += ss.str();
+        }
+    }
 
-ostream& operator<<(ostream& os, const any& value) {
+    // 估计 any 的文本长度，用于预留空间
+    inline size_t text_size_hint(const any& value) {
+        const type_info& tid = value.type();
+        if (tid == typeid(string)) return any_cast<const string&>(value).size();
+        if (tid == typeid(const char*)) return strlen(any_cast<const char*>(value));
+        if (tid == typeid(string_view)) return any_cast<string_view>(value).size();
+        return 24;
+    }
+}
+"""
+    cpp_code += """
+inline ostream& operator<<(ostream& os, const any& value) {
     if (!value.has_value()) {
         return os << "null";
     }
@@ -1323,71 +3140,111 @@ ostream& operator<<(ostream& os, const any& value) {
         else if (tid == typeid(float)) os << any_cast<float>(value);
         else if (tid == typeid(long)) os << any_cast<long>(value);
         else if (tid == typeid(long long)) os << any_cast<long long>(value);
+        else if (tid == typeid(long double)) os << any_cast<long double>(value);
         else if (tid == typeid(short)) os << any_cast<short>(value);
         else if (tid == typeid(string)) os << any_cast<string>(value);
         else if (tid == typeid(bool)) os << boolalpha << any_cast<bool>(value);
         else if (tid == typeid(const char*)) os << any_cast<const char*>(value);
-        else if (tid == typeid(__int128)) os << to_string(any_cast<__int128>(value));
-        // 处理 variant 类型
-        else if (tid.name() == string("std::variant<const char*, std::__cxx11::basic_string<char, std::char_traits<char>, std::allocator<char> > >")) {
-            try {
-                os << get<const char*>(any_cast<variant<const char*, string>>(value));
-            } catch (...) {
-                try {
-                    os << get<string>(any_cast<variant<const char*, string>>(value));
-                } catch (...) {
-                    os << "[variant_error]";
-                }
+        else if (tid == typeid(string_view)) os << any_cast<string_view>(value);
+        else {
+            for (auto printer : MetaUtils::any_printers()) {
+                if (printer(os, value)) return os;
             }
+            os << "[unknown_type:" << tid.name() << "]";
         }
-        // 处理其他 variant 组合
-        else if (tid.name() == string("std::variant<short, int, long, long long, float, double, long double>")) {
-            try {
-                os << MetaUtils::to_double(value);
-            } catch (...) {
-                os << "[numeric_variant_error]";
-            }
-        }
-        else if (tid.name() == string("std::variant<bool>")) {
-            os << boolalpha << any_cast<bool>(value);
-        }
-        else os << "[unknown_type:" << tid.name() << "]";
     } catch (const bad_any_cast& e) {
         os << "[any_cast_error:" << e.what() << "]";
     }
     return os;
 }
+"""
+    if 'int128' in used:
+        cpp_code += """
+inline const bool meta_int128_printer = (MetaUtils::any_printers().push_back([](ostream& os, const any& value) {
+    if (value.type() != typeid(__int128)) return false;
+    os << to_string(any_cast<__int128>(value));
+    return true;
+}), true);
+"""
+    if 'variant' in used:
+        cpp_code += """
+// variant 按当前保存的值打印
+template<typename T, typename... Ts>
+ostream& operator<<(ostream& os, const variant<T, Ts...>& value) {
+    visit([&os](const auto& x) { os << x; }, value);
+    return os;
+}
+
+namespace MetaUtils {
+    template<typename T, typename = void>
+    struct is_printable : false_type {};
+    template<typename T>
+    struct is_printable<T, void_t<decltype(declval<ostream&>() << declval<const T&>())>> : true_type {};
+
+    // 保存在 any 中的 variant 按当前保存的值打印；每种 variant 类型注册一次
+    template<typename... Ts>
+    bool print_variant(ostream& os, const any& value) {
+        if (value.type() != typeid(variant<Ts...>)) return false;
+        if constexpr ((is_printable<Ts>::value && ...)) {
+            os << any_cast<const variant<Ts...>&>(value);
+            return true;
+        } else {
+            return false;
+        }
+    }
+
+    template<typename V> inline const bool variant_printer = false;
+    template<typename... Ts>
+    inline const bool variant_printer<variant<Ts...>> = (any_printers().push_back(print_variant<Ts...>), true);
+}
+"""
+        # 程序中出现的 variant 类型（对象类型在运行时之后才声明，不能打印，不注册）
+        variants = [spelling for spelling in dict.fromkeys(re.findall(r'std::variant<[^<>]*>', program_code or ''))
+                    if 'meta_class::' not in spelling]
+        if variants:
+            registrations = ', '.join(f"MetaUtils::variant_printer<{spelling}>" for spelling in variants)
+            cpp_code += f"[[maybe_unused]] static const bool meta_variant_printers[] = {{{registrations}}};\n"
+    if 'any_arith' in used:
+        cpp_code += """
 
 // 算术运算符重载
-any operator+(const any& lhs, const any& rhs) {
+inline any operator+(const any& lhs, const any& rhs) {
+    if (MetaUtils::is_integral(lhs) && MetaUtils::is_integral(rhs)) {
+        return MetaUtils::to_integer(lhs) + MetaUtils::to_integer(rhs);
+    }
     if (MetaUtils::is_numeric(lhs) && MetaUtils::is_numeric(rhs)) {
         return MetaUtils::to_double(lhs) + MetaUtils::to_double(rhs);
     }
     
-    if (lhs.type() == typeid(string) && rhs.type() == typeid(string)) {
-        return any(any_cast<string>(lhs) + any_cast<string>(rhs));
-    }
-    
-    stringstream ss;
-    ss << lhs << rhs;
-    return any(ss.str());
+    // 拼接：预留一次空间，直接追加两侧的文本
+    string result;
+    result.reserve(MetaUtils::text_size_hint(lhs) + MetaUtils::text_size_hint(rhs));
+    MetaUtils::append_to(result, lhs);
+    MetaUtils::append_to(result, rhs);
+    return any(std::move(result));
 }
 
-any operator-(const any& lhs, const any& rhs) {
+inline any operator-(const any& lhs, const any& rhs) {
+    if (MetaUtils::is_integral(lhs) && MetaUtils::is_integral(rhs)) {
+        return MetaUtils::to_integer(lhs) - MetaUtils::to_integer(rhs);
+    }
     if (MetaUtils::is_numeric(lhs) && MetaUtils::is_numeric(rhs)) {
         return MetaUtils::to_double(lhs) - MetaUtils::to_double(rhs);
     }
     throw MetaRuntimeError("不支持的减法操作类型");
 }
 
-any operator*(const any& lhs, const any& rhs) {
+inline any operator*(const any& lhs, const any& rhs) {
+    if (MetaUtils::is_integral(lhs) && MetaUtils::is_integral(rhs)) {
+        return MetaUtils::to_integer(lhs) * MetaUtils::to_integer(rhs);
+    }
     if (MetaUtils::is_numeric(lhs) && MetaUtils::is_numeric(rhs)) {
         return MetaUtils::to_double(lhs) * MetaUtils::to_double(rhs);
     }
     throw MetaRuntimeError("不支持的乘法操作类型");
 }
 
-any operator/(const any& lhs, const any& rhs) {
+inline any operator/(const any& lhs, const any& rhs) {
     if (MetaUtils::is_numeric(lhs) && MetaUtils::is_numeric(rhs)) {
         double rhs_val = MetaUtils::to_double(rhs);
         if (rhs_val == 0) throw MetaRuntimeError("除零错误");
@@ -1396,49 +3253,77 @@ any operator/(const any& lhs, const any& rhs) {
     throw MetaRuntimeError("不支持的除法操作类型");
 }
 
+inline any operator%(const any& lhs, const any& rhs) {
+    if (MetaUtils::is_integral(lhs) && MetaUtils::is_integral(rhs)) {
+        long long rhs_val = MetaUtils::to_integer(rhs);
+        if (rhs_val == 0) throw MetaRuntimeError("除零错误");
+        return MetaUtils::to_integer(lhs) % rhs_val;
+    }
+    throw MetaRuntimeError("取余运算需要两个整数");
+}
+"""
+    if 'any_compare' in used:
+        cpp_code += """
+namespace MetaUtils {
+    // 字符串可能保存为 string、const char* 或 string_view，比较时统一看作 string_view
+    inline bool text_view(const any& value, string_view& view) {
+        const type_info& tid = value.type();
+        if (tid == typeid(string)) view = any_cast<const string&>(value);
+        else if (tid == typeid(const char*)) view = any_cast<const char*>(value);
+        else if (tid == typeid(string_view)) view = any_cast<string_view>(value);
+        else return false;
+        return true;
+    }
+}
+
 // 比较运算符重载
-bool operator==(const any& lhs, const any& rhs) {
-    if (lhs.type() != rhs.type()) return false;
+inline bool operator==(const any& lhs, const any& rhs) {
+    // 数值按值比较，1 与 1.0 相等
     if (MetaUtils::is_numeric(lhs) && MetaUtils::is_numeric(rhs)) {
         return MetaUtils::to_double(lhs) == MetaUtils::to_double(rhs);
     }
-    if (lhs.type() == typeid(string)) {
-        return any_cast<string>(lhs) == any_cast<string>(rhs);
+    string_view lhs_text, rhs_text;
+    if (MetaUtils::text_view(lhs, lhs_text) && MetaUtils::text_view(rhs, rhs_text)) {
+        return lhs_text == rhs_text;
     }
+    if (lhs.type() != rhs.type()) return false;
     if (lhs.type() == typeid(bool)) {
         return any_cast<bool>(lhs) == any_cast<bool>(rhs);
     }
     return false;
 }
 
-bool operator!=(const any& lhs, const any& rhs) {
+inline bool operator!=(const any& lhs, const any& rhs) {
     return !(lhs == rhs);
 }
 
-bool operator<(const any& lhs, const any& rhs) {
+inline bool operator<(const any& lhs, const any& rhs) {
     if (MetaUtils::is_numeric(lhs) && MetaUtils::is_numeric(rhs)) {
         return MetaUtils::to_double(lhs) < MetaUtils::to_double(rhs);
     }
-    if (lhs.type() == typeid(string)) {
-        return any_cast<string>(lhs) < any_cast<string>(rhs);
+    string_view lhs_text, rhs_text;
+    if (MetaUtils::text_view(lhs, lhs_text) && MetaUtils::text_view(rhs, rhs_text)) {
+        return lhs_text < rhs_text;
     }
     throw MetaRuntimeError("不支持的比较操作类型");
 }
 
-bool operator>(const any& lhs, const any& rhs) {
+inline bool operator>(const any& lhs, const any& rhs) {
     return rhs < lhs;
 }
 
-bool operator<=(const any& lhs, const any& rhs) {
+inline bool operator<=(const any& lhs, const any& rhs) {
     return !(lhs > rhs);
 }
 
-bool operator>=(const any& lhs, const any& rhs) {
+inline bool operator>=(const any& lhs, const any& rhs) {
     return !(lhs < rhs);
 }
-
+"""
+    if 'any_input' in used:
+        cpp_code += """
 // 输入运算符重载
-istream& operator>>(istream& is, any& value) {
+inline istream& operator>>(istream& is, any& value) {
     string input;
     getline(is, input);
     
@@ -1453,132 +3338,1889 @@ istream& operator>>(istream& is, any& value) {
     }
     return is;
 }
-
-class Meta {
+"""
+    if 'strbuf' in used:
+        cpp_code += """
+// 字符串构建器：反复追加的摊还开销为 O(1)，避免在循环中用 + 拼接造成的平方复杂度
+class MetaStringBuilder {
 public:
-    // 类成员变量声明
-    any input(const string& prompt = "") {
-        cout << prompt;
-        string value;
-        getline(cin, value);
-        try {
-            if (value.find('.') != string::npos) {
-                return any(stod(value));
-            } else {
-                return any(stoi(value));
-            }
-        } catch (...) {
-            return any(value);
-        }
+    MetaStringBuilder& append(string_view text) { buffer_.append(text); return *this; }
+    MetaStringBuilder& append(const char* text) { return append(string_view(text)); }
+    MetaStringBuilder& append(const string& text) { return append(string_view(text)); }
+    MetaStringBuilder& append(char c) { buffer_.push_back(c); return *this; }
+    MetaStringBuilder& append(bool b) { return append(string_view(b ? "true" : "false")); }
+    MetaStringBuilder& append(const any& value) { MetaUtils::append_to(buffer_, value); return *this; }
+    MetaStringBuilder& append(const MetaStringBuilder& other) { return append(string_view(other.buffer_)); }
+
+    template<typename T, enable_if_t<is_arithmetic_v<T>, int> = 0>
+    MetaStringBuilder& append(T value) { MetaUtils::append_number(buffer_, value); return *this; }
+
+    template<typename... Ts>
+    MetaStringBuilder& append(const variant<Ts...>& value) {
+        visit([this](const auto& x) { append(x); }, value);
+        return *this;
     }
 
-    any readline(const string& prompt = "") {
-        string value;
-        cout << prompt;
-        getline(cin, value);
-        return any(value);
+    void reserve(long long n) { buffer_.reserve(n); }
+    void clear() { buffer_.clear(); }
+    long long size() const { return buffer_.size(); }
+    string build() const { return buffer_; }
+    string_view view() const { return buffer_; }
+
+    friend ostream& operator<<(ostream& os, const MetaStringBuilder& builder) {
+        return os << builder.view();
     }
+
+private:
+    string buffer_;
+};
 """
-    
-    for stmt in statements:
-        if isinstance(stmt, dict) and stmt['type'] == 'macro':
-            cpp_code += f"        {stmt['code']}\n"
-        if isinstance(stmt, dict) and stmt['type'] == 'class':
-            class_data = stmt['data']
-            for var_decl in class_data['variables']:
-                if 'string' in var_decl:
-                    var_decl = var_decl.replace('string', 'std::string')
-                cpp_code += f"    {var_decl}\n"
-            cpp_code += "\n"
-            for func in class_data['functions']:
-                params = ', '.join(['any ' + p for p in func['params']])
-                cpp_code += f"    any {func['name']}({params}) {{\n"
-                for line in func['body']:
-                    if 'string' in line:
-                        line = line.replace('string', 'std::string')
-                    cpp_code += f"        {line}\n"
-                cpp_code += "    }\n"
-    
-    cpp_code += """};
-    
-int main() {
-    Meta meta;
-    try{
-        meta.Main();
-    }catch(const bad_any_cast& e){
-        cout<<"Error : 类型读取异常\\n";
-        cout<<"CompilerError : <"<<e.what()<<">\\n";
-    }catch(...){
-        cout<<"Error : 未知运行时错误\\n";
-        cout<<"CompilerError : <UnknowRuntimeError>\\n";
+    if 'array' in used:
+        cpp_code += """
+// 连续存储数组的批量操作，循环写成便于 g++ 自动向量化的形式
+namespace meta_array {
+    constexpr size_t LANES = 8;  // 归约时的独立累加通道数
+
+    template<typename T>
+    T from_any(const any& value) {
+        if constexpr (is_same_v<T, any>) {
+            return value;
+        } else {
+            if (value.type() == typeid(T)) return any_cast<T>(value);
+            return static_cast<T>(MetaUtils::to_double(value));
+        }
     }
-    return 0;
-}
-"""
-    return cpp_code
+
+    template<typename T, typename U>
+    T convert(U&& value) {
+        if constexpr (is_same_v<decay_t<U>, any> && !is_same_v<T, any>) {
+            return from_any<T>(value);
+        } else {
+            return static_cast<T>(std::forward<U>(value));
+        }
+    }
+
+    template<typename C, typename V>
+    void fill(C&& a, const V& value) {
+        using T = typename decay_t<C>::value_type;
+        const T v = convert<T>(value);
+        T* __restrict p = a.data();
+        const size_t n = a.size();
+        for (size_t i = 0; i < n; ++i) p[i] = v;
+    }
+
+    template<typename C>
+    auto sum(const C& a) {
+        using T = typename C::value_type;
+        const T* __restrict p = a.data();
+        const size_t n = a.size();
+        if constexpr (is_same_v<T, any>) {
+            double acc = 0;
+            for (size_t i = 0; i < n; ++i) acc += MetaUtils::to_double(p[i]);
+            return acc;
+        } else {
+            T part[LANES] = {};
+            size_t i = 0;
+            for (; i + LANES <= n; i += LANES)
+                for (size_t k = 0; k < LANES; ++k) part[k] += p[i + k];
+            T acc{};
+            for (size_t k = 0; k < LANES; ++k) acc += part[k];
+            for (; i < n; ++i) acc += p[i];
+            return acc;
+        }
+    }
+
+    template<typename C, typename Pick>
+    auto reduce_extreme(const C& a, Pick pick, const char* name) {
+        using T = typename C::value_type;
+        static_assert(!is_same_v<T, any>, "min/max 需要类型化数组");
+        const T* __restrict p = a.data();
+        const size_t n = a.size();
+        if (n == 0) throw MetaRuntimeError(string(name) + ": 空数组");
+        T part[LANES];
+        for (size_t k = 0; k < LANES; ++k) part[k] = p[0];
+        size_t i = 0;
+        for (; i + LANES <= n; i += LANES)
+            for (size_t k = 0; k < LANES; ++k) part[k] = pick(part[k], p[i + k]);
+        T acc = part[0];
+        for (size_t k = 1; k < LANES; ++k) acc = pick(acc, part[k]);
+        for (; i < n; ++i) acc = pick(acc, p[i]);
+        return acc;
+    }
+
+    template<typename C>
+    auto min(const C& a) {
+        return reduce_extreme(a, [](auto x, auto y) { return y < x ? y : x; }, "min");
+    }
+
+    template<typename C>
+    auto max(const C& a) {
+        return reduce_extreme(a, [](auto x, auto y) { return x < y ? y : x; }, "max");
+    }
+
+    template<typename C, typename F>
+    void map(C&& a, F f) {
+        using T = typename decay_t<C>::value_type;
+        T* __restrict p = a.data();
+        const size_t n = a.size();
+        for (size_t i = 0; i < n; ++i) p[i] = convert<T>(f(p[i]));
+    }
+
+    template<typename D, typename S>
+    void copy(D&& dst, const S& src) {
+        using T = typename decay_t<D>::value_type;
+        const size_t n = src.size();
+        if constexpr (is_same_v<decay_t<D>, vector<T>>) {
+            dst.resize(n);
+        } else if (dst.size() < n) {
+            throw MetaRuntimeError("copy: 目标数组长度不足");
+        }
+        if constexpr (is_same_v<remove_const_t<remove_pointer_t<decltype(src.data())>>, T>) {
+            // 复制给自己或同一数组中重叠的切片时不能按 __restrict 访问，按 memmove 的方向逐个复制
+            const T* from = src.data();
+            T* to = dst.data();
+            if (less<const T*>()(from, to + n) && less<const T*>()(to, from + n)) {
+                if (to < from) std::copy(from, from + n, to);
+                else if (to > from) std::copy_backward(from, from + n, to + n);
+                return;
+            }
+        }
+        T* __restrict d = dst.data();
+        const auto* __restrict s = src.data();
+        for (size_t i = 0; i < n; ++i) d[i] = convert<T>(s[i]);
+    }
+
+    template<typename T>
+    void reserve(vector<T>& a, long long n) { a.reserve(n); }
+
+    template<typename T>
+    void resize(vector<T>& a, long long n) { a.resize(n); }
+
+    template<typename T, typename V>
+    void push(vector<T>& a, const V& value) { a.push_back(convert<T>(value)); }
+
+    template<typename C>
+    long long size(const C& a) { return a.size(); }
+
+    [[noreturn]] [[gnu::cold]] inline void index_error(long long index, size_t size, int line) {
+        throw MetaRuntimeError("数组下标越界: 下标 " + std::to_string(index) + "，长度 " + std::to_string(size) +
+                               " (Meta 源码第 " + std::to_string(line) + " 行)");
+    }
+
+    // 下标可以是整数，也可以是保存数值的 any
+    template<typename I>
+    long long to_index(const I& index) {
+        if constexpr (is_same_v<I, any>) return static_cast<long long>(MetaUtils::to_double(index));
+        else return static_cast<long long>(index);
+    }
+
+    template<typename I>
+    long long check_index(const I& index, size_t size, int line) {
+        long long i = to_index(index);
+        if (__builtin_expect(static_cast<unsigned long long>(i) >= size, 0)) index_error(i, size, line);
+        return i;
+    }
+
+    // 带越界检查的下标访问
+    template<typename C, typename I>
+    decltype(auto) at(C&& a, const I& index, int line) {
+        return a[check_index(index, a.size(), line)];
+    }
+
+    // 非拥有的连续区间视图（类似 std::span），生命周期由所有权检查保证
+    template<typename T>
+    class View {
+    public:
+        using value_type = remove_const_t<T>;
+
+        View(T* data, size_t size) : data_(data), size_(size) {}
+
+        T& operator[](size_t i) const { return data_[i]; }
+        T* data() const { return data_; }
+        size_t size() const { return size_; }
+        T* begin() const { return data_; }
+        T* end() const { return data_ + size_; }
+
+    private:
+        T* data_;
+        size_t size_;
+    };
+
+    template<typename T>
+    ostream& operator<<(ostream& os, const View<T>& view) {
+        os << "[";
+        for (size_t i = 0; i < view.size(); ++i) {
+            if (i) os << ", ";
+            if constexpr (is_same_v<remove_const_t<T>, any>) ::operator<<(os, view[i]);
+            else os << view[i];
+        }
+        return os << "]";
+    }
+
+    // 切片 [begin:end)，end 为负数表示到末尾
+    inline size_t slice_end(long long begin, long long end, size_t size) {
+        size_t stop = end < 0 ? size : static_cast<size_t>(end);
+        if (begin < 0 || static_cast<size_t>(begin) > stop || stop > size) {
+            throw MetaRuntimeError("切片越界: [" + std::to_string(begin) + ":" + std::to_string(end) +
+                                   "]，长度为 " + std::to_string(size));
+        }
+        return stop;
+    }
+
+    // 数组切片得到 View，字符串切片得到 string_view，都不复制元素
+    template<typename C>
+    auto slice(C&& a, long long begin, long long end) {
+        using D = decay_t<C>;
+        if constexpr (is_same_v<D, string> || is_same_v<D, string_view>) {
+            size_t stop = slice_end(begin, end, a.size());
+            return string_view(a.data() + begin, stop - begin);
+        } else if constexpr (is_same_v<D, const char*>) {
+            return slice(string_view(a), begin, end);
+        } else if constexpr (is_same_v<D, any>) {
+            if (a.type() == typeid(string)) return slice(any_cast<const string&>(a), begin, end);
+            if (a.type() == typeid(const char*)) return slice(any_cast<const char*>(a), begin, end);
+            if (a.type() == typeid(string_view)) return slice(any_cast<string_view>(a), begin, end);
+            throw MetaRuntimeError("只能对数组或字符串切片");
+        } else if constexpr (is_same_v<D, variant<string, const char*>>) {
+            return visit([&](const auto& s) { return slice(s, begin, end); }, a);
+        } else {
+            using T = remove_pointer_t<decltype(a.data())>;
+            size_t stop = slice_end(begin, end, a.size());
+            return View<T>(a.data() + begin, stop - begin);
+        }
+    }
+
+    // 把切片复制为拥有所有权的值
+    template<typename T>
+    vector<remove_const_t<T>> to_owned(const View<T>& view) {
+        return vector<remove_const_t<T>>(view.begin(), view.end());
+    }
+
+    inline string to_owned(string_view view) { return string(view); }
+
+    enum class Layout { RowMajor, ColMajor };
+
+    // 多维数组：一块连续存储，按步长计算下标
+    template<typename T, size_t N>
+    class NDArray {
+    public:
+        using value_type = T;
+
+        NDArray() { shape_.fill(0); strides_.fill(0); }
+
+        // 一次性分配全部元素，原有内容被丢弃
+        void resize(const std::array<size_t, N>& shape, Layout layout = Layout::RowMajor) {
+            shape_ = shape;
+            layout_ = layout;
+            size_t stride = 1;
+            if (layout == Layout::RowMajor) {
+                for (size_t d = N; d-- > 0;) { strides_[d] = stride; stride *= shape[d]; }
+            } else {
+                for (size_t d = 0; d < N; ++d) { strides_[d] = stride; stride *= shape[d]; }
+            }
+            data_.assign(stride, T{});
+        }
+
+        template<typename... I>
+        T& operator()(I... index) { return data_[offset(index...)]; }
+
+        template<typename... I>
+        const T& operator()(I... index) const { return data_[offset(index...)]; }
+
+        // 带越界检查的下标访问
+        template<typename... I>
+        T& at(int line, I... index) {
+            size_t d = 0;
+            (check_index(index, shape_[d++], line), ...);
+            return data_[offset(index...)];
+        }
+
+        T* data() { return data_.data(); }
+        const T* data() const { return data_.data(); }
+        size_t size() const { return data_.size(); }
+        size_t extent(size_t d) const { return shape_[d]; }
+        Layout layout() const { return layout_; }
+
+    private:
+        template<typename... I>
+        size_t offset(I... index) const {
+            static_assert(sizeof...(I) == N, "下标个数与维数不一致");
+            size_t result = 0, d = 0;
+            ((result += static_cast<size_t>(to_index(index)) * strides_[d++]), ...);
+            return result;
+        }
+
+        vector<T> data_;
+        std::array<size_t, N> shape_;
+        std::array<size_t, N> strides_;
+        Layout layout_ = Layout::RowMajor;
+    };
+}
+"""
+    if 'alloc' in used:
+        cpp_code += """
+// --track-allocs 的运行时：统计分配次数、字节数、峰值与各 Meta 函数的分配
+// 全局 operator new/delete 由 main 所在的单元替换，见 ALLOC_OPERATORS
+namespace meta_alloc {
+    constexpr int MAX_FUNCTIONS = 4096;
+    // 每块内存前保存它的大小，释放时据此计算仍在使用的字节数
+    constexpr size_t HEADER = alignof(max_align_t);
+
+    struct Counter {
+        atomic<long long> count{0};
+        atomic<long long> bytes{0};
+    };
+
+    // 0 号记录不在任何 Meta 函数中的分配（全局初始化、运行时内部等）
+    inline const char* names[MAX_FUNCTIONS] = {"(Meta 函数之外)"};
+    inline Counter functions[MAX_FUNCTIONS];
+    inline atomic<int> function_count{1};
+    inline atomic_flag registry_lock = ATOMIC_FLAG_INIT;
+    inline atomic<long long> allocations{0}, frees{0}, total_bytes{0}, live_bytes{0}, peak_bytes{0};
+    inline thread_local int current = 0;
+
+    // 同名的函数（包括特化版本）共用一个编号，超出容量时计入 0 号
+    inline int register_function(const char* name) {
+        while (registry_lock.test_and_set(memory_order_acquire)) {}
+        int id = 0;
+        int count = function_count.load(memory_order_relaxed);
+        for (int i = 1; i < count && id == 0; ++i) {
+            if (strcmp(names[i], name) == 0) id = i;
+        }
+        if (id == 0 && count < MAX_FUNCTIONS) {
+            names[count] = name;
+            id = count;
+            function_count.store(count + 1, memory_order_relaxed);
+        }
+        registry_lock.clear(memory_order_release);
+        return id;
+    }
+
+    // 函数体开头的守卫：函数执行期间的分配计入该函数，返回时恢复调用者
+    struct Scope {
+        int saved;
+        explicit Scope(int id) : saved(current) { current = id; }
+        ~Scope() { current = saved; }
+    };
+
+    inline void* allocate(size_t size) {
+        char* block = static_cast<char*>(malloc(size + HEADER));
+        if (block == nullptr) return nullptr;
+        *reinterpret_cast<size_t*>(block) = size;
+        long long bytes = static_cast<long long>(size);
+        allocations.fetch_add(1, memory_order_relaxed);
+        total_bytes.fetch_add(bytes, memory_order_relaxed);
+        functions[current].count.fetch_add(1, memory_order_relaxed);
+        functions[current].bytes.fetch_add(bytes, memory_order_relaxed);
+        long long live = live_bytes.fetch_add(bytes, memory_order_relaxed) + bytes;
+        long long peak = peak_bytes.load(memory_order_relaxed);
+        while (live > peak && !peak_bytes.compare_exchange_weak(peak, live, memory_order_relaxed)) {}
+        return block + HEADER;
+    }
+
+    inline void release(void* p) {
+        if (p == nullptr) return;
+        char* block = static_cast<char*>(p) - HEADER;
+        frees.fetch_add(1, memory_order_relaxed);
+        live_bytes.fetch_sub(static_cast<long long>(*reinterpret_cast<size_t*>(block)), memory_order_relaxed);
+        free(block);
+    }
+
+    // 程序结束时输出到标准错误，不影响程序本身的输出；输出过程不分配内存
+    inline void report() {
+        fprintf(stderr, "\\n== 内存分配统计 ==\\n");
+        fprintf(stderr, "分配次数: %lld  释放次数: %lld\\n", allocations.load(), frees.load());
+        fprintf(stderr, "分配字节: %lld  峰值: %lld  结束时未释放: %lld\\n",
+                total_bytes.load(), peak_bytes.load(), live_bytes.load());
+        int order[MAX_FUNCTIONS];
+        int count = function_count.load();
+        for (int i = 0; i < count; ++i) {
+            int j = i;
+            for (; j > 0 && functions[order[j - 1]].bytes.load() < functions[i].bytes.load(); --j) {
+                order[j] = order[j - 1];
+            }
+            order[j] = i;
+        }
+        fprintf(stderr, "各函数的分配次数与字节数（不含它调用的函数）:\\n");
+        for (int i = 0; i < count; ++i) {
+            const Counter& counter = functions[order[i]];
+            if (counter.count.load() == 0) continue;
+            fprintf(stderr, "%12lld %16lld  %s\\n", counter.count.load(), counter.bytes.load(), names[order[i]]);
+        }
+    }
+}
+"""
+    if 'task' in used:
+        cpp_code += """
+// spawn/await 的运行时：按硬件线程数创建的工作窃取线程池
+namespace meta_task {
+    class Pool {
+    public:
+        using Job = function<void()>;
+
+        // count 是总并行度：等待任务的线程会帮忙执行任务，所以只创建 count - 1 个工作线程
+        explicit Pool(size_t count) : queues_(count > 0 ? count : 1) {
+            for (size_t i = 1; i < queues_.size(); ++i) threads_.emplace_back([this, i] { work(i); });
+        }
+
+        ~Pool() {
+            {
+                lock_guard<mutex> lock(sleep_mutex_);
+                stopping_ = true;
+            }
+            wake_.notify_all();
+            for (auto& t : threads_) t.join();
+        }
+
+        // 工作线程提交的任务放入自己的队列，其他线程提交的任务轮流分给各个队列
+        void submit(Job job) {
+            size_t target = owner_ == this ? index_ : next_.fetch_add(1) % queues_.size();
+            {
+                lock_guard<mutex> lock(queues_[target].guard);
+                queues_[target].jobs.push_back(std::move(job));
+            }
+            {
+                lock_guard<mutex> lock(sleep_mutex_);
+                ++queued_;
+            }
+            wake_.notify_one();
+        }
+
+        // 取出并执行一个任务，没有可执行的任务时返回 false
+        bool run_one() {
+            Job job;
+            if (!take(job)) return false;
+            job();
+            return true;
+        }
+
+        size_t size() const { return queues_.size(); }
+
+    private:
+        struct Queue {
+            mutex guard;
+            deque<Job> jobs;
+        };
+
+        // 先从自己队列的尾部取（最近提交，缓存最热），再从其他队列的头部窃取
+        bool take(Job& job) {
+            size_t n = queues_.size();
+            size_t self = owner_ == this ? index_ : 0;
+            if (owner_ == this && pop(queues_[self], job, true)) return true;
+            for (size_t k = owner_ == this ? 1 : 0; k < n; ++k) {
+                if (pop(queues_[(self + k) % n], job, false)) return true;
+            }
+            return false;
+        }
+
+        bool pop(Queue& queue, Job& job, bool back) {
+            lock_guard<mutex> lock(queue.guard);
+            if (queue.jobs.empty()) return false;
+            if (back) {
+                job = std::move(queue.jobs.back());
+                queue.jobs.pop_back();
+            } else {
+                job = std::move(queue.jobs.front());
+                queue.jobs.pop_front();
+            }
+            --queued_;
+            return true;
+        }
+
+        void work(size_t index) {
+            owner_ = this;
+            index_ = index;
+            while (true) {
+                if (run_one()) continue;
+                unique_lock<mutex> lock(sleep_mutex_);
+                wake_.wait(lock, [this] { return stopping_ || queued_ > 0; });
+                if (stopping_ && queued_ == 0) return;
+            }
+        }
+
+        vector<Queue> queues_;
+        vector<thread> threads_;
+        atomic<size_t> next_{0};
+        atomic<size_t> queued_{0};
+        mutex sleep_mutex_;
+        condition_variable wake_;
+        bool stopping_ = false;
+        static inline thread_local Pool* owner_ = nullptr;
+        static inline thread_local size_t index_ = 0;
+    };
+
+    // 线程数默认为硬件线程数，可以用环境变量 META_THREADS 指定
+    inline Pool& pool() {
+        static Pool instance([] {
+            const char* env = getenv("META_THREADS");
+            long count = env ? atol(env) : 0;
+            if (count <= 0) count = thread::hardware_concurrency();
+            return static_cast<size_t>(count > 0 ? count : 1);
+        }());
+        return instance;
+    }
+
+    struct State {
+        explicit State(Pool& owner) : pool(owner) {}
+        Pool& pool;
+        atomic<bool> done{false};
+        any value;
+        exception_ptr error;
+        mutex guard;
+        condition_variable ready;
+    };
+
+    // spawn 的结果；析构时等待任务结束，任务不会比创建它的函数活得更久
+    class Future {
+    public:
+        explicit Future(shared_ptr<State> state) : state_(std::move(state)) {}
+        Future(Future&&) = default;
+        Future(const Future&) = delete;
+        Future& operator=(const Future&) = delete;
+        ~Future() { if (state_) wait(); }
+
+        any get() {
+            wait();
+            auto state = std::move(state_);
+            if (state->error) rethrow_exception(state->error);
+            return std::move(state->value);
+        }
+
+    private:
+        // 等待期间帮助执行其他任务，嵌套的 spawn 不会因为线程耗尽而死锁
+        void wait() {
+            while (!state_->done.load(memory_order_acquire)) {
+                if (state_->pool.run_one()) continue;
+                unique_lock<mutex> lock(state_->guard);
+                state_->ready.wait_for(lock, chrono::milliseconds(1),
+                                       [this] { return state_->done.load(memory_order_acquire); });
+            }
+        }
+
+        shared_ptr<State> state_;
+    };
+
+    template<typename F>
+    Future spawn(F&& body, Pool& workers = pool()) {
+        auto state = make_shared<State>(workers);
+        workers.submit([state, body = std::forward<F>(body)]() mutable {
+            try {
+                state->value = body();
+            } catch (...) {
+                state->error = current_exception();
+            }
+            {
+                lock_guard<mutex> lock(state->guard);
+                state->done.store(true, memory_order_release);
+            }
+            state->ready.notify_all();
+        });
+        return Future(state);
+    }
+
+    // 把 [begin, end) 中按 step 取到的下标分成若干连续的块交给线程池，当前线程也参与执行
+    // 块数是并行度的 4 倍，各块耗时不均时空闲线程可以窃取剩下的块
+    template<typename F>
+    void parallel_chunks(long long begin, long long end, long long step, F&& chunk, Pool& workers = pool()) {
+        long long count = end > begin ? (end - begin + step - 1) / step : 0;
+        if (count <= 0) return;
+        long long chunks = std::min<long long>(count, static_cast<long long>(workers.size()) * 4);
+        vector<Future> futures;
+        futures.reserve(chunks);
+        for (long long c = 0; c < chunks; ++c) {
+            long long lo = begin + count * c / chunks * step;
+            long long hi = begin + count * (c + 1) / chunks * step;
+            futures.push_back(spawn([&chunk, c, lo, hi] { chunk(c, lo, hi); return any(); }, workers));
+        }
+        for (auto& future : futures) future.get();
+    }
+
+    // parallel for：每个下标调用一次 body，所有下标执行完才返回
+    template<typename F>
+    void parallel_for(long long begin, long long end, long long step, F&& body, Pool& workers = pool()) {
+        parallel_chunks(begin, end, step, [&body, step](long long, long long lo, long long hi) {
+            for (long long i = lo; i < hi; i += step) body(i);
+        }, workers);
+    }
+
+    // 并行归约：每块先在局部变量中累积，最后按块的顺序合并，结果与线程数无关
+    template<typename T, typename F, typename Op>
+    T parallel_reduce(long long begin, long long end, long long step, T init, F&& value, Op op, Pool& workers = pool()) {
+        long long count = end > begin ? (end - begin + step - 1) / step : 0;
+        vector<T> partial(std::min<long long>(std::max<long long>(count, 0), static_cast<long long>(workers.size()) * 4), init);
+        parallel_chunks(begin, end, step, [&](long long c, long long lo, long long hi) {
+            T acc = init;
+            for (long long i = lo; i < hi; i += step) acc = op(acc, value(i));
+            partial[c] = acc;
+        }, workers);
+        T result = init;
+        for (const T& x : partial) result = op(result, x);
+        return result;
+    }
+
+    struct Sum {
+        template<typename T> T operator()(T a, T b) const { return a + b; }
+    };
+    struct Min {
+        template<typename T> T operator()(T a, T b) const { return b < a ? b : a; }
+    };
+    struct Max {
+        template<typename T> T operator()(T a, T b) const { return a < b ? b : a; }
+    };
+
+    // min/max 的初始值不是合法结果，空区间时报告运行时错误
+    template<typename T, typename F, typename Op>
+    T parallel_reduce_nonempty(const char* name, int line, long long begin, long long end, long long step,
+                               T init, F&& value, Op op) {
+        if (end <= begin) {
+            throw MetaRuntimeError(string("parallel ") + name + " 的区间为空 (Meta 源码第 " + std::to_string(line) + " 行)");
+        }
+        return parallel_reduce(begin, end, step, init, std::forward<F>(value), op);
+    }
+}
+"""
+    cpp_code += """
+// 主程序与各模块共用的输入函数
+struct MetaBase {
+    any input(string_view prompt = "") {
+        cout << prompt;
+        string value;
+        getline(cin, value);
+        try {
+            if (value.find('.') != string::npos) {
+                return any(stod(value));
+            } else {
+                return any(stoi(value));
+            }
+        } catch (...) {
+            return any(value);
+        }
+    }
+
+    any readline(string_view prompt = "") {
+        string value;
+        cout << prompt;
+        getline(cin, value);
+        return any(value);
+    }
+};
+"""
+    return cpp_code
+
+def generate_string_literals(literals):
+    """字符串字面量放在静态存储中，长度在编译期确定"""
+    if not literals:
+        return ""
+    lines = ["namespace meta_literals {"]
+    for value, name in literals.items():
+        lines.append(f'    constexpr string_view {name.split("::")[-1]} = "{value}";')
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def generate_module_declarations(statements):
+    """为 include 的模块生成函数声明，实现在模块各自的目标文件中"""
+    cpp_code = ""
+    for stmt in statements:
+        if isinstance(stmt, dict) and stmt['type'] == 'include':
+            module = stmt['data']
+            cpp_code += f"// 模块 {module['name']} ({module['path']})\n"
+            if module['header']:
+                with open(module['header'], 'r', encoding='utf-8') as f:
+                    cpp_code += f.read()
+                continue
+            cpp_code += f"namespace {module['name']} {{\n"
+            for name, arity in module['functions'].items():
+                cpp_code += f"    any {name}({', '.join(['any'] * arity)});\n"
+            cpp_code += "}\n"
+    return cpp_code
+
+def class_structs(statements):
+    """类名 -> 成员变量，同名的类合并为一个结构体"""
+    structs = {}
+    for stmt in statements:
+        if isinstance(stmt, dict) and stmt['type'] == 'class':
+            structs.setdefault(stmt['data']['name'], []).extend(stmt['data']['fields'])
+    return structs
+
+def generate_class_structs(statements):
+    """每个 Meta 类生成结构体 meta_class::类名，成员变量按声明的类型直接保存在对象中
+    成员按对齐从大到小排列以减少填充；对象按值复制，对象数组是结构体的连续数组"""
+    structs = class_structs(statements)
+    if not structs:
+        return ""
+    alignments = {}
+    cpp_code = "namespace meta_class {\n"
+    for name, fields in structs.items():
+        cpp_code += f"struct {name} {{\n"
+        for field in sorted(fields, key=lambda field: -field['type'].alignment(alignments)):
+            # 调用函数或用到其他成员变量的初始值在程序对象的构造函数中计算，见 program_class
+            if field['init'] is None or field['dependent']:
+                cpp_code += f"    {field['type']} {field['name']};\n"
+            else:
+                cpp_code += f"    {field['type']} {field['name']} = {field['init']};\n"
+        cpp_code += "};\n"
+        alignments[name] = max((field['type'].alignment(alignments) for field in fields), default=1)
+    return cpp_code + "}\n"
+
+def program_class(name, statements, keyword='class'):
+    """程序对象的类头：继承 MetaBase 与各 Meta 类的结构体，成员函数直接访问这些成员变量"""
+    structs = class_structs(statements)
+    bases = ', '.join(['public MetaBase'] + [f"public meta_class::{struct}" for struct in structs])
+    cpp_code = f"{keyword} {name} : {bases} {{\npublic:\n"
+    deferred = [field for fields in structs.values() for field in fields if field['dependent']]
+    if deferred:
+        cpp_code += f"    {name}() {{\n"
+        for field in deferred:
+            cpp_code += f"        this->{field['name']} = {field['init']};\n"
+        cpp_code += "    }\n"
+    return cpp_code
+
+def cpp_type_name(cpp_type):
+    return 'any' if cpp_type == ANY_TYPE else cpp_type.cpp
+
+def convert_from_any(expr, cpp_type, line):
+    """从 any 中取出参数或返回值：数值按 any 运算的规则转换，其他类型需要与保存的类型一致"""
+    if cpp_type in Parser.INTEGER_TYPES:
+        return f"static_cast<{cpp_type}>(MetaUtils::to_integer({expr}))"
+    if cpp_type in Parser.NUMERIC_RANKS:
+        return f"static_cast<{cpp_type}>(MetaUtils::to_double({expr}))"
+    return f"MetaUtils::get<{cpp_type}>({expr}, {line})"
+
+def function_signature(func, owner=None):
+    """R f(T1 a, const T2& b)，没有标注类型的参数和返回值为 any"""
+    param_types = func.get('param_types') or [ANY_TYPE] * len(func['params'])
+    param_refs = func.get('param_refs') or [False] * len(func['params'])
+    # 只读的数组、字符串与 any 参数按 const& 传递，避免复制
+    params = ', '.join(f"const {cpp_type_name(t)}& {p}" if by_ref else f"{cpp_type_name(t)} {p}"
+                       for t, p, by_ref in zip(param_types, func['params'], param_refs))
+    name = f"{owner}::{func['name']}" if owner else func['name']
+    return f"{cpp_type_name(func.get('return_type', ANY_TYPE))} {name}({params})"
+
+def class_functions(class_data):
+    """类中的函数，以及按实参类型特化出的版本"""
+    return class_data['functions'] + class_data.get('specializations', [])
+
+# 占位的 #line 指令，写入文件时由 resolve_line_directives 替换为指回生成文件自身的行号
+LINE_RESET = '#line meta-reset'
+
+def code_lines(statement):
+    """语句中除 #line 指令以外的各行"""
+    return [line for line in statement.split('\n') if not line.lstrip().startswith('#line ')]
+
+def ends_with_return(body):
+    return bool(body) and ''.join(code_lines(body[-1])).startswith('return')
+
+def resolve_line_directives(cpp_code, cpp_file):
+    """函数体之后的代码不属于 Meta 源码，诊断中按生成文件 cpp_file 的行号报告"""
+    if LINE_RESET not in cpp_code:
+        return cpp_code
+    name = os.path.abspath(cpp_file).replace('\\', '\\\\').replace('"', '\\"')
+    lines = cpp_code.split('\n')
+    for index, line in enumerate(lines):
+        if line.strip() == LINE_RESET:
+            # #line N 指定的是下一行的行号
+            lines[index] = f'#line {index + 2} "{name}"'
+    return '\n'.join(lines)
+
+def generate_function(func, owner=None, indent="    "):
+    """生成函数定义；owner 不为空时生成类外定义 R owner::f(...)"""
+    cpp_code = f"{indent}{function_signature(func, owner)} {{\n"
+    for statement in func['body']:
+        for line in statement.split('\n'):
+            cpp_code += f"{indent}    {line}\n"
+    if any(statement.startswith('#line ') for statement in func['body']):
+        cpp_code += f"{LINE_RESET}\n"
+    # 没有 return 的函数返回空值，避免未定义行为
+    return_type = func.get('return_type', ANY_TYPE)
+    if return_type != VOID_TYPE and not ends_with_return(func['body']):
+        cpp_code += f"{indent}    return {'any()' if return_type == ANY_TYPE else '{}'};\n"
+    cpp_code += f"{indent}}}\n"
+    return cpp_code
+
+def generate_class_members(statements):
+    """生成程序对象的成员函数：各个 Meta 类的函数合并到同一个 C++ 类中，成员变量在各类的结构体中
+    函数定义在类中，本身就是 inline 的，g++ 可以在调用处展开小函数"""
+    cpp_code = ""
+    for stmt in statements:
+        if isinstance(stmt, dict) and stmt['type'] == 'macro':
+            cpp_code += f"        {stmt['code']}\n"
+        if isinstance(stmt, dict) and stmt['type'] == 'class':
+            class_data = stmt['data']
+            for func in class_functions(class_data):
+                cpp_code += generate_function(func)
+    return cpp_code
+
+def collect_statements(statements, stmt_type):
+    """解析器附加在末尾的 literals / runtime 语句"""
+    for stmt in statements:
+        if isinstance(stmt, dict) and stmt['type'] == stmt_type:
+            return stmt['data']
+    return {} if stmt_type == 'literals' else set()
+
+def generate_with_prelude(statements, program_code):
+    """在程序代码前加上模块声明、字符串字面量和程序用到的运行时"""
+    prelude = generate_module_declarations(statements)
+    prelude += generate_string_literals(collect_statements(statements, 'literals'))
+    features = collect_statements(statements, 'runtime')
+    return generate_runtime_code(prelude + program_code, features) + prelude + program_code
+
+def generate_module_code(name, statements, native_code=None):
+    """模块的独立编译单元：函数放在命名空间 name 中，供主程序链接"""
+    if native_code is not None:
+        return generate_with_prelude(statements, native_code)
+    cpp_code = f"""
+namespace meta_module_{name} {{
+"""
+    cpp_code += generate_class_structs(statements) + program_class('Module', statements, 'struct')
+    cpp_code += generate_class_members(statements)
+    cpp_code += f"""}};
+}}
+
+namespace {name} {{
+inline meta_module_{name}::Module& instance() {{
+    static meta_module_{name}::Module module;
+    return module;
+}}
+"""
+    for stmt in statements:
+        if isinstance(stmt, dict) and stmt['type'] == 'class':
+            for func in stmt['data']['functions']:
+                # 模块接口统一为 any f(any ...)，带类型的参数在这里取出
+                params = ', '.join(['any ' + p for p in func['params']])
+                param_types = func.get('param_types') or [ANY_TYPE] * len(func['params'])
+                args = ', '.join(f"std::move({p})" if t == ANY_TYPE else convert_from_any(p, t, 0)
+                                 for t, p in zip(param_types, func['params']))
+                call = f"instance().{func['name']}({args})"
+                body = f"{call}; return any();" if func.get('return_type') == VOID_TYPE else f"return {call};"
+                cpp_code += f"any {func['name']}({params}) {{ {body} }}\n"
+    cpp_code += "}\n"
+    return generate_with_prelude(statements, cpp_code)
+
+MAIN_FUNCTION = """
+int main() {
+    Meta meta;
+    try{
+        meta.Main();
+    }catch(const bad_any_cast& e){
+        cout<<"Error : 类型读取异常\\n";
+        cout<<"CompilerError : <"<<e.what()<<">\\n";
+    }catch(const MetaRuntimeError& e){
+        cout<<"Error : "<<e.what()<<"\\n";
+        cout<<"CompilerError : <MetaRuntimeError>\\n";
+    }catch(...){
+        cout<<"Error : 未知运行时错误\\n";
+        cout<<"CompilerError : <UnknowRuntimeError>\\n";
+    }
+    return 0;
+}
+"""
+
+# --track-allocs：替换全局 operator new/delete，只能定义在一个编译单元中
+ALLOC_OPERATORS = """
+void* operator new(size_t size) {
+    void* p = meta_alloc::allocate(size);
+    if (p == nullptr) throw bad_alloc();
+    return p;
+}
+void* operator new[](size_t size) { return operator new(size); }
+void* operator new(size_t size, const nothrow_t&) noexcept { return meta_alloc::allocate(size); }
+void* operator new[](size_t size, const nothrow_t&) noexcept { return meta_alloc::allocate(size); }
+void operator delete(void* p) noexcept { meta_alloc::release(p); }
+void operator delete[](void* p) noexcept { meta_alloc::release(p); }
+void operator delete(void* p, size_t) noexcept { meta_alloc::release(p); }
+void operator delete[](void* p, size_t) noexcept { meta_alloc::release(p); }
+void operator delete(void* p, const nothrow_t&) noexcept { meta_alloc::release(p); }
+void operator delete[](void* p, const nothrow_t&) noexcept { meta_alloc::release(p); }
+"""
+# 静态对象在 main 返回或 exit 时析构，此时输出统计结果
+ALLOC_REPORT = """
+static struct MetaAllocReport {
+    ~MetaAllocReport() { meta_alloc::report(); }
+} meta_alloc_report;
+"""
+
+def main_function(program_code):
+    """main 函数；启用 --track-allocs 时加上替换的 operator new/delete"""
+    if re.search(RUNTIME_TRIGGERS['alloc'], program_code):
+        return ALLOC_OPERATORS + ALLOC_REPORT + MAIN_FUNCTION
+    return MAIN_FUNCTION
+
+def generate_cpp_code(statements):
+    cpp_code = "\n" + generate_class_structs(statements) + program_class('Meta', statements)
+    cpp_code += generate_class_members(statements)
+    
+    cpp_code += "};\n    " + main_function(cpp_code)
+    return generate_with_prelude(statements, cpp_code)
+
+# 分文件模式下共享的头文件名
+SPLIT_HEADER = 'meta.h'
+# 分文件模式下不超过这么多行的函数直接定义在头文件的类中，其他单元调用时也能展开
+INLINE_FUNCTION_LINES = 3
+
+def is_small_function(func):
+    return sum(len(code_lines(statement)) for statement in func['body']) <= INLINE_FUNCTION_LINES
+
+def generate_split_units(statements):
+    """分文件代码生成：返回 {文件名: 代码}，包括共享头文件、每个 Meta 类一个 .cpp 和 main 所在的 .cpp
+    Meta 类只在头文件中声明，函数体在各自的编译单元中定义，修改一个类只需重新编译它所在的单元"""
+    declarations = ""
+    bodies = {}
+    for stmt in statements:
+        if isinstance(stmt, dict) and stmt['type'] == 'macro':
+            declarations += f"        {stmt['code']}\n"
+        if isinstance(stmt, dict) and stmt['type'] == 'class':
+            class_data = stmt['data']
+            unit_name = f"{class_data['name']}.cpp"
+            index = 1
+            while unit_name in bodies:
+                index += 1
+                unit_name = f"{class_data['name']}_{index}.cpp"
+            code = ""
+            for func in class_functions(class_data):
+                if is_small_function(func):
+                    declarations += generate_function(func)
+                    continue
+                declarations += f"    {function_signature(func)};\n"
+                code += "\n" + generate_function(func, owner='Meta', indent="")
+            bodies[unit_name] = code
+    bodies['meta_main.cpp'] = main_function(declarations + ''.join(bodies.values()))
+
+    class_code = "\n" + generate_class_structs(statements) + program_class('Meta', statements) + declarations + "};\n"
+    prelude = generate_module_declarations(statements)
+    features = collect_statements(statements, 'runtime')
+    runtime = generate_runtime_code(prelude + class_code + ''.join(bodies.values()), features)
+    # 每个单元只定义自己用到的字符串字面量，其他单元新增字面量时不受影响
+    # 头文件中的小函数用到的字面量定义在头文件中
+    literals = collect_statements(statements, 'literals')
+    def used_literals(code, exclude=()):
+        return {value: name for value, name in literals.items()
+                if value not in exclude and re.search(rf'\b{re.escape(name)}\b', code)}
+    header_literals = used_literals(class_code)
+    units = {SPLIT_HEADER: "#ifndef META_H\n#define META_H\n" + runtime + prelude +
+             generate_string_literals(header_literals) + class_code + "#endif\n"}
+    for unit_name, code in bodies.items():
+        used = used_literals(code, header_literals)
+        units[unit_name] = f'#include "{SPLIT_HEADER}"\n' + generate_string_literals(used) + code
+    return units
 
 class CodeOptimizer:
     @staticmethod
     def optimize(code):
-        # 自动在赋值语句中添加空格
-        code = code.replace('=', ' = ')
-        # 处理函数调用时的参数空格
-        code = code.replace('(', ' ( ')
-        code = code.replace(')', ' ) ')
-        # 处理逗号分隔的参数
-        code = code.replace(',', ' , ')
-
-        code = code.replace(';',' ;')
-        # 处理字符串中的空格（避免影响字符串内容）
-        optimized_code = []
-        inside_string = False
-        for char in code:
-            if char == '"':
-                inside_string = not inside_string
-            if char == ' ' and not inside_string:
-                optimized_code.append(char)
-            else:
-                optimized_code.append(char)
-        return ''.join(optimized_code)
+        # 按引号切分，只处理字符串字面量之外的部分（避免影响字符串内容）
+        parts = code.split('"')
+        for i in range(0, len(parts), 2):
+            part = parts[i]
+            # 自动在赋值语句中添加空格（不拆开 ==、!=、<=、>=）
+            part = re.sub(r'(?<![=!<>])=(?!=)', ' = ', part)
+            # 处理函数调用时的参数空格
+            part = part.replace('(', ' ( ')
+            part = part.replace(')', ' ) ')
+            # 处理逗号分隔的参数
+            part = part.replace(',', ' , ')
 
-def compile_meta(input_file, output_file):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        meta_code = f.read()
+            part = part.replace(';',' ;')
+            parts[i] = part
+        return '"'.join(parts)
+
+# 构建配置：名称 -> 优化参数与是否启用链接时优化(LTO)
+BUILD_PROFILES = {
+    'debug':   {'flags': ['-O0', '-g'], 'lto': False},
+    'default': {'flags': ['-O2'], 'lto': False},
+    'native':  {'flags': ['-O2', '-march=native'], 'lto': False},
+    'lto':     {'flags': ['-O2'], 'lto': True},
+    'release': {'flags': ['-O3', '-march=native'], 'lto': True},
+    'size':    {'flags': ['-Os'], 'lto': False},
+}
+
+class BuildOptions:
+    """g++ 后端的构建选项"""
+    def __init__(self, profile='default', compiler='g++', extra_flags=None,
+                 lto_jobs=None, static=False, use_cache=True, pgo_inputs=None, bounds='fast',
+                 module_path=None, split=False, jobs=None, track_allocs=False):
+        if profile not in BUILD_PROFILES:
+            raise ValueError(f"未知的构建配置: {profile}")
+        self.profile = profile
+        self.compiler = compiler
+        self.extra_flags = list(extra_flags or [])
+        self.lto_jobs = lto_jobs
+        self.static = static
+        self.use_cache = use_cache
+        self.pgo_inputs = list(pgo_inputs or [])  # PGO 训练输入文件
+        self.bounds = bounds  # 数组越界检查模式，影响生成的代码
+        self.module_path = list(module_path or [])  # 附加的模块搜索目录
+        self.split = split  # 分文件代码生成，见 generate_split_units
+        self.jobs = jobs or os.cpu_count() or 1  # 并行编译的任务数
+        self.track_allocs = track_allocs  # 统计内存分配，影响生成的代码
+
+    def flags(self):
+        profile = BUILD_PROFILES[self.profile]
+        flags = ['-std=c++17'] + profile['flags']
+        if profile['lto']:
+            flags.append(f'-flto={self.lto_jobs}' if self.lto_jobs else '-flto=auto')
+        if self.static:
+            flags.append('-static')
+        return flags + self.extra_flags
+
+    def describe(self):
+        pgo = f" + PGO[{len(self.pgo_inputs)} 个训练输入]" if self.pgo_inputs else ""
+        return f"{self.profile} ({self.compiler} {' '.join(self.flags())}){pgo}"
+
+COMPILER_VERSIONS = {}  # 编译器 -> `--version` 的输出
+
+def compiler_version(compiler):
+    """C++ 编译器的版本信息；升级编译器后，缓存的可执行文件与目标文件都需要重新生成"""
+    if compiler not in COMPILER_VERSIONS:
+        try:
+            result = subprocess.run([compiler, '--version'], capture_output=True, text=True)
+            COMPILER_VERSIONS[compiler] = result.stdout
+        except OSError:
+            COMPILER_VERSIONS[compiler] = ''
+    return COMPILER_VERSIONS[compiler]
+
+def gcc_major_version(compiler):
+    """GCC 的主版本号，无法识别或不是 GCC（如 clang）时为 None"""
+    version = compiler_version(compiler)
+    if 'Free Software Foundation' not in version:
+        return None
+    match = re.search(r'(\d+)\.\d+', version.split('\n')[0])
+    return int(match.group(1)) if match else None
+
+class BuildCache:
+    """以生成的C++代码、构建选项和编译器版本为键缓存可执行文件"""
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def key(self, cpp_code, options, module_keys=()):
+        digest = hashlib.sha256()
+        digest.update(options.compiler.encode('utf-8'))
+        digest.update(compiler_version(options.compiler).encode('utf-8'))
+        digest.update('\0'.join(options.flags()).encode('utf-8'))
+        digest.update(cpp_code.encode('utf-8'))
+        # 链接的模块目标文件
+        for module_key in module_keys:
+            digest.update(module_key.encode('utf-8'))
+        # 训练输入变化时需要重新采集 profile
+        for training_input in options.pgo_inputs:
+            with open(training_input, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        pgo = "-pgo" if options.pgo_inputs else ""
+        return f"{options.profile}{pgo}-{digest.hexdigest()[:24]}"
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + '.exe')
+
+    def lookup(self, key):
+        cached = self.path(key)
+        return cached if os.path.exists(cached) else None
+
+    def store(self, key, exe_file):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        shutil.copy2(exe_file, self.path(key))
+
+    def object_path(self, key):
+        """分文件模式下各编译单元的目标文件"""
+        return os.path.join(self.cache_dir, 'units', key + '.o')
 
+    def pgo_dir(self, key):
+        """profile 数据保存在构建缓存旁边，供之后的构建复用"""
+        return os.path.join(self.cache_dir, 'pgo', key)
+
+def cache_dir_for(output_file):
+    return os.path.join(os.path.dirname(os.path.abspath(output_file)), '.meta_cache')
+
+def user_cache_dir():
+    """没有输出目录时（例如作为库调用）使用的用户缓存目录"""
+    base = (os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA') or
+            os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'meta')
+
+# 使用 spawn 的程序链接时需要的参数
+THREAD_FLAGS = ['-pthread']
+
+def uses_threads(cpp_code):
+    return re.search(RUNTIME_TRIGGERS['task'], cpp_code) is not None
+
+def run_gcc(inputs, output, options, extra_flags=(), compile_only=False):
+    command = [options.compiler] + options.flags() + list(extra_flags)
+    if compile_only:
+        command.append('-c')
+    command += list(inputs) + ['-o', output]
+    return subprocess.run(command).returncode
+
+def build_precompiled_header(header_file, key, options):
+    """把公共头文件预编译为 .gch，各编译单元不必重复解析运行时；失败时退回普通头文件"""
+    pch_file = header_file + '.gch'
+    stamp_file = pch_file + '.key'
+    if os.path.exists(pch_file) and os.path.exists(stamp_file):
+        with open(stamp_file, 'r', encoding='utf-8') as f:
+            if f.read() == key:
+                return
+    if run_gcc(['-x', 'c++-header', header_file], pch_file, options) != 0:
+        if os.path.exists(pch_file):
+            os.remove(pch_file)
+        return
+    with open(stamp_file, 'w', encoding='utf-8') as f:
+        f.write(key)
+
+def build_units(unit_dir, units, options, cache):
+    """并行编译各编译单元，目标文件按 头文件 + 单元代码 + 构建配置 缓存；失败时返回 None"""
+    header = units[SPLIT_HEADER]
+    objects = []
+    pending = []
+    for unit_name, code in units.items():
+        if unit_name == SPLIT_HEADER:
+            continue
+        object_file = cache.object_path(cache.key(header + code, options))
+        objects.append(object_file)
+        if not (options.use_cache and os.path.exists(object_file)):
+            pending.append((os.path.join(unit_dir, unit_name), object_file))
+    print(f"编译单元: {len(pending)}/{len(objects)} 个需要重新编译 (并行任务数 {options.jobs})")
+    if pending:
+        os.makedirs(os.path.dirname(pending[0][1]), exist_ok=True)
+        build_precompiled_header(os.path.join(unit_dir, SPLIT_HEADER), cache.key(header, options), options)
+    with ThreadPoolExecutor(max_workers=options.jobs) as pool:
+        results = list(pool.map(
+            lambda job: run_gcc([job[0]], job[1], options, compile_only=True), pending))
+    if any(results):
+        return None
+    return objects
+
+def has_profile_data(profile_dir):
+    for _, _, files in os.walk(profile_dir):
+        if any(name.endswith('.gcda') for name in files):
+            return True
+    return False
+
+def build_with_pgo(cpp_file, exe_file, options, profile_dir, objects=(), link_flags=()):
+    """三步 PGO：插桩构建 -> 用训练输入运行 -> 使用 profile 重新构建"""
+    profile_dir = os.path.abspath(profile_dir)
+    os.makedirs(profile_dir, exist_ok=True)
+    # 目标文件路径固定，保证采集与使用阶段的 .gcda 文件名一致
+    object_file = os.path.join(profile_dir, 'program.o')
+
+    if has_profile_data(profile_dir):
+        print(f"复用已有的 profile 数据: {profile_dir}")
+    else:
+        generate = [f'-fprofile-generate={profile_dir}']
+        instrumented = os.path.join(profile_dir, 'instrumented.exe')
+        print("PGO 1/3: 构建插桩版本")
+        if run_gcc([cpp_file], object_file, options, generate, compile_only=True) != 0:
+            return 1
+        if run_gcc([object_file] + list(objects), instrumented, options, generate + list(link_flags)) != 0:
+            return 1
+        for index, training_input in enumerate(options.pgo_inputs, 1):
+            print(f"PGO 2/3: 运行训练输入 {index}/{len(options.pgo_inputs)}: {training_input}")
+            with open(training_input, 'rb') as stdin:
+                result = subprocess.run([instrumented], stdin=stdin, stdout=subprocess.DEVNULL)
+            if result.returncode != 0:
+                print(f"警告: 训练输入 {training_input} 运行失败 (退出码 {result.returncode})")
+        if not has_profile_data(profile_dir):
+            print("错误: 训练运行没有生成 profile 数据")
+            return 1
+
+    print("PGO 3/3: 使用 profile 数据重新构建")
+    use = [f'-fprofile-use={profile_dir}']
+    # 训练输入没有运行到的代码仍按普通方式优化，而不是当作冷代码；GCC 10 起支持
+    if (gcc_major_version(options.compiler) or 0) >= 10:
+        use.append('-fprofile-partial-training')
+    if run_gcc([cpp_file], object_file, options, use, compile_only=True) != 0:
+        return 1
+    return run_gcc([object_file] + list(objects), exe_file, options, use + list(link_flags))
+
+# 标准库模块目录，位于搜索路径的最后
+STDLIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stdlib')
+
+class ModuleLoader:
+    """按搜索路径查找 include 的模块，每个模块单独编译为目标文件，并按内容哈希缓存目标文件与接口摘要"""
+    RESERVED_NAMES = ['std', 'Meta', 'MetaBase', 'MetaUtils', 'meta_array', 'meta_class', 'meta_literals']
+
+    def __init__(self, options, cache_dir=None):
+        self.options = options
+        self.cache_dir = cache_dir  # 标准库、搜索路径中的模块以及模块目录不可写时使用的缓存目录
+        meta_path = [p for p in os.environ.get('META_PATH', '').split(os.pathsep) if p]
+        self.search_path = options.module_path + meta_path + [STDLIB_DIR]
+        self.modules = {}  # 模块源文件路径 -> 模块
+        self.loading = []  # 正在加载的模块，用于检测循环 include
+        self.compiler_digest = None
+
+    def resolve(self, module_name, base_dir):
+        for directory in [base_dir] + self.search_path:
+            path = os.path.join(directory, module_name)
+            if os.path.isfile(path):
+                return os.path.abspath(path)
+        return None
+
+    def load(self, module_name, base_dir):
+        """返回模块接口：{'name', 'path', 'key', 'functions', 'uses', 'object', ...}"""
+        path = self.resolve(module_name, base_dir)
+        if path is None:
+            raise ValueError(f"找不到模块: {module_name} (搜索路径: {', '.join([base_dir] + self.search_path)})")
+        if path in self.modules:
+            return self.modules[path]
+        if path in self.loading:
+            raise ValueError(f"模块循环 include: {' -> '.join(self.loading + [path])}")
+        name = os.path.splitext(os.path.basename(path))[0]
+        if not name.isidentifier() or name in Parser.CPP_KEYWORDS or name in self.RESERVED_NAMES:
+            raise ValueError(f"无效的模块名: {name}")
+        self.loading.append(path)
+        try:
+            module = self.load_cached(name, path) or self.parse_module(name, path)
+        finally:
+            self.loading.pop()
+        self.modules[path] = module
+        return module
+
+    def native_file(self, path):
+        """原生模块 x.meta 只声明函数，实现在同目录的 x.native.cpp 中"""
+        return os.path.splitext(path)[0] + '.native.cpp'
+
+    @staticmethod
+    def native_flags(native_code):
+        """原生实现开头的 "// cxxflags: ..." 注释给出只用于该模块的编译参数"""
+        flags = []
+        for line in native_code.splitlines():
+            if not line.startswith('//'):
+                break
+            if line[2:].strip().startswith('cxxflags:'):
+                flags += shlex.split(line[2:].strip()[len('cxxflags:'):])
+        return flags
+
+    def native_header(self, path):
+        """可选的 x.native.h 代替自动生成的 any 函数声明，可以包含模板等内联代码"""
+        header = os.path.splitext(path)[0] + '.native.h'
+        return header if os.path.exists(header) else None
+
+    def module_cache_dir(self, path):
+        """程序自己目录中的模块缓存在模块旁边，使用同一模块的程序共享缓存
+        标准库与搜索路径中的模块所在目录可能只读或被多人共享，缓存放在输出目录（没有时为用户缓存目录）中"""
+        directory = os.path.dirname(path)
+        if self.in_search_path(directory) or not os.access(directory, os.W_OK):
+            return os.path.join(self.cache_dir or user_cache_dir(), 'modules')
+        return os.path.join(directory, '.meta_cache', 'modules')
+
+    def in_search_path(self, directory):
+        for root in self.search_path:
+            root = os.path.abspath(root)
+            if directory == root or directory.startswith(root + os.sep):
+                return True
+        return False
+
+    def key(self, name, path):
+        # 编译器本身（代码生成与运行时）变化后，模块需要重新生成
+        if self.compiler_digest is None:
+            with open(os.path.abspath(__file__), 'rb') as f:
+                self.compiler_digest = hashlib.sha256(f.read()).hexdigest()
+        digest = hashlib.sha256()
+        digest.update(self.options.compiler.encode('utf-8'))
+        digest.update(compiler_version(self.options.compiler).encode('utf-8'))
+        digest.update('\0'.join(self.options.flags()).encode('utf-8'))
+        digest.update(self.options.bounds.encode('utf-8'))
+        digest.update(self.compiler_digest.encode('utf-8'))
+        for source in (path, self.native_file(path), self.native_header(path)):
+            if source and os.path.exists(source):
+                with open(source, 'rb') as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+        return f"{name}-{digest.hexdigest()[:24]}"
+
+    @staticmethod
+    def interface_digest(module):
+        return hashlib.sha256(json.dumps(module['functions'], sort_keys=True).encode('utf-8')).hexdigest()
+
+    def load_cached(self, name, path):
+        """命中缓存时直接读取接口摘要，不再解析模块源码"""
+        if not self.options.use_cache:
+            return None
+        key = self.key(name, path)
+        base = os.path.join(self.module_cache_dir(path), key)
+        if not (os.path.exists(base + '.json') and os.path.exists(base + '.o')):
+            return None
+        with open(base + '.json', 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        # 依赖模块的接口变化后需要重新编译
+        uses = []
+        for dep_name, dep_digest in summary['deps'].items():
+            dep = self.load(dep_name, os.path.dirname(path))
+            if self.interface_digest(dep) != dep_digest:
+                return None
+            if dep['name'] in summary['uses']:
+                uses.append(dep)
+        return {
+            'name': name,
+            'path': path,
+            'key': key,
+            'functions': summary['functions'],
+            'deps': summary['deps'],
+            'uses': uses,
+            'native': summary['native'],
+            'cxxflags': [],
+            'header': self.native_header(path) if summary['native'] else None,
+            'object': base + '.o',
+            'threads': summary.get('threads', False),
+            'cpp_code': None,
+        }
+
+    def parse_module(self, name, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        lexer = Lexer(CodeOptimizer.optimize(source))
+        parser = Parser(lexer, bounds=self.options.bounds, modules=self, base_dir=os.path.dirname(path),
+                        source_name=os.path.abspath(path))
+        try:
+            statements = parser.parse()
+        except MetaLangError as e:
+            e.reason = f"{path}: {e.reason}"
+            raise
+
+        functions = {}
+        native = []
+        for stmt in statements:
+            if isinstance(stmt, dict) and stmt['type'] == 'class':
+                for func in stmt['data']['functions']:
+                    if func['name'] in functions:
+                        raise ValueError(f"模块 {name} 中函数重名: {func['name']}")
+                    functions[func['name']] = len(func['params'])
+                    native.append(func['body'] is None)
+        native_code = None
+        if any(native):
+            if not all(native):
+                raise ValueError(f"原生模块 {name} 中不能包含函数体")
+            if not os.path.exists(self.native_file(path)):
+                raise ValueError(f"原生模块 {name} 缺少实现文件: {self.native_file(path)}")
+            with open(self.native_file(path), 'r', encoding='utf-8') as f:
+                native_code = f.read()
+            cxxflags = self.native_flags(native_code)
+            if self.native_header(path):
+                with open(self.native_header(path), 'r', encoding='utf-8') as f:
+                    native_code = f.read() + native_code
+
+        key = self.key(name, path)
+        cpp_code = generate_module_code(name, statements, native_code)
+        return {
+            'name': name,
+            'path': path,
+            'key': key,
+            'functions': functions,
+            'deps': {
+                stmt['name']: self.interface_digest(stmt['data'])
+                for stmt in statements if isinstance(stmt, dict) and stmt['type'] == 'include'
+            },
+            'uses': [parser.imports[dep_name] for dep_name in parser.used_modules],
+            'native': native_code is not None,
+            'cxxflags': cxxflags if native_code is not None else [],
+            'header': self.native_header(path) if native_code is not None else None,
+            'object': os.path.join(self.module_cache_dir(path), key + '.o'),
+            'threads': uses_threads(cpp_code),
+            'cpp_code': cpp_code,
+        }
+
+    def link_closure(self, modules):
+        """实际调用到的模块及其依赖，按依赖顺序排列"""
+        result = []
+        def visit(module):
+            if module in result:
+                return
+            result.append(module)
+            for dep in module['uses']:
+                visit(dep)
+        for module in modules:
+            visit(module)
+        return result
+
+    def build(self, modules):
+        """编译尚未缓存的模块，返回目标文件列表；失败时返回 None"""
+        objects = []
+        for module in modules:
+            if module['cpp_code'] is not None and not (self.options.use_cache and os.path.exists(module['object'])):
+                os.makedirs(os.path.dirname(module['object']), exist_ok=True)
+                cpp_file = os.path.splitext(module['object'])[0] + '.cpp'
+                with open(cpp_file, 'w', encoding='utf-8') as f:
+                    f.write(resolve_line_directives(module['cpp_code'], cpp_file))
+                print(f"编译模块 {module['name']}: {module['path']}")
+                if run_gcc([cpp_file], module['object'], self.options, module['cxxflags'], compile_only=True) != 0:
+                    print(f"错误: 模块 {module['name']} 编译失败")
+                    return None
+                summary = {
+                    'name': module['name'],
+                    'source': module['path'],
+                    'native': module['native'],
+                    'functions': module['functions'],
+                    'deps': module['deps'],
+                    'uses': [dep['name'] for dep in module['uses']],
+                    'threads': module['threads'],
+                }
+                with open(os.path.splitext(module['object'])[0] + '.json', 'w', encoding='utf-8') as f:
+                    json.dump(summary, f, ensure_ascii=False, indent=2)
+                module['cpp_code'] = None
+            objects.append(module['object'])
+        return objects
+
+def parse_source(source, options, base_dir='.', loader=None, source_name=None):
+    """解析 Meta 源码，返回解析器与语句；include 的模块相对 base_dir 查找，错误时抛出 MetaLangError
+    给出 source_name 时生成的代码带有指向该文件的 #line 指令"""
     # 对代码进行优化
-    optimizer = CodeOptimizer()
-    optimized_code = optimizer.optimize(meta_code)
+    lexer = Lexer(CodeOptimizer.optimize(source))
+    parser = Parser(lexer, bounds=options.bounds, modules=loader or ModuleLoader(options),
+                    base_dir=base_dir, track_allocs=options.track_allocs, source_name=source_name)
+    return parser, parser.parse()
+
+def meta_to_cpp(source, options=None, base_dir='.'):
+    """库接口：把 Meta 源码翻译为 C++ 代码，不读写文件；错误时抛出 MetaLangError"""
+    _, statements = parse_source(source, options or BuildOptions(), base_dir)
+    return generate_cpp_code(statements)
 
-    lexer = Lexer(optimized_code)
-    parser = Parser(lexer)
+async def compile_cpp_async(cpp_code, exe_file, options=None, objects=(), link_flags=()):
+    """库接口：通过标准输入把 C++ 代码交给 g++ (g++ -x c++ -)，不写临时文件，也不经过 shell
+    返回 {'returncode', 'diagnostics', 'exe_file', 'timings'}，编译失败时 exe_file 为 None"""
+    options = options or BuildOptions()
+    # -x none 让之后的目标文件按扩展名处理
+    command = ([options.compiler] + options.flags() + ['-x', 'c++', '-', '-x', 'none'] +
+               list(objects) + list(link_flags) + ['-o', exe_file])
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output, _ = await process.communicate(cpp_code.encode('utf-8'))
+    return {
+        'returncode': process.returncode,
+        'diagnostics': output.decode('utf-8', errors='replace'),
+        'exe_file': exe_file if process.returncode == 0 else None,
+        'timings': {'g++': time.perf_counter() - start},
+    }
+
+# 并发编译共享模块的目标文件，同一时间只有一个编译在构建模块
+MODULE_BUILD_LOCK = threading.Lock()
+
+def build_modules_locked(loader, modules):
+    with MODULE_BUILD_LOCK:
+        return loader.build(modules)
+
+async def compile_source_async(source, exe_file, options=None, base_dir='.', loader=None):
+    """库接口：Meta 源码 -> 可执行文件，多个编译可以在同一个事件循环中并发进行
+    结果同 compile_cpp_async，另有生成的 C++ 代码 'cpp_code'；解析或模块编译失败时 returncode 为 None
+    不使用构建缓存、分文件模式与 PGO"""
+    options = options or BuildOptions()
+    loader = loader or ModuleLoader(options)
+    start = time.perf_counter()
     try:
-        statements = parser.parse()
-    except SyntaxError as e:
+        parser, statements = parse_source(source, options, base_dir, loader)
+    except (SyntaxError, MetaLangError) as e:
+        return {'returncode': None, 'diagnostics': str(e), 'exe_file': None, 'cpp_code': None,
+                'timings': {'解析': time.perf_counter() - start}}
+    timings = {'解析': time.perf_counter() - start}
+    start = time.perf_counter()
+    cpp_code = generate_cpp_code(statements)
+    timings['生成'] = time.perf_counter() - start
+    modules = loader.link_closure([parser.imports[namespace] for namespace in parser.used_modules])
+    # 模块一般命中磁盘缓存；需要编译时放到线程中，不阻塞事件循环
+    objects = await asyncio.get_running_loop().run_in_executor(None, build_modules_locked, loader, modules)
+    if objects is None:
+        return {'returncode': None, 'diagnostics': "模块编译失败", 'exe_file': None, 'cpp_code': cpp_code,
+                'timings': timings}
+    link_flags = THREAD_FLAGS if uses_threads(cpp_code) or any(module['threads'] for module in modules) else []
+    result = await compile_cpp_async(cpp_code, exe_file, options, objects, link_flags)
+    result['timings'] = dict(timings, **result['timings'])
+    result['cpp_code'] = cpp_code
+    return result
+
+def compile_meta(input_file, output_file, options=None, loader=None, timings=None):
+    """编译 Meta 源文件，成功时返回可执行文件路径
+    loader 可以在多次编译之间复用（见 Watcher）；timings 不为 None 时记录解析、生成与 g++ 各阶段的秒数"""
+    options = options or BuildOptions()
+    timings = timings if timings is not None else {}
+    start = time.perf_counter()
+    with open(input_file, 'r', encoding='utf-8') as f:
+        meta_code = f.read()
+
+    loader = loader or ModuleLoader(options, cache_dir=cache_dir_for(output_file))
+    try:
+        parser, statements = parse_source(meta_code, options, os.path.dirname(os.path.abspath(input_file)), loader,
+                                          os.path.abspath(input_file))
+    except (SyntaxError, MetaLangError) as e:
         print(e)
         return
+    timings['解析'] = time.perf_counter() - start
+    start = time.perf_counter()
 
-    cpp_code = generate_cpp_code(statements)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(cpp_code)
+    split = options.split
+    if split and options.pgo_inputs:
+        print("PGO 构建不支持分文件模式，使用单个编译单元")
+        split = False
+    if split:
+        unit_dir = os.path.splitext(output_file)[0] + '.units'
+        units = {unit_name: resolve_line_directives(code, os.path.join(unit_dir, unit_name))
+                 for unit_name, code in generate_split_units(statements).items()}
+        os.makedirs(unit_dir, exist_ok=True)
+        for unit_name, code in units.items():
+            unit_file = os.path.join(unit_dir, unit_name)
+            # 内容不变时不改写文件
+            if os.path.exists(unit_file):
+                with open(unit_file, 'r', encoding='utf-8') as f:
+                    if f.read() == code:
+                        continue
+            with open(unit_file, 'w', encoding='utf-8') as f:
+                f.write(code)
+        cpp_code = ''.join(units[unit_name] for unit_name in sorted(units))
+        print(f"编译完成，生成 {len(units)} 个文件: {unit_dir}")
+    else:
+        cpp_code = resolve_line_directives(generate_cpp_code(statements), output_file)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(cpp_code)
+        print(f"编译完成，生成文件: {output_file}")
+
+    timings['生成'] = time.perf_counter() - start
+    start = time.perf_counter()
+
+    # 只链接实际调用过的模块
+    for namespace in parser.imports:
+        if namespace not in parser.used_modules:
+            print(f"模块 {namespace} 未被使用，不参与链接")
+    modules = loader.link_closure([parser.imports[namespace] for namespace in parser.used_modules])
+    exe_file = build_executable(output_file, cpp_code, units if split else None, modules, loader, options)
+    timings['g++'] = time.perf_counter() - start
+    return exe_file
+
+def build_executable(output_file, cpp_code, units, modules, loader, options):
+    """编译生成的代码并链接模块；units 不为 None 时为分文件模式的各编译单元"""
+    split = units is not None
+    unit_dir = os.path.splitext(output_file)[0] + '.units'
+    exe_file = os.path.splitext(output_file)[0] + '.exe'
+    cache = BuildCache(cache_dir_for(output_file))
+    key = cache.key(cpp_code, options, [module['key'] for module in modules])
+    cached = cache.lookup(key) if options.use_cache else None
+    if cached:
+        shutil.copy2(cached, exe_file)
+        print(f"命中构建缓存，生成文件: {exe_file}")
+        print(f"构建配置: {options.describe()}")
+        return exe_file
+
+    objects = loader.build(modules)
+    if objects is None:
+        return None
+    link_flags = THREAD_FLAGS if uses_threads(cpp_code) or any(module['threads'] for module in modules) else []
+    if split:
+        unit_objects = build_units(unit_dir, units, options, cache)
+        if unit_objects is None:
+            print(f"错误: g++ 编译失败 (构建配置: {options.describe()})")
+            return None
+        returncode = run_gcc(unit_objects + objects, exe_file, options, link_flags)
+    elif options.pgo_inputs:
+        returncode = build_with_pgo(output_file, exe_file, options, cache.pgo_dir(key), objects, link_flags)
+    else:
+        returncode = run_gcc([output_file] + objects, exe_file, options, link_flags)
+    if returncode != 0:
+        print(f"错误: g++ 编译失败 (构建配置: {options.describe()})")
+        return None
+    if options.use_cache:
+        cache.store(key, exe_file)
+    print(f"编译cpp文件完成，生成文件: {exe_file}")
+    print(f"构建配置: {options.describe()}")
+    return exe_file
+
+class Watcher:
+    """--watch：监视源文件与 include 的模块，保存后增量重新编译
+    - 模块接口保存在内存中，只有模块文件变化时才重新加载
+    - 使用分文件模式，只重新生成、重新编译内容变化的编译单元
+    - 连续多次保存只在最后一次保存 debounce 秒后编译一次"""
+    def __init__(self, input_file, output_file, options, interval=0.2, debounce=0.3):
+        self.input_file = os.path.abspath(input_file)
+        self.output_file = output_file
+        self.options = options
+        self.interval = interval  # 检查文件修改时间的间隔
+        self.debounce = debounce
+        self.loader = None
+        self.snapshot = {}  # 被监视的文件 -> (修改时间, 内容哈希)
+
+    def watched_files(self):
+        files = [self.input_file]
+        if self.loader is not None:
+            for path in self.loader.modules:
+                files += [path, self.loader.native_file(path)]
+                header = self.loader.native_header(path)
+                if header:
+                    files.append(header)
+        return files
+
+    def take_snapshot(self):
+        snapshot = {}
+        for path in self.watched_files():
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            previous = self.snapshot.get(path)
+            if previous and previous[0] == mtime:
+                snapshot[path] = previous
+                continue
+            with open(path, 'rb') as f:
+                snapshot[path] = (mtime, hashlib.sha256(f.read()).hexdigest())
+        return snapshot
+
+    def changed_files(self, snapshot):
+        """内容变化的文件；只改了修改时间（例如保存了未修改的文件）不算变化"""
+        paths = set(snapshot) | set(self.snapshot)
+        return sorted(path for path in paths
+                      if (snapshot.get(path) or (None, None))[1] != (self.snapshot.get(path) or (None, None))[1])
 
-    print(f"编译完成，生成文件: {output_file}")
+    def build(self, changed=()):
+        if self.loader is None or any(path != self.input_file for path in changed):
+            # 模块变化后重新加载所有模块的接口；磁盘上的模块缓存仍然按内容复用
+            self.loader = ModuleLoader(self.options, cache_dir=cache_dir_for(self.output_file))
+        timings = {}
+        start = time.perf_counter()
+        exe_file = compile_meta(self.input_file, self.output_file, self.options, self.loader, timings)
+        total = time.perf_counter() - start
+        phases = ', '.join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items())
+        status = "完成" if exe_file else "失败"
+        print(f"[{time.strftime('%H:%M:%S')}] 编译{status}: {phases}{', ' if phases else ''}共 {total * 1000:.0f}ms")
+        # 编译过程中才知道 include 了哪些模块
+        self.snapshot = self.take_snapshot()
 
-    # 编译cpp文件，添加C++17支持
-    os.system(f"g++ -std=c++17 -O2 {output_file} -o {output_file.strip('.cpp')}.exe")
-    print(f"编译cpp文件完成，生成文件: {os.path.splitext(output_file)[0]}.exe")
+    def run(self):
+        self.build()
+        print(f"正在监视 {len(self.snapshot)} 个文件，按 Ctrl+C 退出")
+        try:
+            while True:
+                time.sleep(self.interval)
+                snapshot = self.take_snapshot()
+                if snapshot == self.snapshot:
+                    continue
+                # 等待文件不再变化，连续保存只编译一次
+                while True:
+                    time.sleep(self.debounce)
+                    latest = self.take_snapshot()
+                    if latest == snapshot:
+                        break
+                    snapshot = latest
+                changed = self.changed_files(snapshot)
+                if not changed:
+                    self.snapshot = snapshot
+                    continue
+                names = ', '.join(os.path.relpath(path) for path in changed)
+                print(f"\n检测到修改: {names}")
+                self.build(changed)
+        except KeyboardInterrupt:
+            print("\n停止监视")
+
+# 测量峰值内存的启动器：fork 出被测程序并用 wait4 取得它的资源使用情况，写到 argv[1] 指定的文件描述符
+# Linux 在 exec 时把 fork 前进程的内存也计入 ru_maxrss，由体积很小的启动器 fork 才能得到程序自身的峰值
+RSS_LAUNCHER = r"""
+#include <cstdio>
+#include <cstdlib>
+#include <sys/resource.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+int main(int argc, char** argv) {
+    if (argc < 3) return 2;
+    int report = atoi(argv[1]);
+    pid_t pid = fork();
+    if (pid == 0) {
+        close(report);
+        execv(argv[2], argv + 2);
+        _exit(127);
+    }
+    int status = 0;
+    struct rusage usage = {};
+    if (pid < 0 || wait4(pid, &status, 0, &usage) < 0) return 2;
+    dprintf(report, "%d %ld\n", status, usage.ru_maxrss);
+    return 0;
+}
+"""
+
+def rss_launcher(cache_dir, compiler='g++'):
+    """编译（或复用）测量峰值内存的启动器，返回路径；不支持 fork 或编译失败时返回 None"""
+    if not hasattr(os, 'fork'):
+        return None
+    path = os.path.join(cache_dir, 'meta_rss_launcher.exe')
+    if os.path.exists(path):
+        return path
+    os.makedirs(cache_dir, exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    result = subprocess.run([compiler, '-O2', '-x', 'c++', '-', '-o', temp],
+                            input=RSS_LAUNCHER.encode('utf-8'), capture_output=True)
+    if result.returncode != 0:
+        return None
+    os.replace(temp, path)
+    return path
+
+def run_program(exe_file, input_data=b'', timeout=None, launcher=None):
+    """运行一次程序，返回 {'returncode', 'stdout', 'stderr', 'wall', 'peak_rss', 'timed_out'}
+    peak_rss 为峰值常驻内存 (KB)，通过启动器 launcher（见 rss_launcher）测量；没有启动器时为 None"""
+    exe_file = os.path.abspath(exe_file)
+    report_read, report_write = os.pipe() if launcher else (None, None)
+    command = [launcher, str(report_write), exe_file] if launcher else [exe_file]
+    start = time.perf_counter()
+    # 启动器与程序在同一个新的进程组中，超时时一起结束
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               pass_fds=(report_write,) if launcher else (), start_new_session=bool(launcher))
+    if launcher:
+        os.close(report_write)
+    timed_out = threading.Event()
+    def kill():
+        timed_out.set()
+        try:
+            os.killpg(process.pid, 9) if launcher else process.kill()
+        except OSError:
+            pass
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer:
+        timer.start()
+    try:
+        stdout, stderr = process.communicate(input_data)
+    finally:
+        if timer:
+            timer.cancel()
+    wall = time.perf_counter() - start
+    returncode, peak_rss = process.returncode, None
+    if launcher:
+        with os.fdopen(report_read, 'rb') as f:
+            report = f.read().split()
+        if len(report) == 2:
+            returncode = os.waitstatus_to_exitcode(int(report[0]))
+            # macOS 上 ru_maxrss 的单位是字节
+            peak_rss = int(report[1]) // 1024 if sys.platform == 'darwin' else int(report[1])
+    return {
+        'returncode': returncode,
+        'stdout': stdout,
+        'stderr': stderr,
+        'wall': wall,
+        'peak_rss': peak_rss,
+        'timed_out': timed_out.is_set(),
+    }
+
+def same_output(actual, expected):
+    """逐行比较输出，忽略行尾空白和换行符的差异"""
+    def lines(data):
+        text = data.decode('utf-8', errors='replace').replace('\r\n', '\n')
+        return [line.rstrip() for line in text.rstrip().split('\n')]
+    return lines(actual) == lines(expected)
+
+async def run_cases(cases, jobs=None, timeout=10, launcher=None):
+    """并发运行测试用例，cases 为 [(可执行文件, 输入文件, 期望输出文件)]
+    同一时间最多运行 jobs 个程序，launcher 用于测量峰值内存；返回与 cases 顺序一致的结果，每个结果在 run_program 的基础上
+    增加 'exe_file'、'input' 与 'status'（通过 / 失败 / 超时 / 运行错误）"""
+    semaphore = asyncio.Semaphore(jobs or os.cpu_count() or 1)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1)
+
+    async def run_case(exe_file, input_file, expected_file):
+        with open(input_file, 'rb') as f:
+            input_data = f.read()
+        with open(expected_file, 'rb') as f:
+            expected = f.read()
+        async with semaphore:
+            result = await loop.run_in_executor(executor, run_program, exe_file, input_data, timeout, launcher)
+        if result['timed_out']:
+            status = "超时"
+        elif result['returncode'] != 0:
+            status = "运行错误"
+        else:
+            status = "通过" if same_output(result['stdout'], expected) else "失败"
+        return dict(result, exe_file=exe_file, input=input_file, status=status)
+
+    try:
+        return await asyncio.gather(*[run_case(*case) for case in cases])
+    finally:
+        executor.shutdown(wait=False)
+
+def find_cases(directory):
+    """目录中的 x.in 与 x.out 组成一个测试用例，返回 [(输入文件, 期望输出文件)]"""
+    cases = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.in'):
+            expected = os.path.join(directory, name[:-3] + '.out')
+            if os.path.exists(expected):
+                cases.append((os.path.join(directory, name), expected))
+    return cases
+
+def report_cases(results):
+    """输出每个用例的结果、运行时间与峰值内存，返回是否全部通过"""
+    for result in results:
+        rss = f"{result['peak_rss'] / 1024:.1f}MB" if result['peak_rss'] is not None else "-"
+        print(f"{result['status']:<6} {result['exe_file']}  {os.path.basename(result['input'])}  "
+              f"{result['wall'] * 1000:.0f}ms  峰值内存 {rss}")
+    passed = sum(result['status'] == "通过" for result in results)
+    print(f"通过 {passed}/{len(results)}")
+    return passed == len(results)
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) != 2:
-        print("用法: python meta_compiler.py <input.meta>")
-        sys.exit(1)
+    arg_parser = argparse.ArgumentParser(description="Meta 编译器")
+    arg_parser.add_argument('inputs', nargs='+', metavar='input', help="Meta 源文件 (--tests 时可以有多个)")
+    arg_parser.add_argument('--profile', choices=list(BUILD_PROFILES), default='default',
+                            help="构建配置 (默认: default)")
+    arg_parser.add_argument('--cxx', default='g++', help="C++ 编译器 (默认: g++)")
+    arg_parser.add_argument('--cxxflags', default='', help="附加的编译参数")
+    arg_parser.add_argument('--lto-jobs', type=int, help="并行 LTO 任务数")
+    arg_parser.add_argument('--static', action='store_true', help="静态链接")
+    arg_parser.add_argument('--no-cache', action='store_true', help="禁用构建缓存")
+    arg_parser.add_argument('--bounds', choices=list(Parser.BOUNDS_MODES), default='fast',
+                            help="数组越界检查模式 (默认: fast)")
+    arg_parser.add_argument('--pgo', action='append', metavar='TRAINING_INPUT',
+                            help="启用 PGO，用该文件作为标准输入运行训练 (可多次指定)")
+    arg_parser.add_argument('-I', '--module-path', action='append', metavar='DIR',
+                            help="include 模块的搜索目录 (可多次指定)")
+    arg_parser.add_argument('--split', action='store_true',
+                            help="每个 Meta 类生成一个编译单元，并行编译并分别缓存")
+    arg_parser.add_argument('-j', '--jobs', type=int, help="并行编译任务数 (默认: CPU 核数)")
+    arg_parser.add_argument('--watch', action='store_true',
+                            help="监视源文件与模块，修改后自动增量重新编译")
+    arg_parser.add_argument('--run', action='store_true', help="编译后立即运行，标准输入输出直接交给程序")
+    arg_parser.add_argument('--tests', metavar='DIR',
+                            help="编译后用 DIR 中的 x.in / x.out 并发测试每个程序")
+    arg_parser.add_argument('--timeout', type=float, default=10, help="--tests 中每次运行的超时秒数 (默认: 10)")
+    arg_parser.add_argument('--track-allocs', action='store_true',
+                            help="统计内存分配次数、字节数、峰值与各函数的分配，程序结束时输出到标准错误")
+    args = arg_parser.parse_args()
+    if len(args.inputs) > 1 and not args.tests:
+        arg_parser.error("只有 --tests 可以指定多个源文件")
 
-    input_file = sys.argv[1]
-    if not os.path.exists(input_file):
-        print(f"错误: 文件 {input_file} 不存在")
-        sys.exit(1)
+    input_file = args.inputs[0]
+    for path in args.inputs + (args.pgo or []):
+        if not os.path.exists(path):
+            print(f"错误: 文件 {path} 不存在")
+            sys.exit(1)
 
-    base_name = os.path.splitext(input_file)[0]
-    output_file = base_name + ".cpp"
+    options = BuildOptions(
+        profile=args.profile,
+        compiler=args.cxx,
+        extra_flags=shlex.split(args.cxxflags),
+        lto_jobs=args.lto_jobs,
+        static=args.static,
+        use_cache=not args.no_cache,
+        pgo_inputs=args.pgo,
+        bounds=args.bounds,
+        module_path=args.module_path,
+        # 监视模式使用分文件生成，只重新编译变化的编译单元
+        split=args.split or (args.watch and not args.pgo),
+        jobs=args.jobs,
+        track_allocs=args.track_allocs,
+    )
+    output_file = os.path.splitext(input_file)[0] + ".cpp"
 
-    compile_meta(input_file, output_file)
\ No newline at end of file
+    if args.watch:
+        Watcher(input_file, output_file, options).run()
+        sys.exit(0)
+    if args.tests:
+        cases = find_cases(args.tests)
+        if not cases:
+            print(f"错误: {args.tests} 中没有成对的 .in / .out 文件")
+            sys.exit(1)
+        exe_files = []
+        for path in args.inputs:
+            # 编译器的提示写到标准错误，标准输出只有测试报告
+            with contextlib.redirect_stdout(sys.stderr):
+                exe_file = compile_meta(path, os.path.splitext(path)[0] + ".cpp", options)
+            if exe_file is None:
+                sys.exit(1)
+            exe_files.append(exe_file)
+        launcher = rss_launcher(cache_dir_for(output_file), options.compiler)
+        results = asyncio.run(run_cases([(exe_file, input_path, expected) for exe_file in exe_files
+                                         for input_path, expected in cases], args.jobs, args.timeout, launcher))
+        sys.exit(0 if report_cases(results) else 1)
+    # --run 时编译器的提示写到标准错误，标准输出只有程序的输出，可以直接重定向或与期望输出比较
+    with contextlib.redirect_stdout(sys.stderr) if args.run else contextlib.nullcontext():
+        exe_file = compile_meta(input_file, output_file, options)
+    if exe_file is None:
+        sys.exit(1)
+    if args.run:
+        sys.stdout.flush()
+        sys.exit(subprocess.run([os.path.abspath(exe_file)]).returncode)
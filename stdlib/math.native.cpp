@@ -0,0 +1,18 @@
+// math 模块的原生实现，接口声明见 math.meta
+
+namespace math {
+    // a 的 b 次方
+    any pow(any a, any b) {
+        return any(std::pow(MetaUtils::to_double(a), MetaUtils::to_double(b)));
+    }
+
+    // a 的 b 次方根
+    any sqrt(any a, any b) {
+        return any(std::pow(MetaUtils::to_double(a), 1.0 / MetaUtils::to_double(b)));
+    }
+
+    // 以 a 为底 b 的对数
+    any log(any a, any b) {
+        return any(std::log(MetaUtils::to_double(b)) / std::log(MetaUtils::to_double(a)));
+    }
+}
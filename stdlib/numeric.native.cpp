@@ -0,0 +1,131 @@
+// cxxflags: -fno-math-errno
+// numeric 模块的内核，接口见 numeric.native.h
+// 循环都写成 g++ 能自动向量化的形式：运算分派在循环外，归约使用多个独立的累加器
+// 上面的编译参数只作用于本模块的目标文件：sqrt 不设置 errno 才能向量化
+
+namespace numeric {
+    namespace kernel {
+        // 归约使用的累加器个数，对应一个 AVX-512 寄存器中的 float 个数
+        constexpr size_t LANES = 16;
+
+        template<typename T, typename F>
+        inline void apply(T* dst, const T* a, const T* b, size_t n, F f) {
+            for (size_t i = 0; i < n; ++i) dst[i] = f(a[i], b[i]);
+        }
+
+        template<typename T, typename F>
+        inline void apply_scalar(T* dst, const T* a, T b, size_t n, F f) {
+            for (size_t i = 0; i < n; ++i) dst[i] = f(a[i], b);
+        }
+
+        template<typename T>
+        void binary(Op op, T* dst, const T* a, const T* b, size_t n) {
+            switch (op) {
+                case Op::Add: apply(dst, a, b, n, [](T x, T y) { return x + y; }); break;
+                case Op::Sub: apply(dst, a, b, n, [](T x, T y) { return x - y; }); break;
+                case Op::Mul: apply(dst, a, b, n, [](T x, T y) { return x * y; }); break;
+                case Op::Div: apply(dst, a, b, n, [](T x, T y) { return x / y; }); break;
+                case Op::Pow: apply(dst, a, b, n, [](T x, T y) { return std::pow(x, y); }); break;
+            }
+        }
+
+        template<typename T>
+        void binary_scalar(Op op, T* dst, const T* a, T b, size_t n) {
+            switch (op) {
+                case Op::Add: apply_scalar(dst, a, b, n, [](T x, T y) { return x + y; }); break;
+                case Op::Sub: apply_scalar(dst, a, b, n, [](T x, T y) { return x - y; }); break;
+                case Op::Mul: apply_scalar(dst, a, b, n, [](T x, T y) { return x * y; }); break;
+                case Op::Div: apply_scalar(dst, a, b, n, [](T x, T y) { return x / y; }); break;
+                case Op::Pow:
+                    // 常见的整数次方展开为乘法
+                    if (b == 2) apply_scalar(dst, a, b, n, [](T x, T) { return x * x; });
+                    else if (b == 3) apply_scalar(dst, a, b, n, [](T x, T) { return x * x * x; });
+                    else if (b == T(0.5)) apply_scalar(dst, a, b, n, [](T x, T) { return std::sqrt(x); });
+                    else apply_scalar(dst, a, b, n, [](T x, T y) { return std::pow(x, y); });
+                    break;
+            }
+        }
+
+        template<typename T>
+        void unary(Fn fn, T* dst, const T* a, size_t n) {
+            switch (fn) {
+                case Fn::Exp: for (size_t i = 0; i < n; ++i) dst[i] = std::exp(a[i]); break;
+                case Fn::Log: for (size_t i = 0; i < n; ++i) dst[i] = std::log(a[i]); break;
+                case Fn::Sqrt: for (size_t i = 0; i < n; ++i) dst[i] = std::sqrt(a[i]); break;
+            }
+        }
+
+        // 按 LANES 路分别累加再合并，浮点加法不满足结合律，单个累加器无法向量化
+        template<typename T, typename Step, typename Merge>
+        inline T reduce(const T* a, size_t n, T init, Step step, Merge merge) {
+            T acc[LANES];
+            for (size_t k = 0; k < LANES; ++k) acc[k] = init;
+            size_t i = 0;
+            for (; i + LANES <= n; i += LANES) {
+                for (size_t k = 0; k < LANES; ++k) acc[k] = step(acc[k], a[i + k]);
+            }
+            for (; i < n; ++i) acc[0] = step(acc[0], a[i]);
+            T result = acc[0];
+            for (size_t k = 1; k < LANES; ++k) result = merge(result, acc[k]);
+            return result;
+        }
+
+        template<typename T>
+        T dot(const T* a, const T* b, size_t n) {
+            T acc[LANES] = {};
+            size_t i = 0;
+            for (; i + LANES <= n; i += LANES) {
+                for (size_t k = 0; k < LANES; ++k) acc[k] += a[i + k] * b[i + k];
+            }
+            for (; i < n; ++i) acc[0] += a[i] * b[i];
+            T result = 0;
+            for (size_t k = 0; k < LANES; ++k) result += acc[k];
+            return result;
+        }
+
+        template<typename T>
+        void cumsum(T* dst, const T* a, size_t n) {
+            T running = 0;
+            for (size_t i = 0; i < n; ++i) {
+                running += a[i];
+                dst[i] = running;
+            }
+        }
+
+        template<typename T>
+        T sum(const T* a, size_t n) {
+            auto add = [](T x, T y) { return x + y; };
+            return reduce(a, n, T(0), add, add);
+        }
+
+        template<typename T>
+        T min(const T* a, size_t n) {
+            auto pick = [](T x, T y) { return y < x ? y : x; };
+            return reduce(a, n, a[0], pick, pick);
+        }
+
+        template<typename T>
+        T max(const T* a, size_t n) {
+            auto pick = [](T x, T y) { return y > x ? y : x; };
+            return reduce(a, n, a[0], pick, pick);
+        }
+
+        // float / double 特化
+        template void binary<float>(Op, float*, const float*, const float*, size_t);
+        template void binary<double>(Op, double*, const double*, const double*, size_t);
+        template void binary_scalar<float>(Op, float*, const float*, float, size_t);
+        template void binary_scalar<double>(Op, double*, const double*, double, size_t);
+        template void unary<float>(Fn, float*, const float*, size_t);
+        template void unary<double>(Fn, double*, const double*, size_t);
+        template float dot<float>(const float*, const float*, size_t);
+        template double dot<double>(const double*, const double*, size_t);
+        template void cumsum<float>(float*, const float*, size_t);
+        template void cumsum<double>(double*, const double*, size_t);
+        template float sum<float>(const float*, size_t);
+        template double sum<double>(const double*, size_t);
+        template float min<float>(const float*, size_t);
+        template double min<double>(const double*, size_t);
+        template float max<float>(const float*, size_t);
+        template double max<double>(const double*, size_t);
+    }
+}
@@ -0,0 +1,117 @@
+// numeric 模块：float32/float64 数组的批量运算
+// 内核按 float/double 在模块目标文件中实例化，这里只做类型分派与长度检查
+
+namespace numeric {
+    namespace kernel {
+        enum class Op { Add, Sub, Mul, Div, Pow };
+        enum class Fn { Exp, Log, Sqrt };
+
+        template<typename T> void binary(Op op, T* dst, const T* a, const T* b, size_t n);
+        template<typename T> void binary_scalar(Op op, T* dst, const T* a, T b, size_t n);
+        template<typename T> void unary(Fn fn, T* dst, const T* a, size_t n);
+        template<typename T> T dot(const T* a, const T* b, size_t n);
+        template<typename T> void cumsum(T* dst, const T* a, size_t n);
+        template<typename T> T sum(const T* a, size_t n);
+        template<typename T> T min(const T* a, size_t n);
+        template<typename T> T max(const T* a, size_t n);
+    }
+
+    template<typename C>
+    using element_t = remove_const_t<remove_pointer_t<decltype(declval<C&>().data())>>;
+
+    template<typename C>
+    auto* elements(C&& a) {
+        using T = element_t<C>;
+        static_assert(is_same_v<T, float> || is_same_v<T, double>,
+                      "numeric 模块只支持 float32/float64 数组");
+        return a.data();
+    }
+
+    inline void check_size(const char* name, size_t expected, size_t actual) {
+        if (expected != actual) {
+            throw MetaRuntimeError(string("numeric.") + name + ": 数组长度不一致 (" +
+                                   std::to_string(expected) + " 与 " + std::to_string(actual) + ")");
+        }
+    }
+
+    inline void check_not_empty(const char* name, size_t size) {
+        if (size == 0) throw MetaRuntimeError(string("numeric.") + name + ": 数组为空");
+    }
+
+    template<typename T, typename S>
+    T scalar(const S& value) {
+        if constexpr (is_same_v<S, any>) return static_cast<T>(MetaUtils::to_double(value));
+        else return static_cast<T>(value);
+    }
+
+    // b 可以是数组，也可以是广播到每个元素的标量
+    template<typename D, typename A, typename B>
+    void binary(const char* name, kernel::Op op, D&& dst, const A& a, const B& b) {
+        using T = element_t<D>;
+        check_size(name, dst.size(), a.size());
+        if constexpr (is_arithmetic_v<B> || is_same_v<B, any>) {
+            kernel::binary_scalar<T>(op, elements(dst), elements(a), scalar<T>(b), a.size());
+        } else {
+            check_size(name, a.size(), b.size());
+            kernel::binary<T>(op, elements(dst), elements(a), elements(b), a.size());
+        }
+    }
+
+    template<typename D, typename A, typename B>
+    void add(D&& dst, const A& a, const B& b) { binary("add", kernel::Op::Add, dst, a, b); }
+    template<typename D, typename A, typename B>
+    void sub(D&& dst, const A& a, const B& b) { binary("sub", kernel::Op::Sub, dst, a, b); }
+    template<typename D, typename A, typename B>
+    void mul(D&& dst, const A& a, const B& b) { binary("mul", kernel::Op::Mul, dst, a, b); }
+    template<typename D, typename A, typename B>
+    void div(D&& dst, const A& a, const B& b) { binary("div", kernel::Op::Div, dst, a, b); }
+    template<typename D, typename A, typename B>
+    void pow(D&& dst, const A& a, const B& b) { binary("pow", kernel::Op::Pow, dst, a, b); }
+
+    template<typename D, typename A>
+    void unary(const char* name, kernel::Fn fn, D&& dst, const A& a) {
+        check_size(name, dst.size(), a.size());
+        kernel::unary<element_t<D>>(fn, elements(dst), elements(a), a.size());
+    }
+
+    template<typename D, typename A>
+    void exp(D&& dst, const A& a) { unary("exp", kernel::Fn::Exp, dst, a); }
+    template<typename D, typename A>
+    void log(D&& dst, const A& a) { unary("log", kernel::Fn::Log, dst, a); }
+    template<typename D, typename A>
+    void sqrt(D&& dst, const A& a) { unary("sqrt", kernel::Fn::Sqrt, dst, a); }
+
+    template<typename A, typename B>
+    auto dot(const A& a, const B& b) {
+        check_size("dot", a.size(), b.size());
+        return kernel::dot<element_t<A>>(elements(a), elements(b), a.size());
+    }
+
+    // 前缀和：dst[i] = a[0] + ... + a[i]
+    template<typename D, typename A>
+    void cumsum(D&& dst, const A& a) {
+        check_size("cumsum", dst.size(), a.size());
+        kernel::cumsum<element_t<D>>(elements(dst), elements(a), a.size());
+    }
+
+    template<typename A>
+    auto sum(const A& a) { return kernel::sum<element_t<A>>(elements(a), a.size()); }
+
+    template<typename A>
+    auto min(const A& a) {
+        check_not_empty("min", a.size());
+        return kernel::min<element_t<A>>(elements(a), a.size());
+    }
+
+    template<typename A>
+    auto max(const A& a) {
+        check_not_empty("max", a.size());
+        return kernel::max<element_t<A>>(elements(a), a.size());
+    }
+
+    template<typename A>
+    auto mean(const A& a) {
+        check_not_empty("mean", a.size());
+        return sum(a) / static_cast<element_t<A>>(a.size());
+    }
+}
@@ -0,0 +1,102 @@
+# tests/run.py
+"""Meta 编译器的回归测试
+
+tests/<目录>/ 中的每个 .meta 程序编译后用同一目录中成对的 x.in / x.out 测试，与 meta_compiler.py --tests 相同。
+tests/errors/ 中的每个 x.meta 都应该编译失败：x.err 的每一行（例如错误原因、"所在位置 : 行 7"）都要出现在错误信息中。
+
+用法: python tests/run.py [目录 ...] [-j 4]
+"""
+
+import io
+import os
+import sys
+import asyncio
+import argparse
+import contextlib
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ERRORS_DIR = os.path.join(TESTS_DIR, 'errors')
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+import meta_compiler
+
+def available_suites():
+    return sorted(name for name in os.listdir(TESTS_DIR) if os.path.isdir(os.path.join(TESTS_DIR, name))
+                  and not name.startswith(('.', '_')))
+
+def meta_files(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.meta'))
+
+def run_program_suite(directory, options, jobs):
+    """编译目录中的程序，并发运行所有程序与用例的组合；返回是否全部通过"""
+    exe_files = []
+    for path in meta_files(directory):
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            exe_file = meta_compiler.compile_meta(path, os.path.splitext(path)[0] + '.cpp', options)
+        if exe_file is None:
+            print(f"失败   {path}: 编译失败{log.getvalue()}")
+            return False
+        exe_files.append(exe_file)
+    cases = meta_compiler.find_cases(directory)
+    if not cases:
+        print(f"错误: {directory} 中没有成对的 .in / .out 文件")
+        return False
+    results = asyncio.run(meta_compiler.run_cases([(exe_file, input_file, expected) for exe_file in exe_files
+                                                   for input_file, expected in cases], jobs))
+    return meta_compiler.report_cases(results)
+
+def compile_error(path, options):
+    """编译 path，返回错误信息；编译成功时返回 None"""
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    try:
+        meta_compiler.parse_source(source, options, os.path.dirname(path))
+    except (SyntaxError, ValueError, meta_compiler.MetaLangError) as e:
+        return str(e)
+    return None
+
+def run_error_suite(directory, options):
+    """每个程序都应该报告 .err 中给出的错误；返回是否全部通过"""
+    passed = total = 0
+    for path in meta_files(directory):
+        total += 1
+        with open(os.path.splitext(path)[0] + '.err', 'r', encoding='utf-8') as f:
+            expected = [line.strip() for line in f if line.strip()]
+        message = compile_error(path, options)
+        if message is None:
+            print(f"失败   {path}: 应该编译失败")
+            continue
+        missing = [line for line in expected if line not in message]
+        if missing:
+            print(f"失败   {path}: 错误信息中没有 {missing[0]!r}{message}")
+            continue
+        passed += 1
+        print(f"通过   {path}")
+    print(f"通过 {passed}/{total}")
+    return passed == total
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Meta 编译器回归测试")
+    arg_parser.add_argument('suites', nargs='*', help="要运行的测试目录 (默认全部)")
+    arg_parser.add_argument('-j', '--jobs', type=int, help="并发运行的程序数 (默认: CPU 核数)")
+    args = arg_parser.parse_args()
+
+    options = meta_compiler.BuildOptions()
+    failed = []
+    for suite in args.suites or available_suites():
+        print(f"== {suite} ==")
+        directory = os.path.join(TESTS_DIR, suite)
+        if directory == ERRORS_DIR:
+            ok = run_error_suite(directory, options)
+        else:
+            ok = run_program_suite(directory, options, args.jobs)
+        if not ok:
+            failed.append(suite)
+    if failed:
+        print(f"未通过: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())